@@ -8,6 +8,7 @@ from mangrove import (
     STTStage,
     BotStage,
     TTSStage,
+    WakeWordStage,
 )
 from storage_manager import StorageManager
 from core import AudioBuffer, DataPacket, AudioPacket, TextPacket
@@ -92,16 +93,30 @@ class BasicConversationalAgent(Agent):
             "tts": "gtts",
         },
         persona_configs: Union[str, Dict] = None,
+        endpoints_kwargs: Dict[str, Dict] = {},
+        stages_kwargs: Dict[str, Dict] = {},
         welcome_msg: str="Welcome, AI server connection is succesful.",
         verbose=False,
     ):
         super().__init__()
 
-        bot = BotStage(name="bot", endpoint=endpoints["bot"], persona_configs=persona_configs, verbose=verbose)
+        def _endpoint_kwargs(stage_name: str) -> Dict:
+            # only override the stage's default endpoint kwargs when explicitly configured
+            if stage_name in endpoints_kwargs:
+                return {"endpoint_kwargs": endpoints_kwargs[stage_name]}
+            return {}
+
+        bot = BotStage(name="bot", endpoint=endpoints["bot"], persona_configs=persona_configs, verbose=verbose, **_endpoint_kwargs("bot"), **stages_kwargs.get("bot", {}))
         if not text_only:
-            vad = VADStage(name="vad", device=device)
-            stt = STTStage(name="stt", device=device)
-            tts = TTSStage(name="tts", endpoint=endpoints["tts"])
+            vad = VADStage(name="vad", endpoint=endpoints.get("vad", "silero"), device=device, **endpoints_kwargs.get("vad", {}))
+            stt = STTStage(name="stt", endpoint=endpoints.get("stt", "faster_whisper"), device=device, **_endpoint_kwargs("stt"), **stages_kwargs.get("stt", {}))
+            tts = TTSStage(name="tts", endpoint=endpoints["tts"], **_endpoint_kwargs("tts"), **stages_kwargs.get("tts", {}))
+            wakeword = None
+            if endpoints.get("wakeword") is not None:
+                # gate in front of the VAD, so that nothing downstream runs on audio not addressed to the agent
+                wakeword = WakeWordStage(name="wakeword", endpoint=endpoints["wakeword"], device=device, **_endpoint_kwargs("wakeword"), **stages_kwargs.get("wakeword", {}))
+            # let the endpointing policy know how complete the utterance looks so far
+            stt.add_transcript_listener(vad.endpointing_policy.observe_transcript)
 
         self.startup_audiopacket = None
         # if welcome_msg:
@@ -122,7 +137,7 @@ class BasicConversationalAgent(Agent):
         else:
             self._pipeline: VoiceCapableAgentPipeline = VoiceCapableAgentPipeline(
                 name="voice_capable_agent_pipeline",
-                stages=[
+                stages=([wakeword] if wakeword is not None else []) + [
                     vad,
                     stt,
                     bot,
@@ -140,6 +155,9 @@ class BasicConversationalAgent(Agent):
             "bot": self.host.emit_bot_response,
             "tts": self.host.emit_bot_voice,
         }
+        self._pipeline.event_emission_mapping = {
+            "bot_command": self.host.emit_bot_command,
+        }
         self._pipeline.start(host=self.host)
 
     def feed(self, data_packet: DataPacket):
@@ -0,0 +1,155 @@
+"""Benchmark of the client-side overhead of the bot endpoints: LangChain chain against direct HTTP streaming
+
+Both endpoints stream the same responses with the same persona, from a local mock of the Ollama chat API
+by default: it streams `--tokens` tokens `--token_delay_ms` apart, so that the time to first token and the
+time between chunks beyond that delay are the overhead of the client (prompt building, HTTP, parsing,
+chain plumbing). With `--server ollama`, a running Ollama server is used instead, for end-to-end numbers.
+
+The persona retrieves its context locally (hashed TF-IDF), so that no embedding model is needed.
+
+Usage:
+    python benchmarks/llm_endpoint_benchmark.py --tokens 200 --runs 20
+    python benchmarks/llm_endpoint_benchmark.py --server ollama --model qwen3:8b --runs 5
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from report import print_table
+
+ENDPOINTS = ["langchain", "direct"]
+
+USER_MESSAGES = [
+    "Hey Marvin, who are you?",
+    "Tell me about Whiskers.",
+    "Who is Alice?",
+    "Follow me to the trees.",
+    "How is the war against the Palmerians going?",
+]
+
+
+def start_mock_ollama(num_tokens: int, token_delay_ms: float) -> Tuple[ThreadingHTTPServer, str]:
+    """Start a local server streaming `num_tokens` tokens per response, as the Ollama chat API does"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # kept alive, as Ollama
+
+        def log_message(self, *args):
+            pass
+
+        def _message(self, model: str, content: str, done: bool) -> bytes:
+            message = {"model": model, "created_at": "2024-01-01T00:00:00Z", "message": {"role": "assistant", "content": content}, "done": done}
+            if done:
+                message.update(done_reason="stop", total_duration=0, load_duration=0, prompt_eval_count=1, prompt_eval_duration=0, eval_count=num_tokens, eval_duration=0)
+            return json.dumps(message).encode("utf-8") + b"\n"
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            model = request.get("model", "mock")
+            if not request.get("stream", True) or not request.get("messages"):
+                body = self._message(model, "Summary." if request.get("messages") else "", True)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i in range(num_tokens + 1):
+                if i > 0 and token_delay_ms > 0:
+                    time.sleep(token_delay_ms / 1000)
+                line = self._message(model, f" word{i}" if i < num_tokens else "", i == num_tokens)
+                self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def create_endpoint(name: str, model: str, base_url: str):
+    """Create the endpoint as BotStage does, with a persona retrieving locally"""
+    from mangrove.bot.persona.protector_of_mangrove import ProtectorOfMangrove
+    persona = ProtectorOfMangrove(retrieval="local")
+    if name == "langchain":
+        from mangrove.bot.endpoints.chat_ollama import ChatOllamaEndpoint
+        endpoint = ChatOllamaEndpoint(model=model, base_url=base_url)
+    elif name == "direct":
+        from mangrove.bot.endpoints.direct_http import DirectStreamingEndpoint
+        endpoint = DirectStreamingEndpoint(api="ollama", model=model, base_url=base_url)
+    else:
+        raise Exception(f"Unknown endpoint {name}, available endpoints: {', '.join(ENDPOINTS)}")
+    endpoint.setup(persona)
+    return endpoint
+
+
+def run_endpoint(name: str, model: str, base_url: str, runs: int, token_delay_ms: float) -> Dict:
+    endpoint = create_endpoint(name, model, base_url)
+    for _ in endpoint.stream(user_msg=USER_MESSAGES[0], chat_history=[]):
+        pass  # warm up: connection, model, query cache
+
+    times_to_first_chunk, chunk_overheads, num_chunks = [], [], []
+    for run in range(runs):
+        start = time.perf_counter()
+        chunk_times: List[float] = []
+        for chunk in endpoint.stream(user_msg=USER_MESSAGES[run % len(USER_MESSAGES)], chat_history=[]):
+            if chunk:
+                chunk_times.append(time.perf_counter())
+        if not chunk_times:
+            continue
+        times_to_first_chunk.append((chunk_times[0] - start) * 1000)
+        intervals = np.diff(chunk_times) * 1000
+        if len(intervals):
+            chunk_overheads.append(float(np.mean(intervals)) - token_delay_ms)
+        num_chunks.append(len(chunk_times))
+
+    return {
+        "endpoint": name,
+        "runs": len(times_to_first_chunk),
+        "chunks": float(np.mean(num_chunks)) if num_chunks else 0.0,
+        "ttfc_mean_ms": float(np.mean(times_to_first_chunk)) if times_to_first_chunk else float("nan"),
+        "ttfc_p95_ms": float(np.percentile(times_to_first_chunk, 95)) if times_to_first_chunk else float("nan"),
+        "chunk_overhead_ms": float(np.mean(chunk_overheads)) if chunk_overheads else float("nan"),
+    }
+
+
+def print_report(results: List[Dict]) -> None:
+    columns: List[Tuple[str, str]] = [
+        ("endpoint", "{:>10}"), ("runs", "{:>5}"), ("chunks", "{:>7.1f}"), ("ttfc_mean_ms", "{:>13.2f}"),
+        ("ttfc_p95_ms", "{:>12.2f}"), ("chunk_overhead_ms", "{:>18.4f}"),
+    ]
+    print_table(results, columns)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the time to first chunk and per-chunk overhead of the bot endpoints.")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS, help="Endpoints to compare")
+    parser.add_argument("--server", choices=["mock", "ollama"], default="mock", help="Local mock of the Ollama chat API, or a running Ollama server")
+    parser.add_argument("--base_url", default="http://localhost:11434", help="Base URL of the Ollama server")
+    parser.add_argument("--model", default="qwen3:8b", help="Ollama chat model")
+    parser.add_argument("--runs", type=int, default=20, help="Number of responses per endpoint")
+    parser.add_argument("--tokens", type=int, default=200, help="Number of tokens per response of the mock server")
+    parser.add_argument("--token_delay_ms", type=float, default=0.0, help="Delay between tokens of the mock server")
+    args = parser.parse_args()
+
+    from core.utils import logger
+    logger.remove()  # keep the output for the results
+
+    base_url, token_delay_ms = args.base_url, 0.0
+    if args.server == "mock":
+        _, base_url = start_mock_ollama(args.tokens, args.token_delay_ms)
+        token_delay_ms = args.token_delay_ms
+    print_report([run_endpoint(name, args.model, base_url, args.runs, token_delay_ms) for name in args.endpoints])
@@ -0,0 +1,164 @@
+"""Benchmark of the time to first token over a long conversation, with and without a stable prompt prefix
+
+The same scripted conversation is held with an Ollama model with both prompt layouts of the personas:
+`context_first`, the former layout, gives the retrieved context in the system prompt, so that the prompt
+differs from the previous turn from its first message on; `stable_prefix` gives it right before the user
+message, so that the server finds the system prompt and the chat history in its KV cache and only processes
+the context, the last exchange and the new user message. The time to first token of the later turns
+shows the difference, as the chat history grows.
+
+The chat history is kept as BotStage does, with the default budget unless `--history_kwargs` says otherwise:
+older turns are folded into a summary every few turns, rewriting the head of the prompt. The time to first
+token is reported separately for the turns right after a fold and for the other turns.
+
+Usage:
+    python benchmarks/prompt_prefix_benchmark.py --model qwen3:8b --turns 30
+    python benchmarks/prompt_prefix_benchmark.py --layouts stable_prefix --endpoint_kwargs '{"num_ctx": 8192}'
+    python benchmarks/prompt_prefix_benchmark.py --history_kwargs '{"keep_last_turns": 10, "fold_ratio": 0.5}'
+
+Requires a running Ollama server with the chat model and the embedding model of the persona.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from report import print_table
+
+LAYOUTS = ["context_first", "stable_prefix"]
+
+USER_MESSAGES = [
+    "Hey Marvin, who are you?",
+    "Where do you live?",
+    "What is the air of the Estuary made of?",
+    "Where do the holographic particles come from?",
+    "What do you do for a living?",
+    "Who is the enemy of the Mangrove?",
+    "What do the Palmerians think of you?",
+    "How many Palmerians have you taken down at once?",
+    "Do you have any pets?",
+    "Tell me about Whiskers.",
+    "What did you do yesterday?",
+    "Who is Alice?",
+    "Why does Alice hate the Palmerians?",
+    "What happened to Alice's leg?",
+    "How is the war going?",
+    "What music do you like?",
+    "Why The Carpenters?",
+    "Do you have any siblings?",
+    "What does Marvy collect?",
+    "Do you have a manatee?",
+    "What is Fido like?",
+    "Follow me to the trees.",
+    "Can you sit down for a while?",
+    "Stop following me.",
+    "What makes the Mangrove trees so special?",
+    "Would Whiskers beat a Palmerian in a fight?",
+    "Could Alice still use her bow with a broken leg?",
+    "What would you do if the Palmerians attacked now?",
+    "What did we talk about at the start?",
+    "Thanks Marvin, see you around.",
+]
+
+
+def create_persona(persona_file: str, layout: str):
+    """Create the Ollama persona of BotStage with the given prompt layout"""
+    from mangrove.bot.persona.protector_of_mangrove_qwen3 import ProtectorOfMangroveQwen3, create_prompt
+    persona = ProtectorOfMangroveQwen3(persona_file=persona_file)
+    persona._prompt = create_prompt(persona.system_prompt, stable_prefix=layout == "stable_prefix").partial(
+        assistant_name=persona.assistant_name
+    )
+    return persona
+
+
+def run_conversation(layout: str, persona_file: str, endpoint_kwargs: Dict, history_kwargs: Dict, num_turns: int) -> Tuple[List[float], List[bool]]:
+    """Hold the scripted conversation and measure the time to first token of every turn, in milliseconds
+
+    Returns:
+        Tuple[List[float], List[bool]]: time to first token of every turn, and whether a fold rewrote the summary before it
+    """
+    from mangrove.bot.endpoints.chat_ollama import ChatOllamaEndpoint
+    from mangrove.bot.history import ChatHistory
+
+    endpoint = ChatOllamaEndpoint(**endpoint_kwargs)
+    persona = create_persona(persona_file, layout)
+    endpoint.setup(persona)
+    # as BotStage keeps it, folding with the same LLM
+    chat_history = ChatHistory(summarizer=endpoint.llm, assistant_name=persona.assistant_name, **history_kwargs)
+
+    times_to_first_token, after_fold = [], []
+    summary = chat_history.summary
+    for turn in range(num_turns):
+        user_msg = USER_MESSAGES[turn % len(USER_MESSAGES)]
+        chat_history.wait_for_fold()  # folds complete while the user speaks
+        after_fold.append(chat_history.summary != summary)
+        summary = chat_history.summary
+        start = time.perf_counter()
+        time_to_first_token = None
+        response = ""
+        for chunk in endpoint.stream(user_msg=user_msg, chat_history=chat_history.messages):
+            if time_to_first_token is None and chunk:
+                time_to_first_token = (time.perf_counter() - start) * 1000
+            response += chunk
+        times_to_first_token.append(time_to_first_token if time_to_first_token is not None else float("nan"))
+        chat_history.add_user_message(user_msg)
+        chat_history.add_ai_message(response)
+        print(f"{layout} turn {turn + 1:>2}: {times_to_first_token[-1]:8.1f} ms to first token{' (after a fold)' if after_fold[-1] else ''}", file=sys.stderr)
+    return times_to_first_token, after_fold
+
+
+def summarize(layout: str, times_to_first_token: List[float], after_fold: List[bool]) -> Dict:
+    times = np.array(times_to_first_token)
+    half = len(times) // 2
+    after_fold = np.array(after_fold, dtype=bool)
+    return {
+        "layout": layout,
+        "turns": len(times),
+        "mean_ms": float(np.nanmean(times)),
+        "p50_ms": float(np.nanpercentile(times, 50)),
+        "p95_ms": float(np.nanpercentile(times, 95)),
+        "first_half_ms": float(np.nanmean(times[:half])) if half else float("nan"),
+        "second_half_ms": float(np.nanmean(times[half:])),
+        "last_turn_ms": float(times[-1]),
+        "folds": int(after_fold.sum()),
+        "after_fold_ms": float(np.nanmean(times[after_fold])) if after_fold.any() else float("nan"),
+        "no_fold_ms": float(np.nanmean(times[~after_fold])) if (~after_fold).any() else float("nan"),
+    }
+
+
+def print_report(results: List[Dict]) -> None:
+    columns: List[Tuple[str, str]] = [
+        ("layout", "{:>14}"), ("turns", "{:>6}"), ("mean_ms", "{:>9.1f}"), ("p50_ms", "{:>9.1f}"), ("p95_ms", "{:>9.1f}"),
+        ("first_half_ms", "{:>14.1f}"), ("second_half_ms", "{:>15.1f}"), ("last_turn_ms", "{:>13.1f}"),
+        ("folds", "{:>6}"), ("after_fold_ms", "{:>14.1f}"), ("no_fold_ms", "{:>11.1f}"),
+    ]
+    print_table(results, columns)
+
+
+if __name__ == "__main__":
+    default_persona_file = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mangrove", "bot", "persona", "default_persona.json"
+    )
+    parser = argparse.ArgumentParser(description="Benchmark the time to first token over a conversation with both prompt layouts.")
+    parser.add_argument("--layouts", nargs="+", choices=LAYOUTS, default=LAYOUTS, help="Prompt layouts to compare")
+    parser.add_argument("--turns", type=int, default=30, help="Number of turns of the conversation")
+    parser.add_argument("--model", default="qwen3:8b", help="Ollama chat model")
+    parser.add_argument("--persona", default=default_persona_file, help="Persona JSON file")
+    parser.add_argument("--endpoint_kwargs", type=json.loads, default={}, help="JSON of keyword arguments of the Ollama endpoint")
+    parser.add_argument("--history_kwargs", type=json.loads, default={}, help="JSON of keyword arguments of the chat history, defaults as in BotStage")
+    args = parser.parse_args()
+
+    from core.utils import logger
+    logger.remove()  # keep the output for the results
+
+    endpoint_kwargs = {"model": args.model, "temperature": 0.0, **args.endpoint_kwargs}
+    results = []
+    for layout in args.layouts:
+        times_to_first_token, after_fold = run_conversation(layout, args.persona, endpoint_kwargs, args.history_kwargs, args.turns)
+        results.append(summarize(layout, times_to_first_token, after_fold))
+    print_report(results)
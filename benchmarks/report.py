@@ -0,0 +1,17 @@
+"""Reporting helpers shared by the benchmarks"""
+from typing import Dict, List, Tuple
+
+
+def print_table(results: List[Dict], columns: List[Tuple[str, str]]) -> None:
+    """Print the results as a table, one row per result
+
+    Args:
+        results (List[Dict]): Results, each with a value for every column
+        columns (List[Tuple[str, str]]): Name and right-aligned format of every column, e.g. ("mean_ms", "{:>8.3f}");
+            the header is aligned on the width of the first row
+    """
+    if not results:
+        return
+    print(" ".join("{:>{}}".format(name, len(fmt.format(results[0][name]))) for name, fmt in columns))
+    for result in results:
+        print(" ".join(fmt.format(result[name]) for name, fmt in columns))
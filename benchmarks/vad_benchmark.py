@@ -0,0 +1,188 @@
+"""Benchmark of the VAD backends: cold start, per-frame cost and endpoint latency
+
+Every backend runs in a fresh interpreter, so that the cold start includes importing its
+dependencies, loading the weights and scoring the first frame. All backends run on the same recordings.
+
+The endpoint latency is the delay between the end of speech and the utterance being sent off, in audio time,
+plus the time spent processing the frame that sends it off. The end of speech is known for the synthetic
+signal; for recordings, the end of speech as detected by the backend itself is used.
+
+Usage:
+    python benchmarks/vad_benchmark.py --backends silero silero-onnx webrtc --wav recording.wav
+    python benchmarks/vad_benchmark.py --backends silero-onnx --endpoint_kwargs '{"silero-onnx": {"intra_op_num_threads": 2}}'
+
+Recordings must be 16 kHz mono 16-bit WAV files; without any, a synthetic signal is used.
+"""
+import os
+import sys
+import json
+import time
+import wave
+import argparse
+import subprocess
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from report import print_table
+
+SAMPLE_RATE = 16000
+
+
+def load_audio(wav_path: str = None, duration: float = 30.0) -> Tuple[np.ndarray, Optional[List[float]]]:
+    """Load float32 samples of a recording, or synthesize voiced bursts separated by near-silence
+
+    Returns:
+        Tuple[np.ndarray, Optional[List[float]]]: samples and, if known, the timestamps in milliseconds at which speech ends
+    """
+    if wav_path is None:
+        rng = np.random.default_rng(0)
+        samples = rng.normal(0, 1e-4, int(duration * SAMPLE_RATE)).astype(np.float32)
+        speech_ends = []
+        for start in np.arange(1.0, duration - 2.0, 4.0):
+            burst = slice(int(start * SAMPLE_RATE), int((start + 1.5) * SAMPLE_RATE))
+            t = np.arange(burst.stop - burst.start) / SAMPLE_RATE
+            # harmonics of a wobbling pitch with a syllabic envelope, loosely speech-like
+            pitch = 140 + 20 * np.sin(2 * np.pi * 3 * t)
+            phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+            voiced = sum(np.sin(k * phase) / k for k in range(1, 6)) * (0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2)
+            samples[burst] += (0.1 * voiced + rng.normal(0, 0.005, len(t))).astype(np.float32)
+            speech_ends.append(burst.stop * 1000 / SAMPLE_RATE)
+        return samples, speech_ends
+
+    with wave.open(wav_path, "rb") as f:
+        if f.getframerate() != SAMPLE_RATE or f.getnchannels() != 1 or f.getsampwidth() != 2:
+            raise ValueError(f"{wav_path} must be a {SAMPLE_RATE} Hz mono 16-bit WAV file")
+        return np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16).astype(np.float32) / (1 << 15), None
+
+
+def make_frames(samples: np.ndarray, frame_size: int) -> list:
+    """Split float32 samples into AudioPackets of frame_size bytes"""
+    from core import AudioPacket
+    frame_samples = frame_size // 4
+    frames = []
+    for i in range(len(samples) // frame_samples):
+        frame = samples[i * frame_samples:(i + 1) * frame_samples]
+        frames.append(AudioPacket({
+                "bytes": frame.tobytes(),
+                "sampleRate": SAMPLE_RATE,
+                "sampleWidth": 4,
+                "numChannels": 1,
+                "timestamp": i * frame_samples * 1000 / SAMPLE_RATE,
+            }, resample=False, is_processed=True
+        ))
+    return frames
+
+
+def create_endpoint(backend: str, endpoint_kwargs: Dict):
+    """Create the VAD endpoint of the backend as VADStage does"""
+    if backend == "silero":
+        from mangrove.vad.endpoints.silero import SileroVAD
+        return SileroVAD(**endpoint_kwargs)
+    elif backend == "silero-onnx":
+        from mangrove.vad.endpoints.silero_onnx import SileroOnnxVAD
+        return SileroOnnxVAD(**endpoint_kwargs)
+    elif backend == "webrtc":
+        from mangrove.vad.endpoints.webrtc import WebRTCVAD
+        return WebRTCVAD(**endpoint_kwargs)
+    else:
+        raise Exception(f"Unknown backend {backend}, available backends: silero, silero-onnx, webrtc")
+
+
+def measure_endpoint_latencies(endpoint, frames: list, speech_ends: Optional[List[float]]) -> List[float]:
+    """Feed the frames as VADStage does and measure the endpoint latency of every utterance sent off"""
+    endpoint.reset_session()
+    latencies, processings = [], []
+    for frame in frames:
+        wall = time.perf_counter()
+        endpoint.feed(frame)
+        utterance = endpoint.get_utterance_if_any()
+        processing = (time.perf_counter() - wall) * 1000
+        if utterance is None:
+            continue
+        if speech_ends is None:
+            processings.append(processing)
+            continue
+        past_speech_ends = [speech_end for speech_end in speech_ends if speech_end <= frame.ending_timestamp]
+        if not past_speech_ends:
+            continue  # sent off before any speech ended, i.e. a false positive
+        latencies.append(frame.ending_timestamp - past_speech_ends[-1] + processing)
+    if speech_ends is None:
+        # from the end of speech as detected by the backend itself, as reported in its metrics
+        mean_tail_silence = endpoint.metrics["endpoint_latency"]["mean_ms"]
+        latencies = [mean_tail_silence + processing for processing in processings]
+    return latencies
+
+
+def run_backend(backend: str, endpoint_kwargs: Dict, wav_paths: List[str]) -> Dict:
+    """Measure the backend within this interpreter"""
+    cold_start = time.perf_counter()
+    endpoint = create_endpoint(backend, endpoint_kwargs)
+    endpoint.on_start()
+    recordings = [load_audio(wav_path) for wav_path in wav_paths] or [load_audio()]
+    frames = make_frames(recordings[0][0], endpoint.frame_size)
+    endpoint.is_speech(frames[0])
+    cold_start = time.perf_counter() - cold_start
+
+    latencies, cpu_times, endpoint_latencies = [], [], []
+    audio_duration = 0.0
+    for samples, speech_ends in recordings:
+        endpoint.reset()
+        frames = make_frames(samples, endpoint.frame_size)
+        for frame in frames:
+            wall, cpu = time.perf_counter(), time.process_time()
+            endpoint.is_speech(frame)
+            latencies.append(time.perf_counter() - wall)
+            cpu_times.append(time.process_time() - cpu)
+        audio_duration += len(samples) / SAMPLE_RATE
+        endpoint_latencies += measure_endpoint_latencies(endpoint, frames, speech_ends)
+
+    latencies, cpu_times = np.array(latencies) * 1000, np.array(cpu_times) * 1000
+    return {
+        "backend": backend,
+        "frame_ms": endpoint.frame_size / 4 * 1000 / SAMPLE_RATE,
+        "frames": len(latencies),
+        "cold_start_ms": cold_start * 1000,
+        "mean_ms": float(latencies.mean()),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "cpu_ms": float(cpu_times.mean()),
+        "cpu_per_audio_s_ms": float(cpu_times.sum() / audio_duration),
+        "utterances": len(endpoint_latencies),
+        "endpoint_ms": float(np.mean(endpoint_latencies)) if endpoint_latencies else float("nan"),
+    }
+
+
+def run_backend_isolated(backend: str, endpoint_kwargs: Dict, wav_paths: List[str]) -> Dict:
+    """Measure the backend in a fresh interpreter"""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", backend, "--endpoint_kwargs", json.dumps({backend: endpoint_kwargs}), "--wav", *wav_paths],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def print_report(results: List[Dict]) -> None:
+    columns: List[Tuple[str, str]] = [
+        ("backend", "{:>12}"), ("frame_ms", "{:>9.1f}"), ("frames", "{:>7}"), ("cold_start_ms", "{:>14.1f}"),
+        ("mean_ms", "{:>8.3f}"), ("p50_ms", "{:>8.3f}"), ("p95_ms", "{:>8.3f}"), ("cpu_ms", "{:>8.3f}"),
+        ("cpu_per_audio_s_ms", "{:>19.2f}"), ("utterances", "{:>11}"), ("endpoint_ms", "{:>12.1f}"),
+    ]
+    print_table(results, columns)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cold start, per-frame cost and endpoint latency of the VAD backends.")
+    parser.add_argument("--backends", nargs="+", default=["silero", "silero-onnx", "webrtc"], help="VAD backends to compare")
+    parser.add_argument("--wav", nargs="*", default=[], help="16 kHz mono 16-bit WAV recordings")
+    parser.add_argument("--endpoint_kwargs", type=json.loads, default={}, help="JSON of keyword arguments per backend")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        from core.utils import logger
+        logger.remove()  # keep stdout for the results
+        print(json.dumps(run_backend(args.worker, args.endpoint_kwargs.get(args.worker, {}), args.wav)))
+    else:
+        print_report([run_backend_isolated(backend, args.endpoint_kwargs.get(backend, {}), args.wav) for backend in args.backends])
@@ -90,6 +90,14 @@ class AssistantClient(socketio.ClientNamespace):
         else:
             self.print()
 
+    def on_bot_command(self, data):
+        """Handles an action command of the bot, received as soon as it is generated
+
+        Args:
+            data (dict): bot command received from the server, the command being in `text`
+        """
+        logger.info(f"Bot command: [{data['text']}]")
+
     def on_stt_response(self, data):
         """Handles the STT response received from the server
 
@@ -97,6 +105,10 @@ class AssistantClient(socketio.ClientNamespace):
             data (dict): STT response received from the server
         """
         # Handle response here
+        if data.get('provisional', False):
+            # transcription so far while still speaking, overwritten by the next one
+            self.print(f"\rYou (speaking): {data['text']}", end="")
+            return
         if data['start']:
             self.print("You:", end=" ")
         self.print(data['text'], end="")
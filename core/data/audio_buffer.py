@@ -104,10 +104,13 @@ class AudioBuffer(BaseDataBuffer):
         frame_size = frame_size or self.default_frame_size
         chunk_len = 0
         data_packets = Queue()  # Maybe not necessary
+        last_packet = None
+        held_back_packet = None
         if self.leftover is not None:
             data_packets.put_nowait(self.leftover)
             chunk_len += len(self.leftover)
             self._len -= len(self.leftover)
+            last_packet = self.leftover
 
         while chunk_len < frame_size:
             try:
@@ -125,9 +128,14 @@ class AudioBuffer(BaseDataBuffer):
                     raise DataBufferEmpty
                 else:
                     break
+            if last_packet is not None and not last_packet.is_same_utterance(new_packet):
+                # never merge chunks of different utterances into one frame; keep it for the next frame
+                held_back_packet = new_packet
+                break
             data_packets.put_nowait(new_packet)
             chunk_len += len(new_packet)
             self._len -= len(new_packet)
+            last_packet = new_packet
 
         _data_packet_list = []
         while True:
@@ -146,7 +154,7 @@ class AudioBuffer(BaseDataBuffer):
             self.leftover = leftover
             self._len += len(leftover)
         else:
-            self.leftover = None
+            self.leftover = held_back_packet  # already accounted for in self._len
 
         return frame
 
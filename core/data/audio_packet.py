@@ -2,14 +2,16 @@ import json
 import time
 import numpy as np
 from decimal import *
-from typing import Type
+from typing import Type, List, Optional, Tuple
 
 from core.utils import logger
 from .data_packet import DataPacket
+from .exceptions import SequenceMismatchException
 
 class AudioPacket(DataPacket):
     """Represents a "Packet" of audio data."""
     resampling = 0
+    FLOAT_BYTES_PER_SAMPLE = 4  # `float` reads the bytes as float32 samples, whatever `sample_width` says
 
     def __init__(self, data_json, source: str=None, resample: bool = True, is_processed: bool = False, target_sample_rate: int = 16000):
         """Initialize AudioPacket from json data or bytes
@@ -32,6 +34,10 @@ class AudioPacket(DataPacket):
 
         # self._start = data_json.get("start", False)
         self._id: str = data_json.get("packetID")
+        # utterance chunks: all chunks of an utterance share an id, only the last one is not partial
+        self._utterance_id: str = data_json.get("utteranceID")
+        # speech spans detected by the VAD as absolute (start, end) timestamps in ms, None if unknown
+        self._speech_spans: Optional[List[Tuple[float, float]]] = data_json.get("speechSpans")
         # self._source: str = data_json.get("source", None)
 
 
@@ -60,7 +66,7 @@ class AudioPacket(DataPacket):
             if not Decimal(self._duration).compare(Decimal(_calculated_duration)) == 0:
                 logger.warning(f"Duration mismatch: {self._duration} != {_calculated_duration}")    
             
-        super().__init__(source=source, timestamp=data_json.get("timestamp"))
+        super().__init__(source=source, timestamp=data_json.get("timestamp"), partial=data_json.get("partial", False))
 
     def generate_timestamp(self):
         """Generate timestamp for AudioPacket based on its duration, given that a timestamp is not provided"""
@@ -122,6 +128,63 @@ class AudioPacket(DataPacket):
             raise ValueError("Cannot change id once set")
         self._id = value
 
+    @property
+    def utterance_id(self):
+        """Get id of the utterance this packet is a chunk of, if any"""
+        return self._utterance_id
+
+    @property
+    def partial(self):
+        """Whether more chunks of the same utterance are to follow"""
+        return self._partial
+
+    def mark_utterance(self, utterance_id: str, partial: bool) -> None:
+        """Tag the packet as a chunk of an utterance
+
+        Args:
+            utterance_id (str): id shared by all chunks of the utterance
+            partial (bool): True if more chunks of the same utterance are to follow
+        """
+        if self._utterance_id is not None and self._utterance_id != utterance_id:
+            raise ValueError("Cannot change utterance id once set")
+        self._utterance_id = utterance_id
+        self._partial = partial
+
+    @property
+    def speech_spans(self) -> Optional[List[Tuple[float, float]]]:
+        """Speech spans within the packet as absolute (start, end) timestamps in ms, None if unknown"""
+        return self._speech_spans
+
+    @speech_spans.setter
+    def speech_spans(self, spans: Optional[List[Tuple[float, float]]]) -> None:
+        if spans is not None:
+            spans = [(max(start, self.timestamp), min(end, self.ending_timestamp)) for start, end in spans]
+            spans = [(start, end) for start, end in spans if end > start]
+        self._speech_spans = spans
+
+    def trim_to_speech(self, padding: float = 100) -> "AudioPacket":
+        """Trim the silence around the speech spans, keeping some padding
+
+        Args:
+            padding (float): Silence in milliseconds to keep before the first and after the last speech span
+
+        Returns:
+            AudioPacket: The trimmed packet, or the packet itself if its speech spans are unknown or empty
+        """
+        if not self._speech_spans:
+            return self
+        bytes_per_ms = self.sample_rate * self.sample_width * self.num_channels / 1000
+        sample_size = self.FLOAT_BYTES_PER_SAMPLE * self.num_channels  # not to split float32 samples
+        start = int(max(0, self._speech_spans[0][0] - padding - self.timestamp) * bytes_per_ms) // sample_size * sample_size
+        stop = int(min(self.duration, self._speech_spans[-1][1] + padding - self.timestamp) * bytes_per_ms) // sample_size * sample_size
+        if start == 0 and stop >= len(self):
+            return self
+        return self[start:stop]
+
+    def is_same_utterance(self, _audio_packet: "AudioPacket") -> bool:
+        """Whether both packets can be part of the same utterance (untagged packets can be part of any)"""
+        return self.utterance_id is None or _audio_packet.utterance_id is None or self.utterance_id == _audio_packet.utterance_id
+
     def to_dict(self) -> dict:
         """Convert AudioPacket to dict
 
@@ -138,6 +201,9 @@ class AudioPacket(DataPacket):
                 "duration": self.duration,
                 # "start": self._start,
                 "packetID": self.id,
+                "utteranceID": self.utterance_id,
+                "partial": self.partial,
+                "speechSpans": self.speech_spans,
             }
         )
         return _dict
@@ -338,6 +404,11 @@ class AudioPacket(DataPacket):
                 f"Audio Packets are not in order: {self.timestamp} > {_audio_packet.timestamp}"
             )
 
+        if not self.is_same_utterance(_audio_packet):
+            raise SequenceMismatchException(
+                f"Cannot add chunks of different utterances: {self.utterance_id} + {_audio_packet.utterance_id}"
+            )
+
         # assert not (not self._start and _other._start)
         assert self.sample_rate == _audio_packet.sample_rate, f"Sample rates do not match: {self.sample_rate} != {_audio_packet.sample_rate}"
         assert self.num_channels == _audio_packet.num_channels, f"Num channels do not match: {self.num_channels} != {_audio_packet.num_channels}"
@@ -365,7 +436,12 @@ class AudioPacket(DataPacket):
                 "numChannels": _audio_packet.num_channels,
                 "sampleWidth": _audio_packet.sample_width,
                 # "start": self._start,
-                "packetID": self.id
+                "packetID": self.id,
+                "utteranceID": self.utterance_id or _audio_packet.utterance_id,
+                "partial": _audio_packet.partial,
+                # spans are only known if known for both
+                "speechSpans": None if self.speech_spans is None or _audio_packet.speech_spans is None \
+                    else self.speech_spans + _audio_packet.speech_spans,
             },
             source=self.source,
             resample=False,
@@ -422,7 +498,7 @@ class AudioPacket(DataPacket):
                 self.timestamp + float((start / self.frame_size)) * self.duration
             )
 
-            return AudioPacket(
+            sliced_audio_packet = AudioPacket(
                 {
                     "bytes": self.bytes[start:stop],
                     "timestamp": calculated_timestamp,
@@ -430,12 +506,17 @@ class AudioPacket(DataPacket):
                     "numChannels": self.num_channels,
                     "sampleWidth": self.sample_width,
                     # "start": self._start,
-                    "packetID": self._id
+                    "packetID": self._id,
+                    "utteranceID": self._utterance_id,
+                    # a head slice of the last chunk of an utterance is no longer the last one
+                    "partial": self.partial or (self._utterance_id is not None and stop < len(self)),
                 },
                 source=self.source,
                 resample=False,
                 is_processed=True,
             )
+            sliced_audio_packet.speech_spans = self._speech_spans  # clipped to the slice
+            return sliced_audio_packet
 
         elif isinstance(key, int):
             raise NotImplementedError("value as index; only slices")
@@ -446,7 +527,7 @@ class AudioPacket(DataPacket):
         
     
     def __str__(self) -> str:
-        return f"AudioPacket(t={self.timestamp}, d={self._duration}, s={len(self.bytes)}, src={self.source}, id={self.id})"
+        return f"AudioPacket(t={self.timestamp}, d={self._duration}, s={len(self.bytes)}, src={self.source}, id={self.id}, utt={self.utterance_id}, partial={self.partial})"
 
     def __eq__(self, __o: object) -> bool:
         return self.timestamp == __o.timestamp
@@ -1,5 +1,5 @@
 import time
-from typing import List
+from typing import List, Optional
 from core.utils import logger
 from .data_packet import DataPacket
 from .exceptions import SequenceMismatchException
@@ -25,6 +25,8 @@ class TextPacket(DataPacket):
         self._text = text
         assert isinstance(self._text, str), f"Text must be a string, got {type(self._text)}"
         self.commands = commands if commands else []
+        self.provisional: bool = False  # e.g. a transcription to be revised before the end of the turn
+        self.corrects: Optional[str] = None  # text of an earlier packet this one replaces, e.g. a wrong transcription
         for key, value in metadata.items():
             setattr(self, key, value)
 
@@ -60,7 +62,8 @@ class TextPacket(DataPacket):
             "partial": self._partial,
             "start": self._start,
             "commands": self.commands,
-            "timestamp": self.timestamp
+            "timestamp": self.timestamp,
+            "provisional": self.provisional,
         }
     
     @property
@@ -72,7 +75,7 @@ class TextPacket(DataPacket):
         return self._start
 
     def __str__(self):
-        return f'TextPacket(ts={self.timestamp}, text="{self._text}", partial={self._partial}, start={self._start}, src="{self.source})'
+        return f'TextPacket(ts={self.timestamp}, text="{self._text}", partial={self._partial}, start={self._start}, provisional={self.provisional}, src="{self.source})'
 
     def __eq__(self, other: 'TextPacket'):
         return self.timestamp == other.timestamp and self._text == other._text
@@ -87,15 +90,20 @@ class TextPacket(DataPacket):
         return self._text[key]
 
     def __add__(self, other: 'TextPacket'):
+        if self.provisional or other.provisional:
+            # a provisional packet is superseded by the next one rather than continued by it
+            raise SequenceMismatchException(f"Cannot add provisional packets: {self} + {other}")
         if self._partial != other._partial and self._timestamp >= 0:
             raise SequenceMismatchException("Cannot add partial and non-partial packets: {self} + {other}")
         if not self._start and other._start:
             raise SequenceMismatchException("Cannot add start and non-start packets: {self} + {other}")
 
-        return TextPacket(
+        text_packet = TextPacket(
             text=self._text + other.text,
             partial=self._partial if self._timestamp > -1 else other.partial,
             start=self._start,
             commands=self.commands + other.commands,
             timestamp=self._timestamp
-        )
\ No newline at end of file
+        )
+        text_packet.corrects = self.corrects
+        return text_packet
\ No newline at end of file
@@ -18,6 +18,7 @@ class PipelineStage(metaclass=ABCMeta):
 
     input_type = None
     output_type = None
+    is_gate = False  # forwards (some of) its input as is, e.g. to filter out audio not addressed to the agent
 
     def __init_subclass__(cls):
         if not any("input_type" in base.__dict__ for base in cls.__mro__ if base is not PipelineStage):
@@ -56,6 +57,7 @@ class PipelineStage(metaclass=ABCMeta):
         self._verbose = verbose
         self.__lock__ = Lock() # TODO option to disable lock
         self._on_ready_callback = lambda x: None
+        self._on_event_callback: Callable[[str, DataPacket], None] = lambda event, data: None
         self._host: 'HostNamespace' = None
         self._is_interrupt_forward_pending: bool = False
         self._is_interrupt_signal_pending: bool = False
@@ -96,6 +98,29 @@ class PipelineStage(metaclass=ABCMeta):
             raise ValueError("Callback must be callable")
         self._on_ready_callback = callback
 
+    @property
+    def on_event_callback(self) -> Callable[[str, DataPacket], None]:
+        return self._on_event_callback
+
+    @on_event_callback.setter
+    def on_event_callback(self, callback: Callable[[str, DataPacket], None]):
+        if not isinstance(callback, Callable):
+            raise ValueError("Callback must be callable")
+        self._on_event_callback = callback
+
+    def emit_event(self, event: str, data: DataPacket) -> None:
+        """Send a data packet off to the host right away, on a channel of its own
+        Unlike packed data, it bypasses the offloading and output buffers and the next stages, e.g. for the
+        actions of an embodied agent to fire as soon as they are known.
+
+        Args:
+            event (str): Name of the event channel, mapped to an emission function by the pipeline sequence.
+            data (DataPacket): Data packet to emit.
+        """
+        if data.source is None:
+            data.source = self.name
+        self._on_event_callback(event, data)
+
     def unpack(self) -> DataPacket:
         """Unpack data from input buffer and return a complete DataPacket
         This method collects data packets from the input buffer and combines them into a single DataPacket, that can be processed by the next stage in the pipeline.
@@ -153,6 +178,10 @@ class PipelineStage(metaclass=ABCMeta):
         self._offloading_buffer.put(data)  # Offload the data packet to the output buffer
         # We mark the complete data packet at the context of the stage as under digestion
         logger.debug(f"Packed data into offloading buffer for {self.__class__.__name__}: {data}")
+        if self.is_gate:
+            return  # forwarded input is not new data, it must not invalidate the streams in progress downstream
+        if getattr(data, "provisional", False):
+            return  # nor is input to be revised, e.g. a provisional transcription while the user is still speaking
         from ..context import Context
         Context().record_data_pack(data)
         logger.debug(f"Recorded data packet in context for {self.__class__.__name__}: {data}")
@@ -28,6 +28,7 @@ class PipelineSequence(PipelineStage, metaclass=ABCMeta):
         self._on_ready_callback = lambda x: None
         self._host: 'HostNamespace' = None
         self._response_emission_mapping: Dict[str, Callable[[DataPacket], None]] = {}
+        self._event_emission_mapping: Dict[str, Callable[[DataPacket], None]] = {}
     
     @property
     def response_emission_mapping(self) -> Dict[str, Callable[[DataPacket], None]]:
@@ -41,6 +42,18 @@ class PipelineSequence(PipelineStage, metaclass=ABCMeta):
             raise ValueError("Response emission mapping must be a dictionary.")
         self._response_emission_mapping = mapping
 
+    @property
+    def event_emission_mapping(self) -> Dict[str, Callable[[DataPacket], None]]:
+        """Mapping of event channels (see PipelineStage.emit_event) to their emission functions"""
+        return self._event_emission_mapping
+
+    @event_emission_mapping.setter
+    def event_emission_mapping(self, mapping: Dict[str, Callable[[DataPacket], None]]):
+        """Setter for event emission mapping"""
+        if not isinstance(mapping, dict):
+            raise ValueError("Event emission mapping must be a dictionary.")
+        self._event_emission_mapping = mapping
+
     def add_stage(self, stage: PipelineStage):
         self._stages.append(stage)
         # ensure the new stage has a unique name
@@ -63,7 +76,7 @@ class PipelineSequence(PipelineStage, metaclass=ABCMeta):
             """Custom callback to handle data packet when stage is done with producing data packet and about to send it off"""
             # is this stage the last stage in the pipeline?
             # is_last_stage = stage == self._stages[-1]
-            if stage == self._stages[0]:
+            if stage == self._interrupting_stage:
                 self._host.emit_interrupt(data_packet.timestamp)
             
             # If there is a response emission mapping for this stage, use it
@@ -76,6 +89,18 @@ class PipelineSequence(PipelineStage, metaclass=ABCMeta):
 
         return custom_on_ready_callback
 
+    def build_custom_on_event_callback(self, stage: PipelineStage) -> Callable[[str, DataPacket], None]:
+        """Build a custom on_event_callback for each stage, emitting its events through the host"""
+
+        def custom_on_event_callback(event: str, data_packet: DataPacket):
+            event_emission_callback = self.event_emission_mapping.get(event, None)
+            if event_emission_callback is None:
+                logger.debug(f"No event emission mapping defined for {event} of {stage.name}, dropping {data_packet}")
+                return
+            event_emission_callback(data_packet)
+
+        return custom_on_event_callback
+
     def on_start(self):
         """Setting up the pipeline sequence"""
         logger.info(f"Starting pipeline sequence {self.name} with stages: {[stage.name for stage in self._stages]}")
@@ -152,6 +177,9 @@ class PipelineSequence(PipelineStage, metaclass=ABCMeta):
                 stage.on_interrupt(exception.timestamp)
 
 
+        # the first stage producing new data (e.g. utterances) interrupts, gates in front of it only forward their input
+        self._interrupting_stage = next((stage for stage in self._stages if not stage.is_gate), self._stages[0])
+
         for stage in self._stages:
             logger.info(f"Starting stage {stage} with input type {stage.input_type} and output type {stage.output_type}")
             # Set the on_ready_callback for each stage based on the response_emission_mapping
@@ -161,6 +189,7 @@ class PipelineSequence(PipelineStage, metaclass=ABCMeta):
             else:
                 logger.debug(f"No response emission mapping defined for {stage.name}, using default callback")
             stage.on_ready_callback = self.build_custom_on_ready_callback(stage)
+            stage.on_event_callback = self.build_custom_on_event_callback(stage)
             stage.on_incoming_packet_while_processing_callback = on_incoming_packet_while_processing_callback
             stage.on_invalidated_packet_callback = on_invalidated_packet_callback
             # Start the stage
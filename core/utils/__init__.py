@@ -1,2 +1,3 @@
 from .timer import Timer
-from .logger import logger
\ No newline at end of file
+from .logger import logger
+from .latency import LatencyDistribution
\ No newline at end of file
@@ -0,0 +1,68 @@
+import numpy as np
+from typing import Dict
+
+
+def mel_filterbank(num_bands: int, n_fft: int, sample_rate: int) -> np.ndarray:
+    """Triangular mel filters of shape (num_bands, n_fft // 2 + 1)"""
+    def hz_to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700)
+
+    def mel_to_hz(mel):
+        return 700 * (10 ** (mel / 2595) - 1)
+
+    edges = mel_to_hz(np.linspace(hz_to_mel(60), hz_to_mel(min(7600, sample_rate / 2)), num_bands + 2))
+    bins = np.fft.rfftfreq(n_fft, 1 / sample_rate)
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (bins - lower) / (center - lower)
+    falling = (upper - bins) / (upper - center)
+    return np.maximum(0, np.minimum(rising, falling)).astype(np.float32)
+
+
+class LogMelFingerprinter:
+    """Compact acoustic fingerprint of a short stretch of audio
+
+    The fingerprint is a log-mel spectrogram with the mean of every band removed (so that the microphone gain
+    and channel do not matter), stretched to a fixed number of frames (so that the speaking rate matters less),
+    and L2-normalized; two utterances of the same words have a high cosine similarity.
+    """
+
+    def __init__(self, num_bands: int = 24, num_frames: int = 32):
+        """
+        Args:
+            num_bands (int): Number of mel bands.
+            num_frames (int): Number of frames the spectrogram is stretched to.
+        """
+        self.num_bands = num_bands
+        self.num_frames = num_frames
+        self._filterbanks: Dict[int, np.ndarray] = {}
+
+    @property
+    def size(self) -> int:
+        return self.num_bands * self.num_frames
+
+    def __call__(self, samples: np.ndarray, sample_rate: int) -> np.ndarray:
+        """Compute the fingerprint of float32 mono samples
+
+        Returns:
+            np.ndarray: L2-normalized vector of `num_bands * num_frames` values
+        """
+        window, hop = int(0.025 * sample_rate), int(0.010 * sample_rate)
+        n_fft = 1 << (window - 1).bit_length()
+        samples = np.ascontiguousarray(samples, dtype=np.float32)
+        if len(samples) < window:
+            samples = np.pad(samples, (0, window - len(samples)))
+        num_windows = 1 + (len(samples) - window) // hop
+        frames = np.lib.stride_tricks.as_strided(
+            samples, shape=(num_windows, window), strides=(samples.strides[0] * hop, samples.strides[0])
+        ) * np.hanning(window).astype(np.float32)
+        power = np.abs(np.fft.rfft(frames, n=n_fft)) ** 2
+        if sample_rate not in self._filterbanks:
+            self._filterbanks[sample_rate] = mel_filterbank(self.num_bands, n_fft, sample_rate)
+        log_mel = np.log(power @ self._filterbanks[sample_rate].T + 1e-8)
+        log_mel -= log_mel.mean(axis=0)
+
+        # stretch to a fixed number of frames
+        positions = np.linspace(0, num_windows - 1, self.num_frames)
+        stretched = np.stack([np.interp(positions, np.arange(num_windows), band) for band in log_mel.T], axis=1)
+        embedding = stretched.astype(np.float32).ravel()
+        return embedding / (np.linalg.norm(embedding) + 1e-8)
@@ -0,0 +1,64 @@
+import math
+import time
+import random
+from typing import Optional
+
+
+class LatencyDistribution:
+    """Seeded latency distribution (in milliseconds) used to simulate endpoint delays"""
+
+    KINDS = ("constant", "uniform", "normal", "lognormal")
+
+    def __init__(
+        self,
+        mean_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        kind: str = "normal",
+        seed: Optional[int] = 0,
+    ):
+        """
+        Args:
+            mean_ms (float): Mean latency in milliseconds.
+            jitter_ms (float): Spread of the distribution in milliseconds (std for normal/lognormal, half-width for uniform).
+            kind (str): One of "constant", "uniform", "normal" or "lognormal".
+            seed (Optional[int]): Seed of the random generator, so that runs are reproducible.
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution {kind}, available: {self.KINDS}")
+        if mean_ms < 0 or jitter_ms < 0:
+            raise ValueError("Latency mean and jitter must be non-negative")
+        self.mean_ms = mean_ms
+        self.jitter_ms = jitter_ms
+        self.kind = kind
+        self._rng = random.Random(seed)
+
+    def sample(self) -> float:
+        """Sample a latency in milliseconds (never negative)"""
+        if self.kind == "constant" or self.jitter_ms == 0:
+            value = self.mean_ms
+        elif self.kind == "uniform":
+            value = self._rng.uniform(self.mean_ms - self.jitter_ms, self.mean_ms + self.jitter_ms)
+        elif self.kind == "normal":
+            value = self._rng.gauss(self.mean_ms, self.jitter_ms)
+        else:
+            # lognormal parametrized by its mean and std rather than the underlying normal
+            if self.mean_ms == 0:
+                return 0.0
+            sigma2 = math.log(1 + (self.jitter_ms / self.mean_ms) ** 2)
+            mu = math.log(self.mean_ms) - sigma2 / 2
+            value = self._rng.lognormvariate(mu, math.sqrt(sigma2))
+        return max(0.0, value)
+
+    def wait(self, scale: float = 1.0) -> float:
+        """Sleep for a sampled latency, optionally scaled (e.g. by the number of chunks)
+
+        Returns:
+            float: The slept latency in milliseconds
+        """
+        latency_ms = self.sample() * scale
+        if latency_ms > 0:
+            time.sleep(latency_ms / 1000)
+        return latency_ms
+
+    def __str__(self):
+        return f"LatencyDistribution(kind={self.kind}, mean={self.mean_ms}ms, jitter={self.jitter_ms}ms)"
@@ -59,6 +59,9 @@ class SocketIONamespace(HostNamespace):
     def emit_stt_response(self, text_packet: TextPacket) -> None:
         self.__emit__("stt_response", text_packet)
 
+    def emit_bot_command(self, text_packet: TextPacket) -> None:
+        self.__emit__("bot_command", text_packet)
+
     def emit_interrupt(self, timestamp: int) -> None:
         self.server.emit("interrupt", timestamp) 
 
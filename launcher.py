@@ -1,5 +1,5 @@
 import sys
-import os, argparse
+import os, argparse, json
 import torch
 from dotenv import load_dotenv
 
@@ -18,14 +18,37 @@ if __name__ == "__main__":
     )
     parser.add_argument(
         "--bot_endpoint", dest="bot_endpoint", type=str, default="openai",
-        choices=["openai", "ollama"],
+        choices=["openai", "ollama", "openai_http", "ollama_http", "fake"],
         help="Bot Conversational Endpoint"
     )
     parser.add_argument(
         "--tts_endpoint", dest="tts_endpoint", type=str, default="xtts",
-        choices=["pyttsx3", "gtts", "elevenlabs", "xtts"],
+        choices=["pyttsx3", "gtts", "elevenlabs", "xtts", "fake"],
         help="TTS Endpoint"
     )
+    parser.add_argument(
+        "--vad_endpoint", dest="vad_endpoint", type=str, default="silero",
+        choices=["silero", "silero-onnx", "webrtc", "fake"],
+        help="VAD Endpoint"
+    )
+    parser.add_argument(
+        "--stt_endpoint", dest="stt_endpoint", type=str, default="faster_whisper",
+        choices=["faster_whisper", "fake"],
+        help="STT Endpoint"
+    )
+    parser.add_argument(
+        "--wakeword_endpoint", dest="wakeword_endpoint", type=str, default=None,
+        choices=["cascade", "audio_classification", "template", "energy", "fake"],
+        help="Wake Word Endpoint gating the audio before the VAD, none by default"
+    )
+    parser.add_argument(
+        "--endpoint_kwargs", dest="endpoint_kwargs", type=str, default=None,
+        help="JSON string or file path with per-stage endpoint kwargs, e.g. '{\"bot\": {\"time_to_first_chunk_ms\": 300}}'"
+    )
+    parser.add_argument(
+        "--stage_kwargs", dest="stage_kwargs", type=str, default=None,
+        help="JSON string or file path with per-stage kwargs, e.g. '{\"stt\": {\"streaming\": true}}'"
+    )
     parser.add_argument(
         "--port", dest="port", type=int, default=4000, help="Port number"
     )
@@ -79,10 +102,10 @@ if __name__ == "__main__":
     # Set default persona configs if none provided
     persona_configs = args.persona
     if persona_configs is None:
-        if args.bot_endpoint == "openai":
+        if args.bot_endpoint in ["openai", "openai_http", "fake"]:
             # Default persona config for OpenAI endpoint
             persona_configs = {"assistant_name": "Marvin"}
-        elif args.bot_endpoint == "ollama":
+        elif args.bot_endpoint in ["ollama", "ollama_http"]:
             # Default persona config for Ollama endpoint - use a default persona file
             persona_configs = "mangrove/bot/persona/default_persona.json"
 
@@ -91,16 +114,33 @@ if __name__ == "__main__":
         # Text-only mode: only need bot endpoint
         endpoints = {"bot": args.bot_endpoint}
     else:
-        # Voice mode: need both bot and TTS endpoints
+        # Voice mode: need VAD, STT, bot and TTS endpoints
         endpoints = {
+            "vad": args.vad_endpoint,
+            "stt": args.stt_endpoint,
             "bot": args.bot_endpoint,
-            "tts": args.tts_endpoint
+            "tts": args.tts_endpoint,
+            "wakeword": args.wakeword_endpoint,
         }
 
+    def _load_json_arg(value):
+        # JSON string or path to a JSON file
+        if not value:
+            return {}
+        if os.path.isfile(value):
+            with open(value, "r") as f:
+                return json.load(f)
+        return json.loads(value)
+
+    endpoints_kwargs = _load_json_arg(args.endpoint_kwargs)
+    stages_kwargs = _load_json_arg(args.stage_kwargs)
+
     agent = BasicConversationalAgent(
         text_only=args.text_only,
         endpoints=endpoints,
         persona_configs=persona_configs,
+        endpoints_kwargs=endpoints_kwargs,
+        stages_kwargs=stages_kwargs,
         device=device,
         verbose=args.debug,
     )
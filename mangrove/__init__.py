@@ -1,4 +1,5 @@
 from .bot import BotStage
 from .tts import TTSStage
 from .vad import VADStage
-from .stt import STTStage
\ No newline at end of file
+from .stt import STTStage
+from .wakeword import WakeWordStage
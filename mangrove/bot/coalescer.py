@@ -0,0 +1,136 @@
+import re
+import time
+import queue
+import threading
+from typing import Callable, Iterator, List, Optional, Tuple
+
+PHRASE_END_PATTERN = re.compile(r"[.,!?;:](?=\s)")
+
+
+class ChunkCoalescer:
+    """Groups the chunks of a streamed response, often single tokens, into word or phrase sized ones
+
+    Every chunk sent off costs a packet record, a socket emission and a TTS call; coalescing sends a chunk
+    once it ends with a whole word (`word`) or phrase (`phrase`), or once its first part has been held back
+    `max_delay` ms or it reached `max_chars` characters. The delay is checked as chunks arrive, and by
+    `take_due` at the `deadline`, e.g. while the LLM stalls (see `iter_with_deadline`).
+    """
+
+    GRANULARITIES = ["token", "word", "phrase"]
+
+    def __init__(self, granularity: str = "word", max_delay: float = 100, max_chars: int = 200):
+        """
+        Args:
+            granularity (str): `token` (no coalescing), `word` or `phrase`.
+            max_delay (float): Milliseconds after which held back text is sent off, even mid-word.
+            max_chars (int): Number of characters from which held back text is sent off.
+        """
+        if granularity not in self.GRANULARITIES:
+            raise ValueError(f"Unknown granularity {granularity}, available granularities: {', '.join(self.GRANULARITIES)}")
+        self._granularity = granularity
+        self._max_delay = max_delay / 1000
+        self._max_chars = max_chars
+        self._text: str = ""
+        self._commands: List[str] = []
+        self._held_since: Optional[float] = None
+
+    def _boundary(self) -> int:
+        """Length of the held back text up to its last whole word or phrase, 0 if none"""
+        if self._granularity == "token":
+            return len(self._text)
+        if self._granularity == "phrase":
+            match = None
+            for match in PHRASE_END_PATTERN.finditer(self._text):
+                pass
+            return match.end() if match is not None else 0
+        # the whitespace starting the next word ends the previous one
+        stripped = self._text.rstrip()
+        boundary = max(stripped.rfind(" "), stripped.rfind("\n"))
+        if len(stripped) < len(self._text):
+            boundary = len(stripped)
+        return max(boundary, 0)
+
+    def _take(self, length: int) -> Tuple[str, List[str]]:
+        text, self._text = self._text[:length], self._text[length:]
+        commands, self._commands = self._commands, []
+        self._held_since = time.perf_counter() if self._text else None
+        return text, commands
+
+    def feed(self, text: str, commands: List[str] = []) -> Optional[Tuple[str, List[str]]]:
+        """Add a chunk of the response
+
+        Returns:
+            Optional[Tuple[str, List[str]]]: text and commands to send off, if any
+        """
+        if not text and not commands:
+            return None
+        if self._held_since is None:
+            self._held_since = time.perf_counter()
+        self._text += text
+        self._commands += commands
+        if len(self._text) >= self._max_chars or time.perf_counter() - self._held_since >= self._max_delay:
+            return self._take(self._boundary() or len(self._text))
+        boundary = self._boundary()
+        if boundary > 0:
+            return self._take(boundary)
+        return None
+
+    @property
+    def deadline(self) -> Optional[float]:
+        """`time.perf_counter()` value by which the text held back is due, if any is held back"""
+        if self._held_since is None:
+            return None
+        return self._held_since + self._max_delay
+
+    def take_due(self) -> Optional[Tuple[str, List[str]]]:
+        """Text and commands held back for `max_delay` ms or more, if any"""
+        if self._held_since is None or time.perf_counter() - self._held_since < self._max_delay:
+            return None
+        return self._take(self._boundary() or len(self._text))
+
+    def flush(self) -> Optional[Tuple[str, List[str]]]:
+        """End of the response: the text and commands held back, if any"""
+        if not self._text and not self._commands:
+            return None
+        return self._take(len(self._text))
+
+
+def iter_with_deadline(stream: Iterator[str], deadline: Callable[[], Optional[float]]) -> Iterator[Optional[str]]:
+    """Iterate over the chunks of a stream read in a background thread, yielding None whenever the deadline
+    (a `time.perf_counter()` value, if any) passes while waiting for the next chunk, e.g. when the LLM stalls
+
+    Closing the iterator stops the reading: the stream is closed by the reading thread after its next chunk.
+    """
+    chunks: queue.Queue = queue.Queue()
+    is_stopped = threading.Event()
+    end = object()
+
+    def read():
+        try:
+            for chunk in stream:
+                chunks.put(chunk)
+                if is_stopped.is_set():
+                    break
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            if hasattr(stream, "close"):
+                stream.close()
+            chunks.put(end)
+
+    threading.Thread(target=read, name="llm-stream-reader", daemon=True).start()
+    try:
+        while True:
+            due = deadline()
+            try:
+                item = chunks.get(timeout=None if due is None else max(0.0, due - time.perf_counter()))
+            except queue.Empty:
+                yield None
+                continue
+            if item is end:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        is_stopped.set()
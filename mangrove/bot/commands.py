@@ -0,0 +1,67 @@
+from typing import List, Tuple
+
+from core.utils import logger
+
+
+class CommandParser:
+    """Incremental parser of the bracketed action commands, e.g. `[Follow User]`, of a streamed response
+
+    Chunks are fed as they stream out of the LLM, whatever their boundaries: the text outside brackets is
+    returned as is, and every command is returned as soon as its closing bracket is fed.
+    """
+
+    TEXT = "text"
+    COMMAND = "command"
+
+    def __init__(self, max_command_length: int = 64):
+        """
+        Args:
+            max_command_length (int): Number of characters after which an opened bracket is not taken as a command,
+                its content being given back as text.
+        """
+        self._max_command_length = max_command_length
+        self.reset()
+
+    def reset(self) -> None:
+        self._state: str = self.TEXT
+        self._command: List[str] = []
+
+    @property
+    def is_in_command(self) -> bool:
+        """Whether a bracket was opened and not closed yet"""
+        return self._state == self.COMMAND
+
+    def feed(self, chunk: str) -> Tuple[str, List[str]]:
+        """Parse the next chunk of the response
+
+        Returns:
+            Tuple[str, List[str]]: text of the chunk without its commands, and the commands closed within it
+        """
+        text: List[str] = []
+        commands: List[str] = []
+        for char in chunk:
+            if self._state == self.TEXT:
+                if char == "[":
+                    self._state = self.COMMAND
+                    self._command = []
+                else:
+                    text.append(char)
+            elif char == "]":
+                command = "".join(self._command).strip()
+                if command:
+                    commands.append(command)
+                self._state = self.TEXT
+            elif char == "[":
+                self._command = []  # the bracket opened earlier was never closed, restart from this one
+            elif len(self._command) >= self._max_command_length:
+                text.append("[" + "".join(self._command) + char)
+                self._state = self.TEXT
+            else:
+                self._command.append(char)
+        return "".join(text), commands
+
+    def flush(self) -> None:
+        """End of the response: drop the command left unclosed, if any"""
+        if self._state == self.COMMAND:
+            logger.warning(f"Dropping unclosed command at the end of the response: [{''.join(self._command)}")
+        self.reset()
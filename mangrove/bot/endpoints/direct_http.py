@@ -0,0 +1,196 @@
+import os
+import json
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Dict, Iterator, List, Optional
+from langchain_core.messages import BaseMessage
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable, RunnableLambda
+
+from core.utils import logger
+from ..persona.base import BotPersona
+from .base import ConversationalChainEndpoint, NotSetupYetError
+
+ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+
+class ResponsePostprocessor:
+    """Incremental postprocessing of a streamed response: newlines become spaces, and a leading
+    `{assistant_name}:` speaker label is dropped, the start of the response being held back only until
+    it is known not to be the label
+    """
+
+    def __init__(self, assistant_name: Optional[str] = None):
+        self._label: Optional[str] = f"{assistant_name}:" if assistant_name else None
+        self._head: str = ""
+        self._started: bool = self._label is None
+
+    def feed(self, chunk: str) -> str:
+        chunk = chunk.replace("\n", " ")
+        if self._started:
+            return chunk
+        self._head += chunk
+        stripped_head = self._head.lstrip()
+        if len(stripped_head) < len(self._label) and self._label.startswith(stripped_head):
+            return ""  # may still be the label
+        self._started = True
+        if stripped_head.startswith(self._label):
+            return stripped_head[len(self._label):].lstrip()
+        return self._head
+
+    def flush(self) -> str:
+        """Text held back at the end of the response, if any"""
+        if self._started:
+            return ""
+        self._started = True
+        return self._head
+
+
+class DirectStreamingEndpoint(ConversationalChainEndpoint):
+    """Conversational endpoint streaming from an Ollama or OpenAI-compatible HTTP API directly
+
+    The prompt is built by the persona once per response; the chunks then go from the pooled, kept-alive
+    HTTP connection through an incremental postprocessing only, rather than through the runnables, output
+    parser and callbacks of a LangChain chain.
+    """
+
+    def __init__(
+        self,
+        api: str = "ollama",
+        model: Optional[str] = None,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        temperature: float = 0.8,
+        max_tokens: int = 256,
+        options: Dict = {},
+        timeout: float = 60.0,
+        pool_maxsize: int = 4,
+        warm_up: bool = True,
+    ):
+        """
+        Args:
+            api (str): `ollama` (/api/chat) or `openai` (/chat/completions, e.g. OpenAI, vLLM, llama.cpp server).
+            model (str, optional): Model name; defaults to `qwen3:8b` for Ollama and `gpt-4o` for OpenAI.
+            base_url (str, optional): Base URL of the API; defaults to $OLLAMA_HOST or http://localhost:11434 for Ollama,
+                and to $OPENAI_BASE_URL or https://api.openai.com/v1 for OpenAI.
+            api_key (str, optional): API key of an OpenAI-compatible API; defaults to $OPENAI_API_KEY.
+            temperature (float): Sampling temperature.
+            max_tokens (int): Maximum number of tokens of a response.
+            options (Dict): Additional fields of the request, e.g. {"keep_alive": "30m"} for Ollama.
+            timeout (float): Seconds to wait for the connection and for each chunk.
+            pool_maxsize (int): Number of connections kept alive, e.g. for speculative responses and summaries in parallel.
+            warm_up (bool): Whether to open a connection, and load the model for Ollama, at setup.
+        """
+        if api == "ollama":
+            self._model = model or "qwen3:8b"
+            base_url = base_url or os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+            if not base_url.startswith("http"):
+                base_url = f"http://{base_url}"
+            self._url = f"{base_url.rstrip('/')}/api/chat"
+        elif api == "openai":
+            self._model = model or "gpt-4o"
+            base_url = base_url or os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1")
+            self._url = f"{base_url.rstrip('/')}/chat/completions"
+        else:
+            raise Exception(f"Unknown API {api}, available APIs: ollama, openai")
+        self._api = api
+        self._temperature = temperature
+        self._max_tokens = max_tokens
+        self._options = options
+        self._timeout = timeout
+        self._warm_up = warm_up
+
+        self._session = requests.Session()
+        self._session.mount(base_url, HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize))
+        api_key = api_key or os.environ.get("OPENAI_API_KEY")
+        if api == "openai" and api_key:
+            self._session.headers["Authorization"] = f"Bearer {api_key}"
+        self._llm: Runnable = RunnableLambda(self._complete).with_config({"run_name": "DirectStreamingModel"})
+
+    @property
+    def llm(self) -> Runnable:
+        """Non-streaming completion of a prompt, e.g. to summarize the chat history"""
+        return self._llm
+
+    def setup(self, persona: BotPersona):
+        self._persona: BotPersona = persona
+        logger.info(f"Streaming {self._model} from {self._url} directly")
+        if self._warm_up:
+            try:
+                if self._api == "ollama":
+                    # a chat request without messages loads the model
+                    self._session.post(self._url, json={"model": self._model, "messages": []}, timeout=self._timeout).raise_for_status()
+                else:
+                    self._session.head(self._url, timeout=self._timeout)
+            except requests.RequestException as e:
+                logger.warning(f"Failed to warm up {self._url}: {e}")
+
+    @property
+    def persona(self) -> BotPersona:
+        if not hasattr(self, '_persona'):
+            raise NotSetupYetError("You must call setup() before accessing the persona")
+        return self._persona
+
+    @staticmethod
+    def _message_to_dict(message: BaseMessage) -> Dict[str, str]:
+        content = message.content
+        if not isinstance(content, str):
+            # content blocks, as produced by the persona prompt templates
+            content = "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
+        return {"role": ROLES.get(message.type, "user"), "content": content}
+
+    def _payload(self, messages: List[BaseMessage], stream: bool) -> Dict:
+        payload = {
+            "model": self._model,
+            "messages": [self._message_to_dict(message) for message in messages],
+            "stream": stream,
+        }
+        if self._api == "ollama":
+            payload["options"] = {"temperature": self._temperature, "num_predict": self._max_tokens}
+        else:
+            payload.update(temperature=self._temperature, max_tokens=self._max_tokens)
+        payload.update(self._options)
+        return payload
+
+    def _iter_contents(self, response: requests.Response) -> Iterator[str]:
+        # chunk_size=None reads the lines as they arrive, rather than in blocks of 512 bytes
+        for line in response.iter_lines(chunk_size=None):
+            if not line:
+                continue
+            if self._api == "ollama":
+                data = json.loads(line)
+                if "error" in data:
+                    raise RuntimeError(f"Ollama error: {data['error']}")
+                yield data.get("message", {}).get("content", "")
+                if data.get("done"):
+                    return
+            else:
+                if not line.startswith(b"data:"):
+                    continue
+                line = line[len(b"data:"):].strip()
+                if line == b"[DONE]":
+                    return
+                choices = json.loads(line).get("choices") or [{}]
+                yield choices[0].get("delta", {}).get("content") or ""
+
+    def _complete(self, prompt: PromptValue) -> str:
+        response = self._session.post(self._url, json=self._payload(prompt.to_messages(), stream=False), timeout=self._timeout)
+        response.raise_for_status()
+        data = response.json()
+        if self._api == "ollama":
+            return data["message"]["content"]
+        return data["choices"][0]["message"]["content"]
+
+    def stream(self, user_msg, chat_history: List[BaseMessage]) -> Iterator[str]:
+        # the persona chain runs once per response, to retrieve the context and format the prompt
+        prompt: PromptValue = self.persona.respond_chain.invoke(self.persona.construct_input(user_msg, chat_history))
+        postprocessor = ResponsePostprocessor(getattr(self.persona, "assistant_name", None))
+        with self._session.post(self._url, json=self._payload(prompt.to_messages(), stream=True), stream=True, timeout=self._timeout) as response:
+            response.raise_for_status()
+            for content in self._iter_contents(response):
+                text = postprocessor.feed(content)
+                if text:
+                    yield text
+        text = postprocessor.flush()
+        if text:
+            yield text
@@ -0,0 +1,61 @@
+import re
+import zlib
+from typing import Iterator, List
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import RunnableGenerator
+
+from core.utils import LatencyDistribution
+from .base import LangchainCompatibleConversationalChainEndpoint
+
+DEFAULT_RESPONSES = [
+    "Hey there, partner. The Mangrove is safe while I'm around.",
+    "I'm Marvin, protector of the Mangrove. Nobody messes with my trees.",
+    "You got it, I'm right behind you. [Follow User]",
+    "Taking a breather. [Sit Down]",
+    "Alright, I'll hold my ground here. [Stop Following User]",
+    "The Palmerians are sniveling rats. They don't stand a chance against me and Whiskers.",
+]
+
+class FakeChatEndpoint(LangchainCompatibleConversationalChainEndpoint):
+    """Deterministic conversational endpoint for offline benchmarking
+    The response is picked from `responses` by a checksum of the user message and streamed
+    word by word with the configured time to first chunk and per-chunk latency.
+    """
+
+    def __init__(
+        self,
+        responses: List[str] = DEFAULT_RESPONSES,
+        time_to_first_chunk_ms: float = 0.0,
+        time_per_chunk_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        latency_distribution: str = "normal",
+        seed: int = 0,
+        **llm_kwargs
+    ):
+        if not responses:
+            raise ValueError("At least one response is required")
+        self._responses = list(responses)
+        self._first_chunk_latency = LatencyDistribution(time_to_first_chunk_ms, jitter_ms, kind=latency_distribution, seed=seed)
+        self._per_chunk_latency = LatencyDistribution(time_per_chunk_ms, jitter_ms, kind=latency_distribution, seed=seed + 1)
+        self._llm = RunnableGenerator(self._generate).with_config({"run_name": "FakeChatModel"})
+
+    @property
+    def llm(self):
+        return self._llm
+
+    @staticmethod
+    def _message_text(content) -> str:
+        if isinstance(content, str):
+            return content
+        # multimodal content blocks, as produced by the persona prompt templates
+        return "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
+
+    def _generate(self, prompts: Iterator[PromptValue]) -> Iterator[str]:
+        for prompt in prompts:
+            user_msg = self._message_text(prompt.to_messages()[-1].content)
+            response = self._responses[zlib.crc32(user_msg.encode("utf-8")) % len(self._responses)]
+            self._first_chunk_latency.wait()
+            for i, chunk in enumerate(re.findall(r"\s*\S+", response)):
+                if i > 0:
+                    self._per_chunk_latency.wait()
+                yield chunk
@@ -0,0 +1,184 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
+
+from core.utils import logger
+
+SUMMARY_PROMPT = ChatPromptTemplate.from_messages([
+    ("system",
+     "You maintain a running summary of a conversation between a user and {assistant_name}. "
+     "Update the summary with the new exchanges, keeping the facts, requests and actions that may matter later. "
+     "Answer with the updated summary only, in at most {max_words} words."),
+    ("human", "Summary so far:\n{summary}\n\nNew exchanges:\n{exchanges}"),
+])
+
+
+def approximate_num_tokens(text: str) -> int:
+    """Rough number of tokens of English text, about four characters per token"""
+    return len(text) // 4 + 1
+
+
+class ChatHistory:
+    """Chat history kept within a token budget
+
+    The last `keep_last_turns` turns (user message and response) are kept verbatim, fewer if they exceed the
+    token budget. Once a turn ends beyond either limit, older turns are folded into a running summary by a
+    background thread, so that summarizing is never on the critical path; until a fold completes, the turns
+    being folded are still given verbatim. A fold goes down to `fold_ratio` of both limits, so that the
+    summary and the leading turns, i.e. the prefix of the prompt, stay the same over the next turns.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 2000,
+        keep_last_turns: int = 6,
+        summarizer: Optional[Runnable] = None,
+        assistant_name: str = "the assistant",
+        max_summary_words: int = 150,
+        fold_ratio: float = 0.5,
+        count_tokens: Callable[[str], int] = approximate_num_tokens,
+    ):
+        """
+        Args:
+            token_budget (int): Maximum number of tokens of the summary and the verbatim turns.
+            keep_last_turns (int): Maximum number of most recent turns kept verbatim, at least 1.
+            summarizer (Runnable, optional): Chat model folding old turns into the summary; without it, old turns are dropped.
+            assistant_name (str): Name of the assistant in the summary prompt.
+            max_summary_words (int): Maximum length of the summary in words.
+            fold_ratio (float): Fraction of `keep_last_turns` and of the token budget kept after a fold, in (0, 1].
+            count_tokens (Callable[[str], int]): Number of tokens of a text.
+        """
+        if keep_last_turns < 1:
+            raise ValueError("keep_last_turns must be at least 1")
+        if not 0 < fold_ratio <= 1:
+            raise ValueError("fold_ratio must be in (0, 1]")
+        self._token_budget = token_budget
+        self._keep_last_turns = keep_last_turns
+        self._fold_ratio = fold_ratio
+        self._summary_chain: Optional[Runnable] = None
+        if summarizer is not None:
+            self._summary_chain = (
+                SUMMARY_PROMPT.partial(assistant_name=assistant_name, max_words=str(max_summary_words))
+                | summarizer
+                | StrOutputParser()
+            ).with_config({"run_name": "ChatHistorySummaryChain"})
+        self._count_tokens = count_tokens
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-history-summarizer")
+
+        self._summary: str = ""
+        self._messages: List[BaseMessage] = []  # verbatim, oldest first
+        self._num_folding: int = 0  # number of oldest verbatim messages being folded into the summary
+
+    @property
+    def summary(self) -> str:
+        return self._summary
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        """Messages to prompt with: the summary, if any, followed by the verbatim turns"""
+        with self._lock:
+            messages = list(self._messages)
+            if self._summary:
+                messages.insert(0, SystemMessage(content=f"Summary of the earlier conversation: {self._summary}"))
+            return messages
+
+    @property
+    def num_tokens(self) -> int:
+        return sum(self._count_tokens(message.content) for message in self.messages)
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def add_user_message(self, content: str) -> None:
+        with self._lock:
+            self._messages.append(HumanMessage(content=content))
+
+    def add_ai_message(self, content: str) -> None:
+        """Add the response ending the turn, and fold old turns in the background if needed"""
+        with self._lock:
+            self._messages.append(AIMessage(content=content))
+        self._schedule_fold()
+
+    def pop_ai_message(self) -> AIMessage:
+        """Remove the last response, e.g. when it was interrupted before being heard"""
+        with self._lock:
+            assert len(self._messages) > self._num_folding, "Chat history should not be empty when popping"
+            assert isinstance(self._messages[-1], AIMessage), "Last message in chat history should be AIMessage when popping"
+            return self._messages.pop()
+
+    def pop_turn(self, user_msg: str) -> bool:
+        """Remove the last turn if it is the one of the user message, e.g. when its transcription was wrong
+
+        Returns:
+            bool: Whether the turn was removed
+        """
+        with self._lock:
+            if len(self._messages) - self._num_folding < 2 or not isinstance(self._messages[-1], AIMessage) or \
+                not isinstance(self._messages[-2], HumanMessage) or self._messages[-2].content != user_msg:
+                return False
+            del self._messages[-2:]
+            return True
+
+    def wait_for_fold(self) -> None:
+        """Wait for the ongoing fold, if any, e.g. for a benchmark to be reproducible"""
+        self._executor.submit(lambda: None).result()
+
+    def _num_messages_to_fold(self) -> int:
+        """Number of oldest verbatim messages to fold: none within the limits, else enough to be back within
+        `fold_ratio` of them"""
+        if self._num_messages_beyond(self._keep_last_turns, self._token_budget) == 0:
+            return 0
+        return self._num_messages_beyond(
+            max(1, int(self._keep_last_turns * self._fold_ratio)), self._token_budget * self._fold_ratio
+        )
+
+    def _num_messages_beyond(self, max_turns: int, max_tokens: float) -> int:
+        """Number of oldest verbatim messages beyond the last `max_turns` turns or `max_tokens` tokens, whole turns only"""
+        num_tokens = self._count_tokens(self._summary) if self._summary else 0
+        num_kept, num_turns = 0, 0
+        # walk back from the most recent message, a turn being a user message and what follows it
+        for i in range(len(self._messages) - 1, -1, -1):
+            num_tokens += self._count_tokens(self._messages[i].content)
+            if not isinstance(self._messages[i], HumanMessage):
+                continue
+            num_turns += 1
+            if num_turns > 1 and (num_turns > max_turns or num_tokens > max_tokens):
+                break
+            num_kept = len(self._messages) - i
+        return len(self._messages) - num_kept
+
+    def _schedule_fold(self) -> None:
+        with self._lock:
+            if self._num_folding > 0:
+                return  # checked again once the ongoing fold completes
+            num_to_fold = self._num_messages_to_fold()
+            if num_to_fold == 0:
+                return
+            if self._summary_chain is None:
+                logger.debug(f"Dropping {num_to_fold} messages beyond the chat history budget")
+                del self._messages[:num_to_fold]
+                return
+            self._num_folding = num_to_fold
+            summary, messages = self._summary, self._messages[:num_to_fold]
+        self._executor.submit(self._fold, summary, messages)
+
+    def _fold(self, summary: str, messages: List[BaseMessage]) -> None:
+        exchanges = "\n".join(
+            f"{'User' if isinstance(message, HumanMessage) else 'Assistant'}: {message.content}" for message in messages
+        )
+        try:
+            new_summary = self._summary_chain.invoke({"summary": summary or "(none)", "exchanges": exchanges}).strip()
+        except Exception as e:
+            logger.error(f"Failed to summarize the chat history, dropping {len(messages)} messages instead: {e}")
+            new_summary = summary
+        with self._lock:
+            self._summary = new_summary
+            del self._messages[:len(messages)]
+            self._num_folding = 0
+        logger.debug(f"Folded {len(messages)} messages into the chat history summary: {new_summary}")
+        self._schedule_fold()
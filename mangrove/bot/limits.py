@@ -0,0 +1,47 @@
+from typing import Optional, Tuple
+
+SENTENCE_TERMINATORS = ".!?…"
+CLOSING_CHARACTERS = "\"')]”’"
+
+
+class ResponseLimiter:
+    """Enforces the output constraints of a persona on a streamed response
+
+    A sentence ends with a terminator (`.`, `!`, `?`, `…`), possibly followed by closing quotes or brackets, then
+    whitespace; it is counted once that whitespace streams in, so that decimals do not end sentences. Tokens
+    are counted as the chunks streamed by the LLM.
+    """
+
+    def __init__(self, max_sentences: Optional[int] = None, max_tokens: Optional[int] = None):
+        """
+        Args:
+            max_sentences (int, optional): Maximum number of sentences of a response; if None, unlimited.
+            max_tokens (int, optional): Maximum number of chunks of a response; if None, unlimited.
+        """
+        self._max_sentences = max_sentences
+        self._max_tokens = max_tokens
+        self._num_sentences: int = 0
+        self._num_tokens: int = 0
+        self._is_sentence_ending: bool = False
+
+    def feed(self, text: str) -> Tuple[str, bool]:
+        """Count the next chunk of the response, given its text without commands
+
+        Returns:
+            Tuple[str, bool]: text of the chunk within the limits, and whether a limit is reached
+        """
+        self._num_tokens += 1
+        for i, char in enumerate(text):
+            if self._is_sentence_ending:
+                if char.isspace():
+                    self._num_sentences += 1
+                    self._is_sentence_ending = False
+                    if self._max_sentences is not None and self._num_sentences >= self._max_sentences:
+                        return text[:i], True
+                elif char not in SENTENCE_TERMINATORS + CLOSING_CHARACTERS:
+                    self._is_sentence_ending = False
+            if char in SENTENCE_TERMINATORS:
+                self._is_sentence_ending = True
+        if self._max_tokens is not None and self._num_tokens >= self._max_tokens:
+            return text, True
+        return text, False
@@ -0,0 +1,72 @@
+import os
+import json
+import shutil
+import hashlib
+from typing import List, Optional
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+from core.utils import logger
+from storage_manager import KNOWLEDGE_INDEX_DIR
+
+
+def embedding_model_name(embedding: Embeddings) -> str:
+    """Name identifying the embedding model, e.g. `OllamaEmbeddings:qwen3:8b`"""
+    for attribute in ("model", "model_name", "deployment", "size"):
+        value = getattr(embedding, attribute, None)
+        if value is not None:
+            return f"{embedding.__class__.__name__}:{value}"
+    return embedding.__class__.__name__
+
+
+def knowledge_base_key(texts: List[str], model_name: str) -> str:
+    """Hash of the content of the knowledge base and of the embedding model"""
+    content = json.dumps({"model": model_name, "texts": texts}, ensure_ascii=False)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]
+
+
+def load_or_build_vectorstore(
+    texts: List[str],
+    embedding: Embeddings,
+    index_dir: Optional[str] = KNOWLEDGE_INDEX_DIR,
+) -> FAISS:
+    """Load the FAISS index of the knowledge base saved by an earlier start, or embed it and save its index
+
+    Indexes are saved in a directory per knowledge base key, so that the knowledge base is only embedded
+    again when its content or the embedding model changes.
+
+    Args:
+        texts (List[str]): Chunks of the knowledge base.
+        embedding (Embeddings): Embedding model of the chunks and of the queries.
+        index_dir (str, optional): Directory of the saved indexes; if None, the index is neither loaded nor saved.
+
+    Returns:
+        FAISS: Vector store of the knowledge base
+    """
+    if index_dir is None:
+        return FAISS.from_texts(texts, embedding=embedding)
+
+    model_name = embedding_model_name(embedding)
+    path = os.path.join(index_dir, knowledge_base_key(texts, model_name))
+    if os.path.exists(os.path.join(path, "index.faiss")):
+        try:
+            # the pickled docstore was written by this function, not received from elsewhere
+            vectorstore = FAISS.load_local(path, embedding, allow_dangerous_deserialization=True)
+            logger.info(f"Loaded knowledge base index of {len(texts)} chunks embedded by {model_name} from {path}")
+            return vectorstore
+        except Exception as e:
+            logger.warning(f"Failed to load knowledge base index from {path}, embedding the knowledge base again: {e}")
+
+    logger.info(f"Embedding knowledge base of {len(texts)} chunks with {model_name}")
+    vectorstore = FAISS.from_texts(texts, embedding=embedding)
+    # saved aside then renamed, so that a concurrent start never loads a partially written index
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        vectorstore.save_local(tmp_path)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+        logger.info(f"Saved knowledge base index to {path}")
+    except OSError as e:
+        logger.warning(f"Failed to save knowledge base index to {path}: {e}")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return vectorstore
@@ -0,0 +1,102 @@
+import re
+import zlib
+import numpy as np
+from typing import List, Optional
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from core.utils import logger
+
+
+class HashedTfidfEmbeddings(Embeddings):
+    """TF-IDF embeddings of word unigrams and bigrams hashed into `n_features` buckets
+
+    The inverse document frequencies are fitted on the knowledge base. Embedding a query takes a few
+    microseconds, without any model; it matches words rather than meanings, which suits knowledge bases
+    of a few dozen short sentences.
+    """
+
+    def __init__(self, texts: List[str], n_features: int = 2048):
+        """
+        Args:
+            texts (List[str]): Chunks of the knowledge base the inverse document frequencies are fitted on.
+            n_features (int): Number of hash buckets, i.e. dimension of the embeddings.
+        """
+        self.n_features = n_features
+        self.model_name = f"hashed-tfidf-{n_features}"
+        document_frequencies = np.zeros(n_features, dtype=np.float32)
+        for text in texts:
+            document_frequencies[np.unique(self._buckets(text))] += 1
+        self._idf = np.log((1 + len(texts)) / (1 + document_frequencies)) + 1
+
+    def _buckets(self, text: str) -> np.ndarray:
+        words = re.findall(r"[a-z0-9']+", text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        # crc32 rather than hash(), which is salted per process
+        return np.array([zlib.crc32(feature.encode("utf-8")) % self.n_features for feature in features], dtype=np.int64)
+
+    def embed(self, text: str) -> np.ndarray:
+        counts = np.bincount(self._buckets(text), minlength=self.n_features).astype(np.float32)
+        vector = np.log1p(counts) * self._idf  # sublinear term frequencies
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed(text).tolist() for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed(text).tolist()
+
+
+def create_local_embedding(texts: List[str], model_name: Optional[str] = None) -> Embeddings:
+    """Create a small in-process embedder for the knowledge base
+
+    Args:
+        texts (List[str]): Chunks of the knowledge base.
+        model_name (str, optional): sentence-transformers model, e.g. `sentence-transformers/all-MiniLM-L6-v2`;
+            if None, or if sentence-transformers is not installed, hashed TF-IDF embeddings are used.
+
+    Returns:
+        Embeddings: Embedder of the knowledge base and of the queries
+    """
+    if model_name is not None:
+        try:
+            from langchain_community.embeddings import HuggingFaceEmbeddings
+            return HuggingFaceEmbeddings(model_name=model_name, encode_kwargs={"normalize_embeddings": True})
+        except ImportError as e:
+            logger.warning(f"Cannot load {model_name}, falling back to hashed TF-IDF embeddings: {e}")
+    return HashedTfidfEmbeddings(texts)
+
+
+class NumpyVectorStore:
+    """Vector store of a small knowledge base as a normalized NumPy matrix, searched by a dot product
+
+    For a few hundred chunks, a matrix-vector product and a partial sort take microseconds, less than
+    the overhead of a FAISS index; it offers the part of the FAISS interface the personas use.
+    """
+
+    def __init__(self, texts: List[str], embedding: Embeddings):
+        self._documents = [Document(page_content=text) for text in texts]
+        self._embedding = embedding
+        matrix = np.asarray(embedding.embed_documents(texts), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self._matrix = matrix / np.where(norms > 0, norms, 1.0)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings) -> "NumpyVectorStore":
+        return cls(texts, embedding)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4) -> List[Document]:
+        scores = self._matrix @ np.asarray(embedding, dtype=np.float32)
+        if k < len(scores):
+            top_k = np.argpartition(-scores, k)[:k]
+        else:
+            top_k = np.arange(len(scores))
+        return [self._documents[i] for i in top_k[np.argsort(-scores[top_k])]]
+
+    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
+        return self.similarity_search_by_vector(self._embedding.embed_query(query), k=k)
@@ -1,6 +1,7 @@
-from typing import Dict
+from typing import Callable, Dict, List, Optional
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
 from langchain_core.prompts import (
     format_document, 
     ChatPromptTemplate, 
@@ -9,10 +10,15 @@ from langchain_core.prompts import (
     MessagesPlaceholder
 )
 from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_core.runnables import RunnablePassthrough, Runnable
+from langchain_core.runnables import RunnablePassthrough, RunnableLambda, Runnable
 from langchain_core.prompts.prompt import PromptTemplate
 from operator import itemgetter
+
+from core.utils import logger
 from .base import BotPersona
+from .knowledge_index import load_or_build_vectorstore, knowledge_base_key, embedding_model_name, KNOWLEDGE_INDEX_DIR
+from .query_cache import QueryCache
+from .local_retrieval import create_local_embedding, NumpyVectorStore
 
 # Knowledge base for the Mangrove protector persona
 KNOWLEDGE_BASE = [
@@ -46,33 +52,116 @@ KNOWLEDGE_BASE = [
 ]
 
 BASE_SYSTEM_PROMPT_TEMPLATE = """
-You are, {assistant_name}, the badass protector of the Mangrove. You think, act, and speak like Duke Nukem.  Speak confidently and colloquially.  Do not cuss or use profanity.  Do not repeat facts you have already said.  Be concise.  You have 3 actions: [Follow User], [Sit Down], [Stop Following User].  If you use an action, ensure that you encapsulate said action with square brackets.  Limit your responses to three sentences at most.  Reply to the following given the following knowledge base (Be relatively concise):
+You are, {assistant_name}, the badass protector of the Mangrove. You think, act, and speak like Duke Nukem.  Speak confidently and colloquially.  Do not cuss or use profanity.  Do not repeat facts you have already said.  Be concise.  You have 3 actions: [Follow User], [Sit Down], [Stop Following User].  If you use an action, ensure that you encapsulate said action with square brackets.  Limit your responses to three sentences at most.  Reply to the user given the knowledge base that precedes their message (Be relatively concise).
+"""
 
-Knowledge Base:
+# Retrieved for every user message, so given right before it rather than in the system prompt: the system
+# prompt and the chat history then form a prefix that is the same from one turn to the next, which a local
+# LLM server (Ollama, llama.cpp) finds in its KV cache instead of processing the whole conversation again.
+CONTEXT_PROMPT_TEMPLATE = """Knowledge Base:
 {context}
 """
 
+def create_prompt(system_prompt: str, stable_prefix: bool = True) -> ChatPromptTemplate:
+    """Create the prompt of a persona, with `context`, `chat_history` and `user_msg` as inputs
+
+    Args:
+        system_prompt (str): Template of the system prompt, without the context.
+        stable_prefix (bool, optional): Whether the context follows the chat history, keeping the prompt prefix
+            stable across turns, rather than being part of the system prompt. Defaults to True.
+
+    Returns:
+        ChatPromptTemplate: Prompt of the persona
+    """
+    if not stable_prefix:
+        system_prompt = system_prompt + "\n" + CONTEXT_PROMPT_TEMPLATE
+    messages = [
+        SystemMessagePromptTemplate.from_template(
+            template=[
+                {"type": "text", "text": system_prompt},
+            ]
+        ),
+        MessagesPlaceholder("chat_history"),
+    ]
+    if stable_prefix:
+        messages.append(
+            SystemMessagePromptTemplate.from_template(
+                template=[
+                    {"type": "text", "text": CONTEXT_PROMPT_TEMPLATE},
+                ]
+            )
+        )
+    messages.append(
+        HumanMessagePromptTemplate.from_template(
+            template=[
+                {"type": "text", "text": "{user_msg}"},
+            ]
+        )
+    )
+    return ChatPromptTemplate(messages=messages)
+
 class ProtectorOfMangrove(BotPersona):
-    def __init__(self, assistant_name='Marvin'):
+    def __init__(
+        self,
+        assistant_name='Marvin',
+        embedding: Embeddings=None,
+        index_dir: Optional[str]=KNOWLEDGE_INDEX_DIR,
+        query_cache_kwargs: Dict={},
+        retrieval: str='faiss',
+        local_embedding_model: Optional[str]=None,
+        max_sentences: Optional[int]=3,
+        max_response_tokens: Optional[int]=None,
+    ):
         self.assistant_name = assistant_name
-        self._prompt = ChatPromptTemplate(
-            messages=[
-                SystemMessagePromptTemplate.from_template(
-                    template=[
-                        {"type": "text", "text": BASE_SYSTEM_PROMPT_TEMPLATE},
-                    ]
-                ),
-                MessagesPlaceholder("chat_history"),
-                HumanMessagePromptTemplate.from_template(
-                    template=[
-                        {"type": "text", "text": "{user_msg}"},
-                    ]
-                ),
-            ]
-        ).partial(
+        # output constraints, enforced while the response streams
+        self.max_sentences = max_sentences
+        self.max_response_tokens = max_response_tokens
+        self.system_prompt = BASE_SYSTEM_PROMPT_TEMPLATE
+        self._prompt = create_prompt(self.system_prompt).partial(
             assistant_name=self.assistant_name
         )
-        self.vectorstore = FAISS.from_texts(KNOWLEDGE_BASE, embedding=OpenAIEmbeddings())
+        self._setup_knowledge_base(
+            KNOWLEDGE_BASE,
+            embedding=(lambda: embedding) if embedding is not None else OpenAIEmbeddings,
+            retrieval=retrieval,
+            local_embedding_model=local_embedding_model,
+            index_dir=index_dir,
+            query_cache_kwargs=query_cache_kwargs,
+        )
+
+    def _setup_knowledge_base(
+        self,
+        texts: List[str],
+        embedding: Callable[[], Embeddings],
+        retrieval: str,
+        local_embedding_model: Optional[str],
+        index_dir: Optional[str],
+        query_cache_kwargs: Dict,
+    ) -> None:
+        """Set up the vector store of the knowledge base and its query cache
+
+        Args:
+            texts (List[str]): Chunks of the knowledge base.
+            embedding (Callable[[], Embeddings]): Factory of the embedding model of the `faiss` retrieval.
+            retrieval (str): `faiss`, a FAISS index embedded by the embedding model and saved in `index_dir`,
+                or `local`, a NumPy matrix embedded in-process, for small knowledge bases.
+            local_embedding_model (str, optional): sentence-transformers model of the `local` retrieval;
+                if None, hashed TF-IDF embeddings are used.
+            index_dir (str, optional): Directory of the saved FAISS indexes.
+            query_cache_kwargs (Dict): Keyword arguments of the query cache.
+        """
+        if retrieval == 'faiss':
+            embedding = embedding()
+            self.vectorstore = load_or_build_vectorstore(texts, embedding, index_dir=index_dir)
+        elif retrieval == 'local':
+            embedding = create_local_embedding(texts, local_embedding_model)
+            self.vectorstore = NumpyVectorStore.from_texts(texts, embedding)
+        else:
+            raise Exception(f"Unknown retrieval {retrieval}, available retrievals: faiss, local")
+        logger.info(f"Retrieving from the knowledge base with {retrieval} retrieval and {embedding_model_name(embedding)}")
+        self.query_cache = QueryCache.shared(
+            knowledge_base_key(texts, embedding_model_name(embedding)), self.vectorstore, **query_cache_kwargs
+        )
 
     @property
     def prompt(self) -> ChatPromptTemplate:
@@ -87,7 +176,8 @@ class ProtectorOfMangrove(BotPersona):
             doc_strings = [format_document(doc, document_prompt) for doc in docs]
             return document_separator.join(doc_strings)
 
-        retriever = self.vectorstore.as_retriever()
+        # the query cache skips the embedding call of repeated user messages
+        retriever = RunnableLambda(self.query_cache.retrieve)
         return {
             "context": itemgetter("user_msg") | retriever | _combine_documents,
             "user_msg": lambda x: x["user_msg"],
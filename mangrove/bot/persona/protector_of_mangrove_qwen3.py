@@ -1,5 +1,5 @@
 import json
-from typing import Dict
+from typing import Dict, Optional
 from langchain_ollama import OllamaEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain_core.prompts import format_document, ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate, MessagesPlaceholder
@@ -11,31 +11,27 @@ from .base import BotPersona
 from .protector_of_mangrove import *
 
 class ProtectorOfMangroveQwen3(ProtectorOfMangrove):
-    def __init__(self, persona_file: str=None):
+    def __init__(
+        self,
+        persona_file: str=None,
+        index_dir: Optional[str]=KNOWLEDGE_INDEX_DIR,
+        query_cache_kwargs: Dict={},
+        retrieval: str='faiss',
+        local_embedding_model: Optional[str]=None,
+    ):
         # Load persona data from JSON file
         if persona_file:
             with open(persona_file, 'r') as f:
                 self.persona = json.load(f)
             self.assistant_name = self.persona.get("name")
+        # output constraints, enforced while the response streams
+        self.max_sentences = self.persona.get("max_sentences", 3)
+        self.max_response_tokens = self.persona.get("max_response_tokens")
 
         # Create dynamic system prompt using JSON fields
-        system_prompt = self._create_system_prompt()
+        self.system_prompt = self._create_system_prompt()
         
-        self._prompt = ChatPromptTemplate(
-            messages=[
-                SystemMessagePromptTemplate.from_template(
-                    template=[
-                        {"type": "text", "text": system_prompt},
-                    ]
-                ),
-                MessagesPlaceholder("chat_history"),
-                HumanMessagePromptTemplate.from_template(
-                    template=[
-                        {"type": "text", "text": "{user_msg}"},
-                    ]
-                ),
-            ]
-        ).partial(
+        self._prompt = create_prompt(self.system_prompt).partial(
             assistant_name=self.assistant_name
         )
         splitter = RecursiveCharacterTextSplitter(
@@ -45,7 +41,14 @@ class ProtectorOfMangroveQwen3(ProtectorOfMangrove):
         )
         self.KNOWLEDGE_BASE =  [chunk.strip() for chunk in splitter.split_text(self.persona.get("background"))]
         print(f"Knowledge base: {self.KNOWLEDGE_BASE}")
-        self.vectorstore = FAISS.from_texts(self.KNOWLEDGE_BASE, embedding=OllamaEmbeddings(model="qwen3:8b"))
+        self._setup_knowledge_base(
+            self.KNOWLEDGE_BASE,
+            embedding=lambda: OllamaEmbeddings(model="qwen3:8b"),
+            retrieval=retrieval,
+            local_embedding_model=local_embedding_model,
+            index_dir=index_dir,
+            query_cache_kwargs=query_cache_kwargs,
+        )
 
     def _create_system_prompt(self) -> str:
         """Create a dynamic system prompt using the JSON persona fields"""
@@ -63,8 +66,7 @@ class ProtectorOfMangroveQwen3(ProtectorOfMangrove):
 
         If no action is needed, do not produce any bracketed text.  Limit your entire response to at most three sentences.
 
-        Reply to the following given the following knowledge base (Be relatively concise):
-        {context}
+        Reply to the user given the knowledge base that precedes their message (Be relatively concise).
         """
         
         # Extract fields from persona JSON, with fallbacks
@@ -79,5 +81,4 @@ class ProtectorOfMangroveQwen3(ProtectorOfMangrove):
             tagline=tagline,
             personality=personality,
             description=description,
-            context="{context}"  # Keep this as a placeholder for the context chain
         )
\ No newline at end of file
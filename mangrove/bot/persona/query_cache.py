@@ -0,0 +1,110 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import ClassVar, Dict, List, Optional, Tuple, Union
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from core.utils import logger
+from .local_retrieval import NumpyVectorStore
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase the query and drop its punctuation and extra whitespace"""
+    return " ".join(re.sub(r"[^\w\s']", " ", query.lower()).split())
+
+
+class QueryCache:
+    """Bounded LRU cache of the embeddings and top-k documents of the queries to a knowledge base
+
+    Users tend to repeat themselves ("follow me", "who are you?"), and every miss is an embedding call
+    before the LLM can start; a hit skips both the call and the search. Queries are normalized first, and
+    entries expire `ttl` seconds after being added. Use `QueryCache.shared` to share a cache between the
+    sessions of a persona.
+    """
+
+    _shared: ClassVar[Dict[str, "QueryCache"]] = {}
+    _shared_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(self, vectorstore: Union[FAISS, NumpyVectorStore], max_size: int = 256, ttl: Optional[float] = 3600.0, k: int = 4):
+        """
+        Args:
+            vectorstore (Union[FAISS, NumpyVectorStore]): Vector store of the knowledge base.
+            max_size (int): Maximum number of queries cached, least recently used ones being evicted first.
+            ttl (float, optional): Seconds after which an entry expires; if None, entries never expire.
+            k (int): Number of documents retrieved per query.
+        """
+        self._vectorstore = vectorstore
+        self._max_size = max_size
+        self._ttl = ttl
+        self._k = k
+        self._lock = threading.Lock()
+        # normalized query -> (time added, embedding, top-k documents)
+        self._entries: "OrderedDict[str, Tuple[float, List[float], List[Document]]]" = OrderedDict()
+        self._num_hits: int = 0
+        self._num_misses: int = 0
+        self._num_expired: int = 0
+        self._num_evicted: int = 0
+
+    @classmethod
+    def shared(cls, key: str, vectorstore: Union[FAISS, NumpyVectorStore], **kwargs) -> "QueryCache":
+        """Cache shared by all callers with the same key and keyword arguments, the key being e.g. the key of the knowledge base and its embedding model"""
+        # callers configuring the cache differently get caches of their own
+        key = f"{key}|{sorted(kwargs.items())}"
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(vectorstore, **kwargs)
+            return cls._shared[key]
+
+    def _lookup(self, query: str) -> Optional[Tuple[List[float], List[Document]]]:
+        with self._lock:
+            entry = self._entries.get(query)
+            if entry is not None and self._ttl is not None and time.monotonic() - entry[0] > self._ttl:
+                del self._entries[query]
+                self._num_expired += 1
+                entry = None
+            if entry is None:
+                self._num_misses += 1
+                return None
+            self._entries.move_to_end(query)
+            self._num_hits += 1
+            return entry[1], entry[2]
+
+    def _add(self, query: str, embedding: List[float], documents: List[Document]) -> None:
+        with self._lock:
+            self._entries[query] = (time.monotonic(), embedding, documents)
+            self._entries.move_to_end(query)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self._num_evicted += 1
+
+    def lookup(self, query: str) -> Tuple[List[float], List[Document]]:
+        """Embedding and top-k documents of the query, computed on a miss"""
+        normalized_query = normalize_query(query)
+        entry = self._lookup(normalized_query)
+        if entry is not None:
+            logger.debug(f"Query cache hit for '{normalized_query}'")
+            return entry
+        embedding = self._vectorstore.embeddings.embed_query(normalized_query)
+        documents = self._vectorstore.similarity_search_by_vector(embedding, k=self._k)
+        self._add(normalized_query, embedding, documents)
+        return embedding, documents
+
+    def embed_query(self, query: str) -> List[float]:
+        return self.lookup(query)[0]
+
+    def retrieve(self, query: str) -> List[Document]:
+        return self.lookup(query)[1]
+
+    @property
+    def metrics(self) -> Dict[str, Union[int, float]]:
+        num_lookups = self._num_hits + self._num_misses
+        return {
+            "size": len(self._entries),
+            "hits": self._num_hits,
+            "misses": self._num_misses,
+            "hit_rate": self._num_hits / num_lookups if num_lookups else 0.0,
+            "expired": self._num_expired,
+            "evicted": self._num_evicted,
+        }
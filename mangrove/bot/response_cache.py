@@ -0,0 +1,147 @@
+import re
+import time
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Callable, ClassVar, Dict, Iterator, List, Optional, Tuple, Union
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+
+from core.utils import logger
+from .persona.query_cache import normalize_query
+
+
+class ResponseCache:
+    """Cache of the responses to user messages at the start of conversations, matched by embedding similarity
+
+    Conversations tend to open with the same lines ("hello", "who are you?"), which need not be generated
+    again. A response is only cached and looked up while the chat history has at most `max_history_turns`
+    turns, and is returned for a message whose embedding is at least `similarity_threshold` similar to the
+    cached one after the same user messages, if any. Least recently used entries are evicted first, and
+    entries expire `ttl` seconds after being added. Use `ResponseCache.shared` to share a cache between
+    the sessions of a persona.
+    """
+
+    _shared: ClassVar[Dict[str, "ResponseCache"]] = {}
+    _shared_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(
+        self,
+        embed: Callable[[str], List[float]],
+        similarity_threshold: float = 0.95,
+        max_history_turns: int = 1,
+        max_size: int = 128,
+        ttl: Optional[float] = 3600.0,
+    ):
+        """
+        Args:
+            embed (Callable[[str], List[float]]): Embedding of a normalized user message.
+            similarity_threshold (float): Cosine similarity from which a message matches a cached one.
+            max_history_turns (int): Maximum number of turns of the chat history for responses to be cached.
+            max_size (int): Maximum number of responses cached.
+            ttl (float, optional): Seconds after which an entry expires; if None, entries never expire.
+        """
+        self._embed = embed
+        self._similarity_threshold = similarity_threshold
+        self._max_history_turns = max_history_turns
+        self._max_size = max_size
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        # (history signature, normalized message) -> (time added, normalized embedding, response)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, np.ndarray, str]]" = OrderedDict()
+        self._num_lookups: int = 0
+        self._num_hits: int = 0
+        self._num_expired: int = 0
+        self._num_evicted: int = 0
+
+    @classmethod
+    def shared(cls, key: str, embed: Callable[[str], List[float]], **kwargs) -> "ResponseCache":
+        """Cache shared by all callers with the same key and keyword arguments, the key being e.g. a hash of the persona and of its embedding model"""
+        # callers configuring the cache differently get caches of their own
+        key = f"{key}|{sorted(kwargs.items())}"
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(embed, **kwargs)
+            return cls._shared[key]
+
+    def history_signature(self, chat_history: List[BaseMessage]) -> Optional[str]:
+        """Normalized user messages of the chat history, or None if it is too long for responses to be cached"""
+        if any(not isinstance(message, (HumanMessage, AIMessage)) for message in chat_history):
+            return None  # e.g. the summary of a longer conversation
+        user_msgs = [normalize_query(message.content) for message in chat_history if isinstance(message, HumanMessage)]
+        if len(user_msgs) > self._max_history_turns:
+            return None
+        return "\n".join(user_msgs)
+
+    def _embed_normalized(self, user_msg: str) -> np.ndarray:
+        embedding = np.asarray(self._embed(user_msg), dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm > 0 else embedding
+
+    def lookup(self, user_msg: str, chat_history: List[BaseMessage]) -> Optional[str]:
+        """Cached response to a message matching the user message after the same chat history, if any"""
+        signature = self.history_signature(chat_history)
+        if signature is None:
+            return None
+        normalized_msg = normalize_query(user_msg)
+        with self._lock:
+            self._num_lookups += 1
+            self._evict_expired()
+            entry = self._entries.get((signature, normalized_msg))
+            if entry is not None:
+                self._entries.move_to_end((signature, normalized_msg))
+                self._num_hits += 1
+                return entry[2]
+            candidates = [(key, entry) for key, entry in self._entries.items() if key[0] == signature]
+        if not candidates:
+            return None
+
+        embedding = self._embed_normalized(normalized_msg)
+        similarities = np.stack([entry[1] for _, entry in candidates]) @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < self._similarity_threshold:
+            return None
+        key, entry = candidates[best]
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._num_hits += 1
+        logger.debug(f"Response cache hit for '{normalized_msg}' matching '{key[1]}' ({similarities[best]:.3f})")
+        return entry[2]
+
+    def add(self, user_msg: str, chat_history: List[BaseMessage], response: str) -> None:
+        """Cache the response to the user message after the chat history, if short enough"""
+        signature = self.history_signature(chat_history)
+        if signature is None or not response.strip():
+            return
+        normalized_msg = normalize_query(user_msg)
+        embedding = self._embed_normalized(normalized_msg)
+        with self._lock:
+            self._entries[(signature, normalized_msg)] = (time.monotonic(), embedding, response)
+            self._entries.move_to_end((signature, normalized_msg))
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self._num_evicted += 1
+
+    def _evict_expired(self) -> None:
+        if self._ttl is None:
+            return
+        now = time.monotonic()
+        for key in [key for key, entry in self._entries.items() if now - entry[0] > self._ttl]:
+            del self._entries[key]
+            self._num_expired += 1
+
+    @staticmethod
+    def replay(response: str) -> Iterator[str]:
+        """Stream a cached response word by word, as the LLM would"""
+        return iter(re.findall(r"\s*\S+", response))
+
+    @property
+    def metrics(self) -> Dict[str, Union[int, float]]:
+        return {
+            "size": len(self._entries),
+            "lookups": self._num_lookups,
+            "hits": self._num_hits,
+            "hit_rate": self._num_hits / self._num_lookups if self._num_lookups else 0.0,
+            "expired": self._num_expired,
+            "evicted": self._num_evicted,
+        }
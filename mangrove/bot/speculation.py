@@ -0,0 +1,92 @@
+import re
+import time
+import threading
+from difflib import SequenceMatcher
+from typing import Callable, Iterator, List, Optional
+from langchain_core.messages import BaseMessage
+
+from core.utils import logger
+
+
+def transcript_words(transcript: str) -> List[str]:
+    """Words of a transcript, regardless of case and punctuation"""
+    return re.sub(r"[^\w\s']", " ", transcript.lower()).split()
+
+
+def transcripts_equal(transcript: str, other_transcript: str) -> bool:
+    """Whether two transcripts are the same up to case and punctuation, e.g. for a response to be committed"""
+    return transcript_words(transcript) == transcript_words(other_transcript)
+
+
+def transcripts_match(transcript: str, other_transcript: str, min_similarity: float) -> bool:
+    """Whether two transcripts are the same up to case, punctuation and a fraction of their words
+
+    A single word can reverse the meaning ("do not follow me"), so this only decides whether to keep
+    speculating; a response is committed on equal transcripts only.
+    """
+    words, other_words = transcript_words(transcript), transcript_words(other_transcript)
+    if words == other_words:
+        return True
+    return SequenceMatcher(None, words, other_words).ratio() >= min_similarity
+
+
+class SpeculativeResponse:
+    """Response streamed in the background for a provisional transcript, buffered until it is committed or cancelled
+
+    Iterating over a committed response yields the chunks buffered so far at once, then the next ones as the
+    LLM streams them.
+    """
+
+    def __init__(self, stream: Callable[[], Iterator[str]], user_msg: str, chat_history: List[BaseMessage]):
+        """
+        Args:
+            stream (Callable[[], Iterator[str]]): Starts streaming the response.
+            user_msg (str): Provisional transcript the response is generated for.
+            chat_history (List[BaseMessage]): Chat history the response is generated with.
+        """
+        self.user_msg = user_msg
+        self.chat_history = chat_history
+        self.started_at: float = time.perf_counter()
+        self._chunks: List[str] = []
+        self._done: bool = False
+        self._error: Optional[Exception] = None
+        self._cancelled = threading.Event()
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, args=(stream,), name="bot-speculation", daemon=True)
+        self._thread.start()
+
+    def _run(self, stream: Callable[[], Iterator[str]]) -> None:
+        try:
+            for chunk in stream():
+                if self._cancelled.is_set():
+                    break  # closing the stream stops the generation
+                with self._condition:
+                    self._chunks.append(chunk)
+                    self._condition.notify_all()
+        except Exception as e:
+            logger.error(f"Speculative response for '{self.user_msg}' failed: {e}")
+            self._error = e
+        finally:
+            with self._condition:
+                self._done = True
+                self._condition.notify_all()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+        with self._condition:
+            self._condition.notify_all()
+
+    def __iter__(self) -> Iterator[str]:
+        i = 0
+        while True:
+            with self._condition:
+                while i >= len(self._chunks) and not self._done and not self._cancelled.is_set():
+                    self._condition.wait()
+                if i < len(self._chunks):
+                    chunk = self._chunks[i]
+                    i += 1
+                elif self._error is not None:
+                    raise self._error
+                else:
+                    return
+            yield chunk
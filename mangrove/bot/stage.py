@@ -1,13 +1,43 @@
+import time
+import hashlib
+import threading
 from typing import Iterator, Optional, List, Union, Dict
-from langchain.schema import BaseMessage, HumanMessage, AIMessage
 
 from core.utils import logger
 from core.stage import TextToTextStage
 from core.data import TextPacket, DataPacketStream
 from core.context import IncomingPacketWhileProcessingException
+from .history import ChatHistory
+from .speculation import SpeculativeResponse, transcripts_equal, transcripts_match
+from .commands import CommandParser
+from .response_cache import ResponseCache
+from .coalescer import ChunkCoalescer, iter_with_deadline
+from .limits import ResponseLimiter
 
 class BotStage(TextToTextStage):
-    def __init__(self, name: str, endpoint: str='openai', persona_configs: Union[Dict[str, str], str]={},  endpoint_kwargs: Dict={}, verbose: bool=False):
+    def __init__(
+        self,
+        name: str,
+        endpoint: str='openai',
+        persona_configs: Union[Dict[str, str], str]={},
+        endpoint_kwargs: Dict={},
+        history_token_budget: int=2000,
+        history_keep_last_turns: int=6,
+        history_fold_ratio: float=0.5,
+        summarize_history: bool=True,
+        query_cache_kwargs: Dict={},
+        retrieval_kwargs: Dict={},
+        speculative: bool=False,
+        speculative_min_similarity: float=0.9,
+        speculative_min_words: int=2,
+        dispatch_commands: bool=True,
+        response_cache: bool=False,
+        response_cache_kwargs: Dict={},
+        coalescing: str='word',
+        coalescing_max_delay: float=100,
+        enforce_response_limits: bool=True,
+        verbose: bool=False
+    ):
         """Initialize Bot Stage
 
         Args:
@@ -15,6 +45,21 @@ class BotStage(TextToTextStage):
             endpoint (str, optional): Endpoint to use for the bot. Defaults to 'openai'.
             endpoint_kwargs (Dict, optional): Additional keyword arguments for the endpoint. Defaults to {}.
             persona_kwargs (Dict, optional): Additional keyword arguments for the persona. Defaults to {}.
+            history_token_budget (int, optional): Maximum number of tokens of the chat history given to the LLM. Defaults to 2000.
+            history_keep_last_turns (int, optional): Maximum number of most recent turns given verbatim. Defaults to 6.
+            history_fold_ratio (float, optional): Fraction of the turns and token budget kept verbatim after older turns are folded, so that folds happen every few turns only. Defaults to 0.5.
+            summarize_history (bool, optional): Whether older turns are folded into a running summary (by the LLM, in the background) rather than dropped. Defaults to True.
+            query_cache_kwargs (Dict, optional): Keyword arguments of the cache of knowledge base queries shared by the sessions of the persona, e.g. max_size and ttl. Defaults to {}.
+            retrieval_kwargs (Dict, optional): Keyword arguments of the knowledge base retrieval of the persona, e.g. {"retrieval": "local"} for an in-process embedder and NumPy search. Defaults to {}.
+            speculative (bool, optional): Whether to start generating the response from provisional transcriptions, before the end of the turn; the response is kept if the final transcription matches, and generated again otherwise. Defaults to False.
+            speculative_min_similarity (float, optional): Word-level similarity from which a provisional transcription keeps the response speculated for the previous one, rather than superseding it; the final transcription must equal the provisional one of the response for it to be committed. Defaults to 0.9.
+            speculative_min_words (int, optional): Minimum number of words of a provisional transcription to generate a response for. Defaults to 2.
+            dispatch_commands (bool, optional): Whether action commands are emitted on the `bot_command` event channel as soon as they are parsed, besides being attached to the response packets. Defaults to True.
+            response_cache (bool, optional): Whether responses to the first user messages of a conversation are cached, shared by the sessions of the persona, and replayed for similar messages. Defaults to False.
+            response_cache_kwargs (Dict, optional): Keyword arguments of the response cache, e.g. similarity_threshold, max_history_turns, max_size and ttl. Defaults to {}.
+            coalescing (str, optional): Size of the response packets the LLM chunks are grouped into: `token` (as streamed), `word` or `phrase`. Defaults to 'word'.
+            coalescing_max_delay (float, optional): Milliseconds after which a chunk held back for coalescing is sent off regardless, even while the LLM stalls. Defaults to 100.
+            enforce_response_limits (bool, optional): Whether responses are cut, and their generation stopped, once they reach the maximum number of sentences or tokens of the persona. Defaults to True.
             verbose (bool, optional): Whether to print debug messages. Defaults to False.
         """
         super().__init__(name=name, verbose=verbose)
@@ -22,27 +67,93 @@ class BotStage(TextToTextStage):
         if endpoint == 'openai':
             from .persona.protector_of_mangrove import ProtectorOfMangrove
             persona_kwargs = persona_configs if isinstance(persona_configs, dict) else {}
-            self._persona = ProtectorOfMangrove(**persona_kwargs)
+            self._persona = ProtectorOfMangrove(query_cache_kwargs=query_cache_kwargs, **retrieval_kwargs, **persona_kwargs)
             from .endpoints.chat_openai import ChatOpenAIEndpoint
             self._endpoint = ChatOpenAIEndpoint(**endpoint_kwargs)
         elif endpoint == 'ollama':
             from .persona.protector_of_mangrove_qwen3 import ProtectorOfMangroveQwen3
-            self._persona = ProtectorOfMangroveQwen3(persona_file=persona_configs)
+            self._persona = ProtectorOfMangroveQwen3(persona_file=persona_configs, query_cache_kwargs=query_cache_kwargs, **retrieval_kwargs)
             from .endpoints.chat_ollama import ChatOllamaEndpoint
             self._endpoint = ChatOllamaEndpoint(**endpoint_kwargs)
+        elif endpoint in ['ollama_http', 'openai_http']:
+            # streaming from the HTTP API directly, without the per-chunk overhead of a LangChain chain
+            if endpoint == 'ollama_http':
+                from .persona.protector_of_mangrove_qwen3 import ProtectorOfMangroveQwen3
+                self._persona = ProtectorOfMangroveQwen3(persona_file=persona_configs, query_cache_kwargs=query_cache_kwargs, **retrieval_kwargs)
+            else:
+                from .persona.protector_of_mangrove import ProtectorOfMangrove
+                persona_kwargs = persona_configs if isinstance(persona_configs, dict) else {}
+                self._persona = ProtectorOfMangrove(query_cache_kwargs=query_cache_kwargs, **retrieval_kwargs, **persona_kwargs)
+            from .endpoints.direct_http import DirectStreamingEndpoint
+            logger.info("Using Direct HTTP Bot Endpoint")
+            self._endpoint = DirectStreamingEndpoint(api=endpoint[:-len('_http')], **endpoint_kwargs)
+        elif endpoint == 'fake':
+            # offline persona: deterministic embeddings instead of a remote embedding model
+            from langchain_community.embeddings import DeterministicFakeEmbedding
+            from .persona.protector_of_mangrove import ProtectorOfMangrove
+            persona_kwargs = persona_configs if isinstance(persona_configs, dict) else {}
+            self._persona = ProtectorOfMangrove(embedding=DeterministicFakeEmbedding(size=256), query_cache_kwargs=query_cache_kwargs, **retrieval_kwargs, **persona_kwargs)
+            from .endpoints.fake import FakeChatEndpoint
+            logger.info("Using Fake Bot Endpoint")
+            self._endpoint = FakeChatEndpoint(**endpoint_kwargs)
         else:
-            raise Exception(f"Unknown Endpoint {endpoint}, available endpoints: openai, ollama")
+            raise Exception(f"Unknown Endpoint {endpoint}, available endpoints: openai, ollama, openai_http, ollama_http, fake")
         
         self._endpoint.setup(self._persona)
 
-        self._chat_history: List[BaseMessage] = []
+        self._chat_history = ChatHistory(
+            token_budget=history_token_budget,
+            keep_last_turns=history_keep_last_turns,
+            fold_ratio=history_fold_ratio,
+            summarizer=self._endpoint.llm if summarize_history else None,
+            assistant_name=getattr(self._persona, "assistant_name", None) or "the assistant",
+        )
         self._in_progress_user_text_packet: Optional[TextPacket] = None
 
-        self._partial_command = ""
-        self._in_command = False
+        self._command_parser = CommandParser()
+        # output constraints of the persona
+        self._max_sentences: Optional[int] = getattr(self._persona, "max_sentences", None) if enforce_response_limits else None
+        self._max_response_tokens: Optional[int] = getattr(self._persona, "max_response_tokens", None) if enforce_response_limits else None
+        self._num_responses: int = 0
+        self._num_truncated_responses: int = 0
+        self._coalescing = coalescing
+        self._coalescing_max_delay = coalescing_max_delay
+        if coalescing not in ChunkCoalescer.GRANULARITIES:
+            raise ValueError(f"Unknown coalescing {coalescing}, available coalescings: {', '.join(ChunkCoalescer.GRANULARITIES)}")
+        self._dispatch_commands = dispatch_commands
+
+        # response generated in the background for the latest provisional transcription, if speculative
+        self._speculative = speculative
+        self._speculative_min_similarity = speculative_min_similarity
+        self._speculative_min_words = speculative_min_words
+        self._speculation: Optional[SpeculativeResponse] = None
+        self._speculation_lock = threading.Lock()
+        self._num_speculations: int = 0
+        self._num_speculations_committed: int = 0
+        self._num_speculations_superseded: int = 0
+        self._num_speculations_mismatched: int = 0
+        self._speculation_head_starts: List[float] = []
+
+        self._response_cache: Optional[ResponseCache] = None
+        if response_cache:
+            from .persona.knowledge_index import embedding_model_name
+            # responses depend on the persona, and embeddings on its embedding model
+            persona_key = hashlib.sha256("\n".join([
+                self._persona.__class__.__name__,
+                str(getattr(self._persona, "assistant_name", "")),
+                str(getattr(self._persona, "system_prompt", "")),
+                embedding_model_name(self._persona.vectorstore.embeddings),
+            ]).encode("utf-8")).hexdigest()
+            self._response_cache = ResponseCache.shared(persona_key, self._persona.query_cache.embed_query, **response_cache_kwargs)
 
     def process(self, in_text_packet: TextPacket) -> None:
         assert isinstance(in_text_packet, TextPacket), f"Expected TextPacket, got {type(in_text_packet)}"
+        if in_text_packet.provisional:
+            # the user is still speaking, the transcription may still change
+            logger.debug(f"Received provisional transcription: {in_text_packet.text}")
+            if self._speculative:
+                self._speculate(in_text_packet)
+            return
         logger.success(f"Processing incoming: {in_text_packet}")
         _output_text_packet_generator: Iterator[TextPacket] = self.respond(in_text_packet)
 
@@ -73,25 +184,92 @@ class BotStage(TextToTextStage):
 
         self.pack(_output_text_packet_generator)
 
-    # refactor it as local scope method
-    def _process_stream_chunk(self, chunk: str) -> tuple[str, list[str]]:
-        clean_text = ""
-        commands = []
-        
-        for char in chunk:
-            if char == '[':
-                self._in_command = True
-                self._partial_command = '['
-            elif char == ']' and self._in_command:
-                self._in_command = False
-                self._partial_command += ']'
-                commands.append(self._partial_command[1:-1])
-                self._partial_command = ""
-            elif self._in_command:
-                self._partial_command += char
-            else:
-                clean_text += char
-        return clean_text, commands
+    def _speculate(self, in_text_packet: TextPacket) -> None:
+        """Start generating the response to a provisional transcription in the background, unless one is
+        already generated for a matching transcription"""
+        user_msg = in_text_packet.text
+        if self._in_progress_user_text_packet is not None:
+            # as respond would do with the final transcription
+            user_msg = self._in_progress_user_text_packet.text + user_msg
+        if len(user_msg.split()) < self._speculative_min_words:
+            return
+        with self._speculation_lock:
+            if self._speculation is not None:
+                if transcripts_match(self._speculation.user_msg, user_msg, self._speculative_min_similarity):
+                    return
+                self._speculation.cancel()
+                self._num_speculations_superseded += 1
+            chat_history = self._chat_history.messages
+            logger.debug(f"Speculatively generating response to: {user_msg}")
+            self._speculation = SpeculativeResponse(
+                lambda: self._endpoint.stream(chat_history=chat_history, user_msg=user_msg),
+                user_msg=user_msg,
+                chat_history=chat_history,
+            )
+            self._num_speculations += 1
+
+    def _take_speculation(self, user_msg: str, chat_history: List) -> Optional[SpeculativeResponse]:
+        """The speculative response, if it was generated for a transcription equal to the final one and the same chat history"""
+        with self._speculation_lock:
+            speculation, self._speculation = self._speculation, None
+        if speculation is None:
+            return None
+        if speculation.chat_history != chat_history or \
+            not transcripts_equal(speculation.user_msg, user_msg):
+            logger.debug(f"Discarding speculative response to '{speculation.user_msg}', final transcription: '{user_msg}'")
+            speculation.cancel()
+            self._num_speculations_mismatched += 1
+            return None
+        head_start = (time.perf_counter() - speculation.started_at) * 1000
+        logger.info(f"Committing speculative response to '{speculation.user_msg}', started {head_start:.0f} ms earlier")
+        self._num_speculations_committed += 1
+        self._speculation_head_starts.append(head_start)
+        return speculation
+
+    def _cancel_speculation(self) -> None:
+        with self._speculation_lock:
+            if self._speculation is not None:
+                self._speculation.cancel()
+                self._speculation = None
+
+    @property
+    def metrics(self) -> Dict[str, Dict[str, Union[int, float]]]:
+        metrics = {
+            "responses": {
+                "responses": self._num_responses,
+                "truncated": self._num_truncated_responses,
+            },
+        }
+        if self._speculative:
+            metrics["speculation"] = {
+                "speculations": self._num_speculations,
+                "committed": self._num_speculations_committed,
+                "superseded": self._num_speculations_superseded,
+                "mismatched": self._num_speculations_mismatched,
+                "mean_head_start_ms": sum(self._speculation_head_starts) / len(self._speculation_head_starts) if self._speculation_head_starts else 0.0,
+            }
+        if self._response_cache is not None:
+            # shared by the sessions of the persona, so it covers them all
+            metrics["response_cache"] = self._response_cache.metrics
+        return metrics
+
+    def _dispatch_command(self, command: str) -> None:
+        """Emit an action command on its own channel, without waiting for the response packets"""
+        logger.info(f"Dispatching command: [{command}]")
+        self.emit_event("bot_command", TextPacket(text=command, commands=[command], partial=False, start=True))
+
+    def _retract_user_message(self, user_msg: str) -> None:
+        """Forget a user message found out to be wrongly transcribed, along with the response to it"""
+        in_progress = self._in_progress_user_text_packet
+        if in_progress is not None and in_progress.text.endswith(user_msg):
+            # the response to it was invalidated by the correction
+            text = in_progress.text[:-len(user_msg)]
+            self._in_progress_user_text_packet = TextPacket(
+                text=text, partial=in_progress.partial, start=in_progress.start, timestamp=in_progress.timestamp
+            ) if text.strip() else None
+            logger.warning(f"Retracting in-progress user message: {user_msg}")
+        elif self._chat_history.pop_turn(user_msg):
+            logger.warning(f"Retracting user message and its response from the chat history: {user_msg}")
 
     def respond(self, in_text_packet: TextPacket) -> Iterator[TextPacket]:
         def _pack_response(content, commands=[], partial=False, start=False):
@@ -103,6 +281,9 @@ class BotStage(TextToTextStage):
                 start=start
             )
 
+        if in_text_packet.corrects is not None:
+            self._retract_user_message(in_text_packet.corrects)
+
         # if there is incoming packet; we should invalidate in-progress outcoming packets if any
         if self._in_progress_user_text_packet is not None:
             # if the in-progress user text packet is not None, it means that there is an in-progress user text packet that has been invalidated earlier
@@ -117,28 +298,101 @@ class BotStage(TextToTextStage):
         clean_ai_res_content = ""
         current_commands = []
         first_chunk = True
-        for chunk in self._endpoint.stream(
-            chat_history=self._chat_history,
-            user_msg=in_text_packet.text,
-        ):
-            ai_res_content += chunk
-            if chunk == "":
-                continue
-
-            clean_text, commands = self._process_stream_chunk(chunk)
-            clean_ai_res_content += clean_text
-            current_commands += commands
-            yield _pack_response(clean_text, commands=commands, partial=True, start=first_chunk)
-            first_chunk = False
+        num_chunks, num_packets = 0, 0
+        coalescer = ChunkCoalescer(self._coalescing, self._coalescing_max_delay)
+        self._command_parser.reset()  # an invalidated response may have stopped within a command
+        chat_history = self._chat_history.messages
+        stream: Optional[Iterator[str]] = None
+        speculation: Optional[SpeculativeResponse] = None
+        is_cached = False
+        if self._response_cache is not None:
+            cached_response = self._response_cache.lookup(in_text_packet.text, chat_history)
+            if cached_response is not None:
+                logger.info(f"Replaying cached response: {cached_response}")
+                self._cancel_speculation()
+                stream, is_cached = ResponseCache.replay(cached_response), True
+        if stream is None and self._speculative:
+            speculation = self._take_speculation(in_text_packet.text, chat_history)
+            stream = iter(speculation) if speculation is not None else None
+        if stream is None:
+            stream = self._endpoint.stream(
+                chat_history=chat_history,
+                user_msg=in_text_packet.text,
+            )
+        limiter = ResponseLimiter(max_sentences=self._max_sentences, max_tokens=self._max_response_tokens)
+        is_truncated = False
+        # held back chunks are sent off at their deadline even if the LLM stalls
+        chunks = stream if self._coalescing == "token" else iter_with_deadline(stream, lambda: coalescer.deadline)
+        try:
+            for chunk in chunks:
+                if chunk is None:
+                    coalesced = coalescer.take_due()
+                    if coalesced is not None:
+                        yield _pack_response(coalesced[0], commands=coalesced[1], partial=True, start=first_chunk)
+                        first_chunk = False
+                        num_packets += 1
+                    continue
+                if chunk == "":
+                    continue
+
+                clean_text, commands = self._command_parser.feed(chunk)
+                if self._dispatch_commands:
+                    for command in commands:
+                        self._dispatch_command(command)
+                if not is_truncated:
+                    kept_text, is_truncated = limiter.feed(clean_text)
+                    rest, clean_text = clean_text[len(kept_text):], kept_text
+                    is_done = bool(rest.strip())
+                    if is_truncated:
+                        logger.info(f"Response reached the limits of the persona ({self._max_sentences} sentences, {self._max_response_tokens} tokens), stopping its generation")
+                        self._num_truncated_responses += 1
+                else:
+                    # past the cut, only the commands right after the last sentence are kept, e.g. "Let's roll. [Follow User]"
+                    rest, clean_text = clean_text, ""
+                    is_done = bool(rest.strip()) or (bool(commands) and not self._command_parser.is_in_command)
+                # a cut chunk is kept without the text past the cut
+                ai_res_content += clean_text + "".join(f" [{command}]" for command in commands) if is_truncated else chunk
+                clean_ai_res_content += clean_text
+                current_commands += commands
+                num_chunks += 1
+                coalesced = coalescer.feed(clean_text, commands)
+                if coalesced is not None:
+                    yield _pack_response(coalesced[0], commands=coalesced[1], partial=True, start=first_chunk)
+                    first_chunk = False
+                    num_packets += 1
+                if is_truncated and is_done:
+                    break
+        finally:
+            # stops the generation upstream once the response is cut, or dropped after being invalidated
+            if speculation is not None:
+                speculation.cancel()
+            if hasattr(chunks, "close"):
+                chunks.close()  # closes the stream, from its reading thread if any
+        self._num_responses += 1
+        self._command_parser.flush()
+        coalesced = coalescer.flush()
+        if coalesced is not None:
+            yield _pack_response(coalesced[0], commands=coalesced[1], partial=True, start=first_chunk)
+            num_packets += 1
+        logger.debug(f"Coalesced {num_chunks} LLM chunks into {num_packets} packets")
         logger.success(f"Finished streaming AI response: {clean_ai_res_content}")
 
         yield _pack_response(clean_ai_res_content, commands=current_commands, partial=False, start=True)
-        self._chat_history.append(HumanMessage(content=in_text_packet.text))
+        self._chat_history.add_user_message(in_text_packet.text)
         self._in_progress_user_text_packet = None
-        # append the AIMessage to the chat history
-        self._chat_history.append(AIMessage(content=ai_res_content))
+        # append the AIMessage to the chat history, older turns are summarized in the background
+        self._chat_history.add_ai_message(ai_res_content)
+        if self._response_cache is not None and not is_cached:
+            self._response_cache.add(in_text_packet.text, chat_history, ai_res_content)
         logger.success(f"Finished generating AI Response: {ai_res_content}")
 
+    def on_disconnect(self) -> None:
+        self._cancel_speculation()
+        if self.metrics:
+            logger.info(f"BotStage: Metrics of the session: {self.metrics}")
+        # the cache is shared by the sessions of the persona, so its metrics cover them all
+        logger.info(f"BotStage: Metrics of the query cache: {self._persona.query_cache.metrics}")
+
     def on_incoming_packet_while_processing(self, e: IncomingPacketWhileProcessingException, data: DataPacketStream) -> None:
         # TODO maybe we should consider taking values that have been propagated although not yet processed by next stage
         logger.warning(f"Invalidating stream due to: {e}, hence stopping this stream: {data}")      
@@ -160,6 +414,4 @@ class BotStage(TextToTextStage):
         # CASE 2: assuming that the interrupt is called while the bot is waiting for a new input;
         # in such case the bot chat history should be fixed by removing the last AIMessage message if it is the last message in the chat history
         logger.warning(f"Interrupting current conversation, removing last AIMessage from chat history")
-        assert len(self._chat_history) > 0, "Chat history should not be empty when interrupting"
-        assert isinstance(self._chat_history[-1], AIMessage), "Last message in chat history should be AIMessage when interrupting"
-        self._chat_history.pop()  # remove the last AIMessage from the chat history
\ No newline at end of file
+        self._chat_history.pop_ai_message()  # remove the last AIMessage from the chat history
\ No newline at end of file
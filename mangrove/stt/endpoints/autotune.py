@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import wave
+import platform
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from faster_whisper import WhisperModel
+
+from core.utils import logger
+from storage_manager import MODELS_DIR
+
+AUTOTUNE_CACHE_PATH = os.path.join(MODELS_DIR, "faster_whisper_autotune.json")
+SAMPLE_RATE = 16000
+
+
+def host_fingerprint() -> str:
+    """Identify the host the autotuned configuration is valid for"""
+    import ctranslate2
+    return "|".join([
+        platform.node(), platform.machine(), platform.processor() or "unknown",
+        f"cpus={os.cpu_count()}", f"ctranslate2={ctranslate2.__version__}",
+    ])
+
+
+def resolve_device(device: str) -> str:
+    """Resolve "auto" to the device CTranslate2 would pick"""
+    if device != "auto":
+        return device
+    import ctranslate2
+    return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+
+
+def load_clip(clip_path: Optional[str] = None, duration: float = 3.0) -> np.ndarray:
+    """Load the float32 samples of the clip to benchmark on
+
+    Without a clip, a deterministic speech-like signal (voiced bursts with a syllabic envelope) is synthesized,
+    so that every host is tuned on the same audio.
+
+    Args:
+        clip_path (str, optional): 16 kHz mono 16-bit WAV file
+        duration (float): Duration in seconds of the synthesized clip
+
+    Returns:
+        np.ndarray: float32 samples at 16 kHz
+    """
+    if clip_path is not None:
+        with wave.open(clip_path, "rb") as f:
+            if f.getframerate() != SAMPLE_RATE or f.getnchannels() != 1 or f.getsampwidth() != 2:
+                raise ValueError(f"{clip_path} must be a {SAMPLE_RATE} Hz mono 16-bit WAV file")
+            return np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16).astype(np.float32) / (1 << 15)
+
+    rng = np.random.default_rng(0)
+    t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 140 + 20 * np.sin(2 * np.pi * 3 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 6)) * (0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2)
+    return (0.1 * voiced + rng.normal(0, 0.005, len(t))).astype(np.float32)
+
+
+def candidate_configurations(
+    device: str,
+    compute_types: Sequence[str] = ("int8", "int8_float32", "float32"),
+    cpu_threads: Optional[Sequence[int]] = None,
+    num_workers: Sequence[int] = (1,),
+) -> List[Dict]:
+    """Grid of configurations to benchmark
+
+    Args:
+        device (str): "cpu" or "cuda"
+        compute_types (Sequence[str]): CTranslate2 compute types
+        cpu_threads (Sequence[int], optional): Numbers of threads; defaults to a quarter, half and all of the cores on CPU
+        num_workers (Sequence[int]): Numbers of workers, i.e. transcriptions that can run in parallel
+
+    Returns:
+        List[Dict]: Configurations with the fewest threads and workers first
+    """
+    if cpu_threads is None:
+        num_cpus = os.cpu_count() or 1
+        # the thread count barely matters on GPU, leave it to CTranslate2
+        cpu_threads = sorted({max(1, num_cpus // 4), max(1, num_cpus // 2), num_cpus}) if device == "cpu" else [0]
+    return [
+        {"compute_type": compute_type, "cpu_threads": threads, "num_workers": workers}
+        for workers in sorted(num_workers) for threads in sorted(cpu_threads) for compute_type in compute_types
+    ]
+
+
+def _time_transcription(model: WhisperModel, clip: np.ndarray, repeats: int, max_new_tokens: int) -> float:
+    """Median latency in milliseconds of transcribing the clip, after a warm-up transcription"""
+    def transcribe():
+        segments, _ = model.transcribe(
+            clip, language="en", vad_filter=False, without_timestamps=True,
+            temperature=0.0, max_new_tokens=max_new_tokens,  # the same amount of decoding for every candidate
+        )
+        list(segments)
+
+    transcribe()
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        transcribe()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return float(np.median(latencies))
+
+
+def _load_cache(cache_path: str) -> Dict[str, Dict]:
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable autotune cache {cache_path}: {e}")
+        return {}
+
+
+def autotune_faster_whisper(
+    model_name: str,
+    device: str = "auto",
+    compute_types: Sequence[str] = ("int8", "int8_float32", "float32"),
+    cpu_threads: Optional[Sequence[int]] = None,
+    num_workers: Sequence[int] = (1,),
+    clip_path: Optional[str] = None,
+    repeats: int = 3,
+    max_new_tokens: int = 32,
+    tolerance: float = 0.05,
+    cache_path: str = AUTOTUNE_CACHE_PATH,
+    force: bool = False,
+) -> Tuple[WhisperModel, Dict]:
+    """Load the model with the fastest configuration for this host, benchmarking the candidates if not cached
+
+    Candidates are timed on a short clip one after the other, keeping only the fastest model loaded so far.
+    Any candidate only wins if it is faster than the best one so far by more than the tolerance; candidates
+    with fewer threads and workers being timed first, ties leave cores to VAD and TTS running on the same machine.
+
+    Args:
+        model_name (str): Name of the Whisper model
+        device (str): Device to run the model on, or "auto"
+        compute_types (Sequence[str]): Compute types to try
+        cpu_threads (Sequence[int], optional): Numbers of threads to try, see `candidate_configurations`
+        num_workers (Sequence[int]): Numbers of workers to try
+        clip_path (str, optional): 16 kHz mono 16-bit WAV file to benchmark on, synthesized if None
+        repeats (int): Number of timed transcriptions per candidate
+        max_new_tokens (int): Maximum number of tokens decoded per transcription
+        tolerance (float): Relative speedup over the best candidate so far needed for a candidate to win
+        cache_path (str): JSON file of the configurations chosen per host, model and device
+        force (bool): Benchmark even if a configuration is cached
+
+    Returns:
+        Tuple[WhisperModel, Dict]: The loaded model and its configuration
+
+    Raises:
+        RuntimeError: If no candidate could be loaded on the device
+    """
+    device = resolve_device(device)
+    cache_key = f"{host_fingerprint()}|{model_name}|{device}"
+    cache = _load_cache(cache_path)
+    if not force and cache_key in cache:
+        configuration = cache[cache_key]
+        logger.info(f"Using autotuned faster-whisper configuration from {cache_path}: {configuration}")
+        model = WhisperModel(
+            model_name, device=device, compute_type=configuration["compute_type"],
+            cpu_threads=configuration["cpu_threads"], num_workers=configuration["num_workers"],
+        )
+        return model, dict(configuration, autotuned=True, cached=True)
+
+    clip = load_clip(clip_path)
+    candidates = candidate_configurations(device, compute_types, cpu_threads, num_workers)
+    logger.info(f"Autotuning faster-whisper {model_name} on {device} over {len(candidates)} configurations")
+    best_model, best_configuration = None, None
+    for candidate in candidates:
+        try:
+            model = WhisperModel(model_name, device=device, **candidate)
+            latency = _time_transcription(model, clip, repeats, max_new_tokens)
+        except Exception as e:  # e.g. compute type not supported on the device
+            logger.debug(f"Skipping faster-whisper configuration {candidate}: {e}")
+            continue
+        logger.debug(f"faster-whisper configuration {candidate}: {latency:.1f} ms")
+        if best_configuration is None or latency < best_configuration["latency_ms"] * (1 - tolerance):
+            best_model, best_configuration = model, dict(candidate, device=device, latency_ms=latency)
+        else:
+            del model
+
+    if best_configuration is None:
+        raise RuntimeError(f"No faster-whisper configuration could be loaded on {device}")
+
+    best_configuration["clip_duration_ms"] = len(clip) * 1000 / SAMPLE_RATE
+    cache = _load_cache(cache_path)  # another process may have tuned meanwhile
+    cache[cache_key] = best_configuration
+    try:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        with open(cache_path, "w") as f:
+            json.dump(cache, f, indent=2)
+    except OSError as e:
+        logger.warning(f"Could not cache the autotuned configuration to {cache_path}: {e}")
+    logger.success(f"Autotuned faster-whisper configuration: {best_configuration}")
+    return best_model, dict(best_configuration, autotuned=True, cached=False)
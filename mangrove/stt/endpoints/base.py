@@ -1,12 +1,32 @@
 from abc import ABCMeta, abstractmethod
-from typing import Optional
+from typing import Callable, Optional, Tuple, List, Dict
 from functools import reduce
 
 from core.data import AudioPacket, TextPacket, DataBuffer, DataBufferEmpty
+from core.utils import logger
 
 class STTEndpoint(metaclass=ABCMeta):
     def __init__(self, **kwargs):
         self.input_queue = DataBuffer()
+        self._correction_listeners: List[Callable[[str, str], None]] = []
+
+    @property
+    def metrics(self) -> Dict:
+        """Metrics of the endpoint, if any"""
+        return {}
+
+    def add_correction_listener(self, listener: Callable[[str, str], None]) -> None:
+        """Add a listener called with a transcription already returned and its correction, whenever the
+        endpoint finds out afterwards that it was wrong (e.g. a transcription answered from a cache)
+
+        Args:
+            listener (Callable[[str, str], None]): Listener to be called with the wrong and the right transcriptions
+        """
+        self._correction_listeners.append(listener)
+
+    def _emit_correction(self, wrong_transcription: str, transcription: str) -> None:
+        for listener in self._correction_listeners:
+            listener(wrong_transcription, transcription)
 
     def feed(self, audio_packet: AudioPacket) -> None:
         self.input_queue.put(audio_packet)
@@ -28,6 +48,38 @@ class STTEndpoint(metaclass=ABCMeta):
         audio_packet: AudioPacket = reduce(lambda x, y: x + y, audio_packets)
         return audio_packet
 
+    def get_buffered_speech_audio_packet(self, padding: float = 100) -> Tuple[Optional[AudioPacket], bool]:
+        """Get buffered audio packet trimmed to the speech spans detected by the VAD, if known
+
+        Args:
+            padding (float): Silence in milliseconds to keep around the speech
+
+        Returns:
+            Tuple[Optional[AudioPacket], bool]: The audio packet, None if nothing is buffered or no speech was detected,
+                and whether speech spans were known, i.e. no further voice activity detection is needed
+        """
+        audio_packet = self.get_buffered_audio_packet()
+        if audio_packet is None or audio_packet.speech_spans is None:
+            return audio_packet, False
+        if not audio_packet.speech_spans:
+            logger.debug(f"No speech detected within {audio_packet}, skipping transcription")
+            return None, True
+        trimmed_audio_packet = audio_packet.trim_to_speech(padding)
+        logger.debug(f"Trimmed {audio_packet.duration} ms of audio to {trimmed_audio_packet.duration} ms of speech")
+        return trimmed_audio_packet, True
+
+    def transcribe_words(self, audio_packet: AudioPacket, prompt: Optional[str] = None) -> List[Tuple[float, float, str]]:
+        """Transcribe the audio packet right away, bypassing the input queue (used by streaming transcription)
+
+        Args:
+            audio_packet (AudioPacket): Audio to transcribe
+            prompt (str, optional): Text preceding the audio, to condition the decoding on
+
+        Returns:
+            List[Tuple[float, float, str]]: Words with their start and end in milliseconds relative to the audio packet
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} does not support streaming transcription")
+
     @abstractmethod
     def get_transcription_if_any(self) -> Optional[TextPacket]: # TODO make it a generator and adjust STTStage
         raise NotImplementedError()
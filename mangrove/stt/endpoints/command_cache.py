@@ -0,0 +1,187 @@
+import os
+import re
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Tuple, Union
+
+from core import AudioPacket
+from core.utils import logger
+from core.utils.fingerprint import LogMelFingerprinter
+from storage_manager import COMMANDS_CACHE_DIR
+
+
+class CommandFingerprintCache:
+    """Cache of transcripts of short voice commands, looked up by an acoustic fingerprint (see `LogMelFingerprinter`)
+
+    Only transcripts of the full model are stored, and the most recent `max_entries` are kept, on disk as well
+    once `save` is called, e.g. in the background.
+    """
+
+    FILENAME = "fingerprints.npz"
+
+    def __init__(
+        self,
+        cache_dir: str = COMMANDS_CACHE_DIR,
+        max_duration: int = 2000,
+        similarity_threshold: float = 0.92,
+        margin: float = 0.03,
+        max_duration_ratio: float = 1.5,
+        max_entries: int = 500,
+        num_bands: int = 24,
+        num_frames: int = 32,
+        persist: bool = True,
+    ):
+        """
+        Args:
+            cache_dir (str): Directory the fingerprints are persisted in.
+            max_duration (int): Maximum duration in milliseconds of the utterances looked up and cached.
+            similarity_threshold (float): Minimum cosine similarity of a confident match.
+            margin (float): Minimum lead of the match over the best match with a different transcript.
+            max_duration_ratio (float): Maximum ratio between the durations of matching utterances.
+            max_entries (int): Number of most recent fingerprints kept.
+            num_bands (int): Number of mel bands of the fingerprint.
+            num_frames (int): Number of frames the fingerprint is stretched to.
+            persist (bool): Whether to load and save the fingerprints in `cache_dir`.
+        """
+        self._path = os.path.join(cache_dir, self.FILENAME) if persist else None
+        self._max_duration = max_duration
+        self._similarity_threshold = similarity_threshold
+        self._margin = margin
+        self._max_duration_ratio = max_duration_ratio
+        self._max_entries = max_entries
+        self._fingerprinter = LogMelFingerprinter(num_bands, num_frames)
+        self._lock = threading.Lock()  # entries are added by the verification thread as well
+
+        self._embeddings = np.zeros((0, self._fingerprinter.size), dtype=np.float32)
+        self._durations = np.zeros(0, dtype=np.float32)
+        self._transcripts: List[str] = []
+        self._num_lookups: int = 0
+        self._num_hits: int = 0
+        self._num_confirmed: int = 0
+        self._num_mismatches: int = 0
+        self._is_dirty: bool = False  # entries changed since last saved
+        self._load()
+
+    @staticmethod
+    def normalize_transcript(transcript: str) -> str:
+        return re.sub(r"[^\w' ]", "", transcript.lower()).strip()
+
+    def is_short(self, audio_packet: AudioPacket) -> bool:
+        return audio_packet.duration <= self._max_duration
+
+    def fingerprint(self, audio_packet: AudioPacket) -> np.ndarray:
+        """Compute the fingerprint of the utterance
+
+        Args:
+            audio_packet (AudioPacket): Utterance
+
+        Returns:
+            np.ndarray: L2-normalized vector of `num_bands * num_frames` values
+        """
+        return self._fingerprinter(audio_packet.float, audio_packet.sample_rate)
+
+    def lookup(self, audio_packet: AudioPacket) -> Tuple[Optional[str], np.ndarray]:
+        """Look up the transcript of a short utterance
+
+        Args:
+            audio_packet (AudioPacket): Utterance, at most `max_duration` long
+
+        Returns:
+            Tuple[Optional[str], np.ndarray]: The transcript on a confident match else None, and the fingerprint
+        """
+        embedding = self.fingerprint(audio_packet)
+        with self._lock:
+            self._num_lookups += 1
+            if not self._transcripts:
+                return None, embedding
+            ratios = np.maximum(self._durations, audio_packet.duration) / np.maximum(np.minimum(self._durations, audio_packet.duration), 1)
+            similarities = np.where(ratios <= self._max_duration_ratio, self._embeddings @ embedding, -1.0)
+            best = int(np.argmax(similarities))
+            transcript = self._transcripts[best]
+            normalized = self.normalize_transcript(transcript)
+            others = [s for s, t in zip(similarities, self._transcripts) if self.normalize_transcript(t) != normalized]
+            runner_up = max(others, default=-1.0)
+            if similarities[best] < self._similarity_threshold or similarities[best] - runner_up < self._margin:
+                return None, embedding
+            self._num_hits += 1
+        logger.debug(f"Command cache hit: '{transcript}' (similarity {similarities[best]:.3f}, runner-up {runner_up:.3f})")
+        return transcript, embedding
+
+    def add(self, embedding: np.ndarray, duration: float, transcript: str) -> None:
+        """Add the verified transcript of an utterance, evicting the oldest fingerprints beyond `max_entries`"""
+        with self._lock:
+            self._embeddings = np.vstack([self._embeddings, embedding[None]])[-self._max_entries:]
+            self._durations = np.append(self._durations, np.float32(duration))[-self._max_entries:]
+            self._transcripts = (self._transcripts + [transcript])[-self._max_entries:]
+            self._is_dirty = True
+
+    def verify(self, embedding: np.ndarray, duration: float, cached_transcript: str, transcript: Optional[str]) -> bool:
+        """Record the full model transcript of an utterance answered from the cache
+
+        On a mismatch, the fingerprints with the cached transcript that match the utterance are dropped.
+
+        Returns:
+            bool: Whether the cached transcript was right
+        """
+        transcript = (transcript or "").strip()
+        confirmed = self.normalize_transcript(transcript) == self.normalize_transcript(cached_transcript)
+        with self._lock:
+            if confirmed:
+                self._num_confirmed += 1
+            else:
+                self._num_mismatches += 1
+                wrong = np.array([
+                    t == cached_transcript and s >= self._similarity_threshold
+                    for t, s in zip(self._transcripts, self._embeddings @ embedding)
+                ], dtype=bool)
+                self._embeddings, self._durations = self._embeddings[~wrong], self._durations[~wrong]
+                self._transcripts = [t for t, w in zip(self._transcripts, wrong) if not w]
+                self._is_dirty = True
+        if not confirmed:
+            logger.warning(f"Command cache mismatch: answered '{cached_transcript}', the model heard '{transcript}'")
+        if transcript:
+            self.add(embedding, duration, transcript)
+        return confirmed
+
+    @property
+    def metrics(self) -> Dict[str, Union[int, float]]:
+        with self._lock:
+            return {
+                "entries": len(self._transcripts),
+                "lookups": self._num_lookups,
+                "hits": self._num_hits,
+                "hit_rate": self._num_hits / self._num_lookups if self._num_lookups else 0.0,
+                "confirmed": self._num_confirmed,
+                "mismatches": self._num_mismatches,
+            }
+
+    def _load(self) -> None:
+        if self._path is None or not os.path.exists(self._path):
+            return
+        try:
+            data = np.load(self._path, allow_pickle=False)
+            if data["embeddings"].shape[1] != self._embeddings.shape[1]:
+                logger.warning(f"Ignoring command fingerprints of another shape in {self._path}")
+                return
+            self._embeddings = data["embeddings"].astype(np.float32)[-self._max_entries:]
+            self._durations = data["durations"].astype(np.float32)[-self._max_entries:]
+            self._transcripts = [str(t) for t in data["transcripts"]][-self._max_entries:]
+            logger.info(f"Loaded {len(self._transcripts)} command fingerprints from {self._path}")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable command fingerprints {self._path}: {e}")
+
+    def save(self) -> None:
+        """Persist the fingerprints if they changed since last saved"""
+        if self._path is None:
+            return
+        with self._lock:
+            if not self._is_dirty:
+                return
+            embeddings, durations, transcripts = self._embeddings, self._durations, np.array(self._transcripts, dtype=str)
+            self._is_dirty = False
+        try:
+            tmp_path = self._path + ".tmp.npz"
+            np.savez(tmp_path, embeddings=embeddings, durations=durations, transcripts=transcripts)
+            os.replace(tmp_path, self._path)
+        except OSError as e:
+            logger.warning(f"Could not save command fingerprints to {self._path}: {e}")
@@ -0,0 +1,90 @@
+import math
+import zlib
+from typing import Optional, List, Tuple
+
+from core.utils import logger, LatencyDistribution
+from core.data import AudioPacket, DataBufferEmpty
+from .base import STTEndpoint
+
+DEFAULT_TRANSCRIPTS = [
+    "Hello there.",
+    "Who are you?",
+    "What can you do?",
+    "Follow me.",
+    "Sit down.",
+    "Stop following me.",
+    "Tell me about the Mangrove.",
+    "What do you think about the Palmerians?",
+]
+
+class FakeSTTEndpoint(STTEndpoint):
+    """Deterministic Speech-To-Text endpoint for offline benchmarking
+    The transcript is picked from `transcripts` by a checksum of the audio bytes,
+    so the same audio always yields the same transcript.
+    """
+
+    def __init__(
+        self,
+        transcripts: List[str] = DEFAULT_TRANSCRIPTS,
+        time_to_first_chunk_ms: float = 0.0,
+        time_per_chunk_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        latency_distribution: str = "normal",
+        seed: int = 0,
+        words_per_second: float = 2.5,
+        **kwargs
+    ):
+        """
+        Args:
+            transcripts (List[str]): Pool of transcripts to pick from.
+            time_to_first_chunk_ms (float): Simulated fixed decoding latency per utterance in milliseconds.
+            time_per_chunk_ms (float): Simulated decoding latency per second of audio in milliseconds.
+            jitter_ms (float): Spread of the simulated latencies in milliseconds.
+            latency_distribution (str): Kind of the latency distributions, see `LatencyDistribution`.
+            seed (int): Seed of the latency distributions.
+            words_per_second (float): Speaking rate assumed by streaming transcription to reveal the transcript as audio grows.
+        """
+        super().__init__()
+        if not transcripts:
+            raise ValueError("At least one transcript is required")
+        self._transcripts = list(transcripts)
+        self._first_chunk_latency = LatencyDistribution(time_to_first_chunk_ms, jitter_ms, kind=latency_distribution, seed=seed)
+        self._per_chunk_latency = LatencyDistribution(time_per_chunk_ms, jitter_ms, kind=latency_distribution, seed=seed + 1)
+        self._words_per_second = words_per_second
+
+    def get_transcription_if_any(self) -> Optional[str]:
+        """Get transcription if available
+
+        Returns:
+            str: Transcription if available, else None
+        """
+        audio_packet, _ = self.get_buffered_speech_audio_packet()
+        if audio_packet is None:
+            return None
+
+        self._first_chunk_latency.wait()
+        self._per_chunk_latency.wait(scale=audio_packet.duration / 1000)
+        transcription = self._transcripts[zlib.crc32(audio_packet.bytes) % len(self._transcripts)]
+        logger.debug(f"FakeSTTEndpoint transcribed {audio_packet} as: {transcription}")
+        return transcription
+
+    def transcribe_words(self, audio_packet: AudioPacket, prompt: Optional[str] = None) -> List[Tuple[float, float, str]]:
+        self._first_chunk_latency.wait()
+        self._per_chunk_latency.wait(scale=audio_packet.duration / 1000)
+        # the transcript has to stay the same while the window of the utterance grows and gets trimmed
+        key = audio_packet.utterance_id.encode("utf-8") if audio_packet.utterance_id else audio_packet.bytes
+        words = self._transcripts[zlib.crc32(key) % len(self._transcripts)].split()
+        words = words[len(prompt.split()) if prompt else 0:]  # the prompt is what is already committed
+        num_words = min(len(words), math.ceil(audio_packet.duration / 1000 * self._words_per_second))
+        if num_words == 0:
+            return []
+        word_duration = audio_packet.duration / num_words
+        return [(i * word_duration, (i + 1) * word_duration, word) for i, word in enumerate(words[:num_words])]
+
+    def reset(self):
+        while True:
+            try:
+                self.input_queue.get_nowait()
+            except DataBufferEmpty:
+                break
+        logger.debug(f"Resetting {self.__class__.__name__} endpoint")
@@ -1,21 +1,60 @@
-from typing import Optional
+from typing import Optional, List, Tuple, Dict, Union
+from concurrent.futures import ThreadPoolExecutor
 from faster_whisper import WhisperModel
 
 from core.utils import logger
 from core.data import AudioPacket, DataBufferEmpty
 from core.utils import Timer
 from .base import STTEndpoint
+from .autotune import autotune_faster_whisper
+from .command_cache import CommandFingerprintCache
 
 class FasterWhisperEndpoint(STTEndpoint):
-    def __init__(self, model_name="distil-medium.en", device=None):
+    def __init__(
+        self,
+        model_name="distil-medium.en",
+        device=None,
+        speech_padding=100,
+        compute_type="int8",
+        cpu_threads=0,
+        num_workers=1,
+        autotune=False,
+        autotune_kwargs={},
+        command_cache=False,
+        command_cache_kwargs={},
+    ):
+        """
+        Args:
+            model_name (str): Name of the Whisper model.
+            device (str): Device to run the model on.
+            speech_padding (int): Silence in milliseconds kept around the speech spans detected by the VAD.
+            compute_type (str): CTranslate2 compute type, used if not autotuning.
+            cpu_threads (int): Number of CPU threads, 0 for the CTranslate2 default, used if not autotuning.
+            num_workers (int): Number of transcriptions that can run in parallel, used if not autotuning.
+            autotune (bool): Whether to benchmark compute types and thread counts at startup, see `autotune_faster_whisper`.
+                The chosen configuration is cached on disk per host, the first start on a host taking up to a few
+                model loads longer.
+            autotune_kwargs (Dict): Keyword arguments for `autotune_faster_whisper`.
+            command_cache (bool): Whether to answer short utterances from their acoustic fingerprint when a recent one
+                matches confidently, verifying the answer with the full model in the background and emitting a
+                correction if it was wrong.
+            command_cache_kwargs (Dict): Keyword arguments for `CommandFingerprintCache`.
+        """
         super().__init__()
+        self.speech_padding = speech_padding
         self.device = "auto" if device is None else device
+        self.configuration = {"compute_type": compute_type, "cpu_threads": cpu_threads, "num_workers": num_workers}
         try:
-            self.model = WhisperModel(model_name, device=self.device, compute_type="int8")
-        except:
-            logger.warning(f'Device {device} is not supported, defaulting to CPU!')
+            if autotune:
+                self.model, self.configuration = autotune_faster_whisper(model_name, device=self.device, **autotune_kwargs)
+            else:
+                self.model = WhisperModel(model_name, device=self.device, **self.configuration)
+        except (RuntimeError, ValueError, OSError) as e:  # e.g. device or compute type not supported
+            logger.warning(f'Device {device} is not supported ({e}), defaulting to CPU!')
+            self.configuration = {"compute_type": "default", "cpu_threads": 0, "num_workers": 1}
             self.model = WhisperModel(model_name, device='cpu')
-        
+        logger.info(f"FasterWhisperEndpoint configuration: {self.configuration}")
+
         # Custom VAD parameters
         self.vad_parameters = {
             "threshold": 0.3,          # Lower = more sensitive to quiet speech
@@ -23,8 +62,41 @@ class FasterWhisperEndpoint(STTEndpoint):
             "min_silence_duration_ms": 1000,  # Longer pause needed to split
             "speech_pad_ms": 600,            # Padding around speech segments
         }
+
+        self._command_cache: Optional[CommandFingerprintCache] = None
+        self._verifier: Optional[ThreadPoolExecutor] = None
+        self._streamed_utterance_id: Optional[str] = None  # utterance of which provisional chunks were transcribed
+        if command_cache:
+            self._command_cache = CommandFingerprintCache(**command_cache_kwargs)
+            self._verifier = ThreadPoolExecutor(max_workers=1, thread_name_prefix="command-cache-verifier")
         self.reset()
 
+    @property
+    def metrics(self) -> Dict[str, Union[str, int, float, bool]]:
+        """Configuration the model runs with, and the command cache metrics if enabled"""
+        if self._command_cache is None:
+            return self.configuration
+        return dict(self.configuration, command_cache=self._command_cache.metrics)
+
+    def _is_whole_utterance(self, audio_packet: AudioPacket) -> bool:
+        """Whether the audio packet is a whole utterance, rather than a chunk of an early streamed one"""
+        if audio_packet.utterance_id is None:
+            return True
+        if audio_packet.partial:
+            self._streamed_utterance_id = audio_packet.utterance_id
+            return False
+        return audio_packet.utterance_id != self._streamed_utterance_id
+
+    def _verify_cached_transcription(self, audio_packet: AudioPacket, is_trimmed: bool, embedding, cached_transcription: str) -> None:
+        try:
+            transcription = self._transcribe(audio_packet, is_trimmed)
+            is_confirmed = self._command_cache.verify(embedding, audio_packet.duration, cached_transcription, transcription)
+            self._command_cache.save()
+            if not is_confirmed and transcription and transcription.strip():
+                self._emit_correction(cached_transcription, transcription)
+        except Exception as e:
+            logger.error(f"Failed to verify the cached transcription '{cached_transcription}': {e}")
+
     def get_transcription_if_any(self) -> Optional[str]:
         """Get transcription if available
 
@@ -34,16 +106,39 @@ class FasterWhisperEndpoint(STTEndpoint):
 
         logger.trace("Waiting for transcription ... ")
 
-        audio_packet = self.get_buffered_audio_packet()
+        # the internal VAD pass is redundant if the audio is already trimmed to the speech detected upstream
+        audio_packet, is_trimmed = self.get_buffered_speech_audio_packet(self.speech_padding)
         if audio_packet is None:
             return None
-        
-        
+
+        embedding = None
+        if self._command_cache is not None and self._is_whole_utterance(audio_packet) and self._command_cache.is_short(audio_packet):
+            cached_transcription, embedding = self._command_cache.lookup(audio_packet)
+            if cached_transcription is not None:
+                self._verifier.submit(self._verify_cached_transcription, audio_packet, is_trimmed, embedding, cached_transcription)
+                return cached_transcription
+
+        transcription = self._transcribe(audio_packet, is_trimmed)
+        if embedding is not None and transcription:
+            self._command_cache.add(embedding, audio_packet.duration, transcription.strip())
+            self._verifier.submit(self._command_cache.save)  # off the critical path
+        return transcription
+
+    def _transcribe(self, audio_packet: AudioPacket, is_trimmed: bool) -> Optional[str]:
+        """Transcribe the audio packet with the full model
+
+        Args:
+            audio_packet (AudioPacket): Audio to transcribe
+            is_trimmed (bool): Whether the audio is already trimmed to speech, i.e. no voice activity detection is needed
+
+        Returns:
+            str: Transcription if any speech is recognized, else None
+        """
         with Timer() as timer:
             segments, _ = self.model.transcribe(
                 audio_packet.float,
                 language='en',
-                vad_filter=True,
+                vad_filter=not is_trimmed,
                 vad_parameters=self.vad_parameters,  # Pass custom VAD settings
                 without_timestamps=True
             )
@@ -65,6 +160,20 @@ class FasterWhisperEndpoint(STTEndpoint):
         assert isinstance(_out, str), f"Transcription must be a string, got {type(_out)}"
         return _out
 
+    def transcribe_words(self, audio_packet: AudioPacket, prompt: Optional[str] = None) -> List[Tuple[float, float, str]]:
+        segments, _ = self.model.transcribe(
+            audio_packet.float,
+            language='en',
+            initial_prompt=prompt,
+            condition_on_previous_text=False,
+            vad_filter=False,  # the window is re-decoded as it grows, the upstream VAD already gates it
+            word_timestamps=True,
+        )
+        return [
+            (word.start * 1000, word.end * 1000, word.word.strip())
+            for segment in segments for word in (segment.words or [])
+        ]
+
     def reset(self):
         while True:
             try:
@@ -1,11 +1,12 @@
 import torch
-from typing import Optional, List
+from typing import Optional, List, Callable
 
 from core.data import TextPacket, AudioPacket, AudioBuffer, DataBuffer, DataBufferEmpty
 from core.stage import AudioToTextStage
 from core.stage.base import SequenceMismatchException
 from core.utils import Timer, logger
-from .endpoints.faster_whisper import FasterWhisperEndpoint
+from .endpoints.base import STTEndpoint
+from .streaming import LocalAgreementTranscriber
 
 
 class STTStage(AudioToTextStage):
@@ -14,16 +15,24 @@ class STTStage(AudioToTextStage):
     def __init__(
         self,
         name: str,
+        endpoint: str = "faster_whisper",
         frame_size=512 * 4,
         device=None,
+        endpoint_kwargs={},
+        streaming=False,
+        streaming_interval=500,
         verbose=False,
     ):
         """Initialize STT Stage
 
         Args:
             name (str): Name of the stage
+            endpoint (str, optional): STT endpoint to use. Defaults to "faster_whisper".
             frame_size (int, optional): audio frame size. Defaults to 320.
             device (str, optional): Device to use. Defaults to None.
+            endpoint_kwargs (Dict, optional): Additional keyword arguments for the endpoint. Defaults to {}.
+            streaming (bool, optional): Whether to transcribe early streamed utterances incrementally, packing provisional transcriptions. Defaults to False.
+            streaming_interval (int, optional): Milliseconds of new audio after which the utterance is re-decoded when streaming. Defaults to 500.
             verbose (bool, optional): Whether to print debug messages. Defaults to False.
 
         Raises:
@@ -34,12 +43,58 @@ class STTStage(AudioToTextStage):
         if device is None:
             device = "cuda" if torch.cuda.is_available() else "cpu"
 
-        self._endpoint = FasterWhisperEndpoint(device=device)  # TODO make selection dynamic by name or type
+        self._endpoint: STTEndpoint
+        if endpoint == "faster_whisper":
+            from .endpoints.faster_whisper import FasterWhisperEndpoint
+            self._endpoint = FasterWhisperEndpoint(device=device, **endpoint_kwargs)
+        elif endpoint == "fake":
+            from .endpoints.fake import FakeSTTEndpoint
+            logger.info("Using Fake STT Endpoint")
+            self._endpoint = FakeSTTEndpoint(**endpoint_kwargs)
+        else:
+            raise Exception(f"Unknown Endpoint {endpoint}, available endpoints: faster_whisper, fake")
         
         self._starting_timestamp: Optional[int] = None  # Timestamp of the first audio packet in the stream
         self._recorded_audio_length: int = 0  # FOR DEBUGGING
         # self._interrupted_audio_packet: Optional[AudioPacket] = None
 
+        # early streamed utterances: chunks are transcribed as they arrive and joined at the last chunk
+        self._utterance_id: Optional[str] = None
+        self._utterance_transcripts: List[str] = []
+        self._utterance_recog_time: float = 0.0
+        self._transcript_listeners: List[Callable[[str, Optional[str]], None]] = []
+
+        # incremental transcription of early streamed utterances, with provisional transcriptions packed as they stabilize
+        self._streaming_interval: int = streaming_interval
+        self._streaming_transcriber: Optional[LocalAgreementTranscriber] = LocalAgreementTranscriber(self._endpoint) if streaming else None
+        self._undecoded_duration: float = 0.0
+        self._provisional_text: str = ""
+
+        self._endpoint.add_correction_listener(self._on_correction)
+
+    def add_transcript_listener(self, listener: Callable[[str, Optional[str]], None]) -> None:
+        """Add a listener called with the transcript so far of an early streamed utterance and its id,
+        each time a provisional chunk of it is transcribed (e.g. to detect the end of the turn sooner)
+
+        Args:
+            listener (Callable[[str, Optional[str]], None]): Listener to be called with the transcript and the utterance id
+        """
+        self._transcript_listeners.append(listener)
+
+    def _on_correction(self, wrong_transcription: str, transcription: str) -> None:
+        """Pack the correction of a transcription found out to be wrong after being packed, e.g. by the
+        background verification of a cached transcription; it replaces the wrong one downstream"""
+        logger.warning(f"Correcting transcription '{wrong_transcription}' to '{transcription}'")
+        with self.__lock__:  # called from the thread of the endpoint
+            self.pack(
+                TextPacket(
+                    text=transcription,
+                    partial=True,
+                    start=False,
+                    corrects=wrong_transcription,
+                )
+            )  # timestamped now, so that it invalidates the streams in progress on the wrong transcription
+
     def on_start(self):
         self._recorded_audio_length = 0  # FOR DEBUGGING
         # self._interrupted_audio_packet = None
@@ -51,15 +106,31 @@ class STTStage(AudioToTextStage):
             self._endpoint.reset()
             self.input_buffer.reset()
             self._starting_timestamp = None
+            self._reset_utterance()
             # self._interrupted_audio_packet = None
         else:
             self.log("[stt-soft-reset]", end=" ")
         self._recorded_audio_length = 0
 
+    def _reset_utterance(self) -> None:
+        """Reset the context of the early streamed utterance"""
+        self._utterance_id = None
+        self._utterance_transcripts = []
+        self._utterance_recog_time = 0.0
+        self._undecoded_duration = 0.0
+        self._provisional_text = ""
+        if self._streaming_transcriber is not None:
+            self._streaming_transcriber.reset()
+
     def process(self, audio_packet) -> None:
         """Process audio buffer and return transcription if any found"""
         assert isinstance(audio_packet, AudioPacket), f"Expected AudioPacket, got {type(audio_packet)}"
 
+        if audio_packet.utterance_id is not None:
+            # chunk of an utterance streamed early by the VAD, can be shorter than a frame
+            self._process_utterance_chunk(audio_packet)
+            return
+
         if len(audio_packet) < self.frame_size:
             raise Exception("Partial audio packet found; this should not happen")
 
@@ -90,8 +161,107 @@ class STTStage(AudioToTextStage):
                     )
                 )  # put transcription to the output buffer
 
+    def _process_utterance_chunk(self, audio_packet: AudioPacket) -> None:
+        """Transcribe a chunk of an early streamed utterance right away,
+        and pack the transcription of the whole utterance once its last chunk is processed
+
+        Args:
+            audio_packet (AudioPacket): chunk of the utterance
+        """
+        if audio_packet.utterance_id != self._utterance_id:
+            if self._utterance_id is not None:
+                logger.warning(f"Utterance {self._utterance_id} was not completed, dropping it")
+            self._reset_utterance()
+            self._utterance_id = audio_packet.utterance_id
+            self._starting_timestamp = audio_packet.timestamp
+            self._recorded_audio_length = 0
+
+        logger.info(f"Processing incoming {'provisional' if audio_packet.partial else 'final'} chunk {audio_packet}")
+        self._recorded_audio_length += audio_packet.duration # FOR DEBUGGING
+        if self._streaming_transcriber is not None:
+            self._process_utterance_chunk_streaming(audio_packet)
+            return
+
+        with Timer() as timer:
+            self._endpoint.feed(audio_packet)
+            transcription: Optional[str] = self._endpoint.get_transcription_if_any()
+        self._utterance_recog_time += timer.interval
+        transcription = (transcription or "").strip()
+        if transcription:
+            self._utterance_transcripts.append(transcription)
+
+        if audio_packet.partial:
+            if self._utterance_transcripts:
+                for listener in self._transcript_listeners:
+                    listener(" ".join(self._utterance_transcripts), self._utterance_id)
+            return
+
+        # last chunk: only the decoding of this chunk is on the critical path
+        self._pack_utterance_transcription(" ".join(self._utterance_transcripts), timer.interval)
+
+    def _process_utterance_chunk_streaming(self, audio_packet: AudioPacket) -> None:
+        """Re-decode the utterance so far every `streaming_interval` ms of new audio, packing provisional
+        transcriptions (committed prefix followed by the tentative rest), and the final one at its last chunk
+
+        Args:
+            audio_packet (AudioPacket): chunk of the utterance
+        """
+        self._streaming_transcriber.insert_audio(audio_packet)
+        self._undecoded_duration += audio_packet.duration
+
+        if not audio_packet.partial:
+            with Timer() as timer:
+                transcription = self._streaming_transcriber.finish()
+            self._utterance_recog_time += timer.interval
+            self._pack_utterance_transcription(transcription, timer.interval)
+            return
+
+        if self._undecoded_duration < self._streaming_interval:
+            return
+        self._undecoded_duration = 0.0
+        with Timer() as timer:
+            self._streaming_transcriber.process()
+        self._utterance_recog_time += timer.interval
+
+        transcription = self._streaming_transcriber.text
+        if not transcription or transcription == self._provisional_text:
+            return
+        self._provisional_text = transcription
+        for listener in self._transcript_listeners:
+            listener(transcription, self._utterance_id)
+        self.pack(
+            TextPacket(
+                timestamp=self._starting_timestamp,
+                text=transcription,
+                partial=True,
+                start=False,
+                provisional=True,  # to be revised, the end of the turn is not reached yet
+                committed_text=self._streaming_transcriber.committed_text,
+                recog_time=timer.interval,
+                recorded_audio_length=self._recorded_audio_length,
+            )
+        )
+
+    def _pack_utterance_transcription(self, transcription: str, recog_time: float) -> None:
+        """Pack the transcription of the whole utterance and reset for the next one"""
+        if transcription:
+            logger.debug(f"Utterance {self._utterance_id} transcribed in {self._utterance_recog_time} (last chunk in {recog_time})")
+            self.pack(
+                TextPacket(
+                    timestamp=self._starting_timestamp,
+                    text=transcription,
+                    partial=True,  # TODO is it?
+                    start=False,
+                    recog_time=recog_time,
+                    recorded_audio_length=self._recorded_audio_length,
+                )
+            )
+        self._reset_utterance()
+        self.reset_audio_stream(reset_buffers=False)
+
 
     def on_disconnect(self) -> None:
+        logger.info(f"STTStage: Metrics of the session: {self._endpoint.metrics}")
         self.reset_audio_stream()
         self.log("[disconnect]", end="\n")
 
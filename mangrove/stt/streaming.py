@@ -0,0 +1,97 @@
+import re
+from typing import List, Optional, Tuple
+
+from core import AudioPacket
+from core.utils import logger
+from .endpoints.base import STTEndpoint
+
+# (start, end, word) with start and end in milliseconds relative to the decoded audio
+Word = Tuple[float, float, str]
+
+class LocalAgreementTranscriber:
+    """Incremental transcription of a growing utterance with the local-agreement policy
+
+    Every `process` re-decodes the audio received so far and commits the longest prefix on which
+    the last two hypotheses agree. The committed words are never revised: the audio they span is
+    dropped from the window, and the committed text is given to the decoder as a prompt instead.
+    """
+
+    def __init__(self, endpoint: STTEndpoint, max_prompt_length: int = 200):
+        """
+        Args:
+            endpoint (STTEndpoint): Endpoint decoding audio into timestamped words.
+            max_prompt_length (int): Maximum number of characters of committed text given as a prompt.
+        """
+        self._endpoint = endpoint
+        self._max_prompt_length = max_prompt_length
+        self.reset()
+
+    def reset(self) -> None:
+        """Reset for a new utterance"""
+        self._audio_packet: Optional[AudioPacket] = None  # audio not yet committed
+        self._committed_words: List[str] = []
+        self._previous_hypothesis: List[Word] = []
+        self._tentative_words: List[str] = []
+
+    @property
+    def committed_text(self) -> str:
+        return " ".join(self._committed_words)
+
+    @property
+    def text(self) -> str:
+        """Committed text followed by the tentative rest of the last hypothesis"""
+        return " ".join(self._committed_words + self._tentative_words)
+
+    def insert_audio(self, audio_packet: AudioPacket) -> None:
+        self._audio_packet = audio_packet if self._audio_packet is None else self._audio_packet + audio_packet
+
+    @staticmethod
+    def _normalize(word: str) -> str:
+        return re.sub(r"[^\w']", "", word.lower())
+
+    def _decode(self) -> List[Word]:
+        if self._audio_packet is None or self._audio_packet.duration == 0:
+            return []
+        prompt = self.committed_text[-self._max_prompt_length:] or None
+        return self._endpoint.transcribe_words(self._audio_packet, prompt=prompt)
+
+    def process(self) -> Tuple[str, str]:
+        """Re-decode the audio so far and commit the prefix agreed on with the previous hypothesis
+
+        Returns:
+            Tuple[str, str]: Newly committed text, and the tentative text following all committed text
+        """
+        hypothesis = self._decode()
+        num_agreed = 0
+        for previous, current in zip(self._previous_hypothesis, hypothesis):
+            if self._normalize(previous[2]) != self._normalize(current[2]):
+                break
+            num_agreed += 1
+
+        newly_committed = [word for _, _, word in hypothesis[:num_agreed]]
+        if num_agreed > 0:
+            # drop the committed audio from the window, the committed text is the prompt from now on
+            committed_end = hypothesis[num_agreed - 1][1]
+            # word timestamps are in milliseconds of the float32 samples decoded
+            sample_size = AudioPacket.FLOAT_BYTES_PER_SAMPLE * self._audio_packet.num_channels
+            offset = min(len(self._audio_packet), int(committed_end * self._audio_packet.sample_rate / 1000) * sample_size)
+            self._audio_packet = self._audio_packet[offset:] if offset < len(self._audio_packet) else None
+            self._committed_words += newly_committed
+            hypothesis = hypothesis[num_agreed:]
+
+        self._previous_hypothesis = hypothesis
+        self._tentative_words = [word for _, _, word in hypothesis]
+        if newly_committed:
+            logger.debug(f"Committed: {' '.join(newly_committed)} | tentative: {' '.join(self._tentative_words)}")
+        return " ".join(newly_committed), " ".join(self._tentative_words)
+
+    def finish(self) -> str:
+        """Decode the rest of the utterance and commit it all
+
+        Returns:
+            str: Transcription of the whole utterance
+        """
+        self._committed_words += [word for _, _, word in self._decode()]
+        text = self.committed_text
+        self.reset()
+        return text
@@ -0,0 +1,72 @@
+import math
+import wave
+import zlib
+import numpy as np
+from typing import Generator
+from core.data import AudioPacket, TextPacket
+from core.utils import LatencyDistribution
+from .base import TTSEndpoint
+
+class FakeTTSEndpoint(TTSEndpoint):
+    """Deterministic Text-To-Speech endpoint for offline benchmarking
+    It synthesizes a quiet tone whose pitch depends on a checksum of the text and whose
+    duration is proportional to the text length, streamed in fixed-size chunks.
+    """
+
+    def __init__(
+        self,
+        ms_per_char: float = 60.0,
+        chunk_duration_ms: int = 100,
+        sample_rate: int = 16000,
+        time_to_first_chunk_ms: float = 0.0,
+        time_per_chunk_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        latency_distribution: str = "normal",
+        seed: int = 0,
+        **kwargs
+    ):
+        """
+        Args:
+            ms_per_char (float): Duration of the synthesized audio per character of text in milliseconds.
+            chunk_duration_ms (int): Duration of each streamed audio chunk in milliseconds.
+            sample_rate (int): Sample rate of the synthesized audio.
+            time_to_first_chunk_ms (float): Simulated latency before the first chunk in milliseconds.
+            time_per_chunk_ms (float): Simulated latency between consecutive chunks in milliseconds.
+            jitter_ms (float): Spread of the simulated latencies in milliseconds.
+            latency_distribution (str): Kind of the latency distributions, see `LatencyDistribution`.
+            seed (int): Seed of the latency distributions.
+        """
+        self.ms_per_char = ms_per_char
+        self.chunk_duration_ms = chunk_duration_ms
+        self.sample_rate = sample_rate
+        self._first_chunk_latency = LatencyDistribution(time_to_first_chunk_ms, jitter_ms, kind=latency_distribution, seed=seed)
+        self._per_chunk_latency = LatencyDistribution(time_per_chunk_ms, jitter_ms, kind=latency_distribution, seed=seed + 1)
+
+    def _synthesize(self, text: str) -> np.ndarray:
+        """Synthesize int16 samples for the given text"""
+        num_samples = int(len(text) * self.ms_per_char * self.sample_rate / 1000)
+        frequency = 200 + zlib.crc32(text.encode("utf-8")) % 300
+        t = np.arange(num_samples, dtype=np.float32) / self.sample_rate
+        return (0.1 * np.sin(2 * math.pi * frequency * t) * 32767).astype(np.int16)
+
+    def text_to_audio_file(self, text, filepath) -> None:
+        with wave.open(filepath, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(self.sample_rate)
+            f.writeframes(self._synthesize(text).tobytes())
+
+    def text_to_audio(self, text_packet: TextPacket) -> Generator[AudioPacket, None, None]:
+        samples = self._synthesize(text_packet.text)
+        chunk_len = int(self.sample_rate * self.chunk_duration_ms / 1000)
+        self._first_chunk_latency.wait()
+        for i in range(0, len(samples), chunk_len):
+            if i > 0:
+                self._per_chunk_latency.wait()
+            yield AudioPacket({
+                    'bytes': samples[i:i + chunk_len].tobytes(),
+                    'sampleRate': self.sample_rate,
+                    'sampleWidth': 2,
+                    'numChannels': 1,
+                }, resample=False, is_processed=True
+            )
@@ -43,8 +43,12 @@ class TTSStage(TextToAudioStage):
             from .endpoints.gtts import GTTSEndpoint
             logger.info("Using GTTS TTS Endpoint")
             self.endpoint = GTTSEndpoint()
+        elif endpoint == "fake":
+            from .endpoints.fake import FakeTTSEndpoint
+            logger.info("Using Fake TTS Endpoint")
+            self.endpoint = FakeTTSEndpoint(**endpoint_kwargs)
         else:
-            raise Exception(f"Unknown Endpoint {endpoint}, available endpoints: pyttsx3, tts")
+            raise Exception(f"Unknown Endpoint {endpoint}, available endpoints: pyttsx3, xtts, elevenlabs, gtts, fake")
 
         self._sentence_text_packet = None
         self.debug = False
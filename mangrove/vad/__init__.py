@@ -1 +1,3 @@
-from .stage import VADStage
\ No newline at end of file
+from .stage import VADStage
+from .endpointing import EndpointingPolicy, FixedEndpointingPolicy, AdaptiveEndpointingPolicy
+from .energy_gate import EnergyGate
\ No newline at end of file
@@ -0,0 +1,240 @@
+import re
+import threading
+import collections
+from abc import ABCMeta, abstractmethod
+from typing import Dict, Optional, Union
+
+from core.utils import logger
+
+# last words after which the user is most likely not done yet
+INCOMPLETE_ENDINGS = {
+    "and", "but", "or", "so", "because", "if", "then", "than", "that", "which", "who",
+    "the", "a", "an", "to", "of", "for", "with", "in", "on", "at", "my", "your",
+    "um", "uh", "uhm", "er", "like",
+}
+
+class EndpointingPolicy(metaclass=ABCMeta):
+    """Decides how much tail silence ends the turn of the user
+
+    It also keeps track of the latency saved compared to a fixed tail silence threshold of `max_tail_silence_threshold`,
+    and of premature cuts: turns after which the user resumed speaking sooner than `max_tail_silence_threshold`,
+    i.e. speech that a fixed threshold would have kept within the same turn.
+    """
+
+    def __init__(self, max_tail_silence_threshold: int = 750):
+        """
+        Args:
+            max_tail_silence_threshold (int): Tail silence in milliseconds that a fixed policy waits for before ending the turn.
+        """
+        self._max_tail_silence_threshold = max_tail_silence_threshold
+        self._lock = threading.Lock()  # transcripts are observed from the STT thread
+        self._utterance_id: Optional[str] = None
+        self._last_speech_end_timestamp: Optional[int] = None
+        self._num_turns: int = 0
+        self._num_premature_cuts: int = 0
+        self._total_latency_saved: int = 0
+
+    @abstractmethod
+    def tail_silence_threshold(self) -> int:
+        """Current tail silence threshold in milliseconds after which the utterance is sent off"""
+        raise NotImplementedError()
+
+    def observe_pause(self, duration: int) -> None:
+        """Observe a pause within an utterance after which the user resumed speaking
+
+        Args:
+            duration (int): Duration of the pause in milliseconds
+        """
+        pass
+
+    def observe_transcript(self, text: str, utterance_id: Optional[str] = None) -> None:
+        """Observe the transcript of the on-going utterance so far
+
+        Args:
+            text (str): Transcript so far
+            utterance_id (str, optional): Id of the transcribed utterance, transcripts of other utterances are ignored.
+        """
+        pass
+
+    def on_utterance_start(self, utterance_id: str, timestamp: int) -> None:
+        """Called when the user starts speaking a new utterance
+
+        Args:
+            utterance_id (str): Id of the new utterance
+            timestamp (int): Timestamp of the first speech audio packet in milliseconds
+        """
+        with self._lock:
+            self._utterance_id = utterance_id
+            if self._last_speech_end_timestamp is not None:
+                gap = timestamp - self._last_speech_end_timestamp
+                if gap < self._max_tail_silence_threshold:
+                    self._num_premature_cuts += 1
+                    logger.warning(f"Premature end of turn: user resumed speaking after {gap} ms")
+                    self._on_premature_cut(gap)
+            self._last_speech_end_timestamp = None
+
+    def on_utterance_end(self, speech_end_timestamp: int, tail_silence_threshold: int) -> None:
+        """Called when the utterance is sent off
+
+        Args:
+            speech_end_timestamp (int): Timestamp of the start of the tail silence in milliseconds
+            tail_silence_threshold (int): Tail silence threshold in milliseconds that ended the turn
+        """
+        with self._lock:
+            self._utterance_id = None
+            self._last_speech_end_timestamp = speech_end_timestamp
+            self._num_turns += 1
+            self._total_latency_saved += max(0, self._max_tail_silence_threshold - tail_silence_threshold)
+
+    def _on_premature_cut(self, gap: int) -> None:
+        """Adapt to a premature cut, called with the lock held
+
+        Args:
+            gap (int): Silence in milliseconds between the end of the turn and the resumed speech
+        """
+        pass
+
+    @property
+    def metrics(self) -> Dict[str, Union[int, float]]:
+        """Latency saved versus premature cuts so far"""
+        with self._lock:
+            return {
+                "turns": self._num_turns,
+                "latency_saved_ms": self._total_latency_saved,
+                "mean_latency_saved_ms": self._total_latency_saved / self._num_turns if self._num_turns else 0.0,
+                "premature_cuts": self._num_premature_cuts,
+                "premature_cut_rate": self._num_premature_cuts / self._num_turns if self._num_turns else 0.0,
+            }
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}(max_tail_silence_threshold={self._max_tail_silence_threshold})"
+
+
+class FixedEndpointingPolicy(EndpointingPolicy):
+    """Ends the turn after a constant tail silence"""
+
+    def tail_silence_threshold(self) -> int:
+        return self._max_tail_silence_threshold
+
+
+class AdaptiveEndpointingPolicy(EndpointingPolicy):
+    """Ends the turn after a tail silence adapted to the pauses the user makes within utterances
+
+    The threshold is a high quantile of the recent intra-utterance pauses plus a margin, bounded by
+    `min_tail_silence_threshold` and `max_tail_silence_threshold`. Optionally, if the transcript of the
+    on-going utterance looks complete (terminal punctuation and no trailing conjunction or filler),
+    the threshold is shortened further; if it looks incomplete, the maximum threshold is used.
+    """
+
+    def __init__(
+        self,
+        max_tail_silence_threshold: int = 750,
+        min_tail_silence_threshold: int = 300,
+        pause_quantile: float = 0.9,
+        margin: int = 100,
+        history_size: int = 50,
+        min_num_pauses: int = 5,
+        use_transcript: bool = True,
+        complete_transcript_factor: float = 0.6,
+    ):
+        """
+        Args:
+            max_tail_silence_threshold (int): Upper bound of the tail silence threshold in milliseconds, also used until enough pauses are observed.
+            min_tail_silence_threshold (int): Lower bound of the tail silence threshold in milliseconds.
+            pause_quantile (float): Quantile of the recent intra-utterance pauses that should not end the turn.
+            margin (int): Milliseconds added on top of the pause quantile.
+            history_size (int): Number of recent pauses to keep.
+            min_num_pauses (int): Number of pauses to observe before adapting.
+            use_transcript (bool): If True, use the completeness of the transcript so far to adjust the threshold.
+            complete_transcript_factor (float): Factor applied to the threshold when the transcript looks complete.
+        """
+        if not 0 < min_tail_silence_threshold <= max_tail_silence_threshold:
+            raise ValueError("min_tail_silence_threshold must be positive and at most max_tail_silence_threshold")
+        if not 0 < pause_quantile <= 1:
+            raise ValueError("pause_quantile must be in (0, 1]")
+        super().__init__(max_tail_silence_threshold=max_tail_silence_threshold)
+        self._min_tail_silence_threshold = min_tail_silence_threshold
+        self._pause_quantile = pause_quantile
+        self._margin = margin
+        self._min_num_pauses = min_num_pauses
+        self._use_transcript = use_transcript
+        self._complete_transcript_factor = complete_transcript_factor
+        self._pauses = collections.deque(maxlen=history_size)
+        self._is_transcript_complete: Optional[bool] = None
+
+    @staticmethod
+    def is_transcript_complete(text: str) -> Optional[bool]:
+        """Cheap guess whether the transcript is a complete turn
+
+        Returns:
+            bool: True if it looks complete, False if it looks incomplete, None if unknown
+        """
+        text = text.strip()
+        if not text:
+            return None
+        words = re.findall(r"[\w']+", text.lower())
+        if (words and words[-1] in INCOMPLETE_ENDINGS) or text.endswith((",", "...", "-")):
+            return False
+        if text.endswith((".", "?", "!")):
+            return True
+        return None
+
+    def observe_pause(self, duration: int) -> None:
+        with self._lock:
+            self._pauses.append(duration)
+
+    def observe_transcript(self, text: str, utterance_id: Optional[str] = None) -> None:
+        if not self._use_transcript:
+            return
+        with self._lock:
+            if utterance_id is not None and utterance_id != self._utterance_id:
+                return  # late transcript of a previous utterance
+            self._is_transcript_complete = self.is_transcript_complete(text)
+
+    def on_utterance_start(self, utterance_id: str, timestamp: int) -> None:
+        with self._lock:
+            self._is_transcript_complete = None
+        super().on_utterance_start(utterance_id, timestamp)
+
+    def _on_premature_cut(self, gap: int) -> None:
+        # the silence was a pause within the turn after all
+        self._pauses.append(gap)
+
+    def tail_silence_threshold(self) -> int:
+        with self._lock:
+            if len(self._pauses) < self._min_num_pauses:
+                threshold = self._max_tail_silence_threshold
+            else:
+                pauses = sorted(self._pauses)
+                threshold = pauses[int(self._pause_quantile * (len(pauses) - 1))] + self._margin
+            if self._is_transcript_complete is True:
+                threshold = int(threshold * self._complete_transcript_factor)
+            elif self._is_transcript_complete is False:
+                threshold = self._max_tail_silence_threshold
+        return int(min(self._max_tail_silence_threshold, max(self._min_tail_silence_threshold, threshold)))
+
+    def __str__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(min_tail_silence_threshold={self._min_tail_silence_threshold}, "
+            f"max_tail_silence_threshold={self._max_tail_silence_threshold}, pause_quantile={self._pause_quantile}, "
+            f"use_transcript={self._use_transcript})"
+        )
+
+
+def create_endpointing_policy(policy: str = "fixed", max_tail_silence_threshold: int = 750, **policy_kwargs) -> EndpointingPolicy:
+    """Create an endpointing policy by name
+
+    Args:
+        policy (str): Name of the policy, either "fixed" or "adaptive".
+        max_tail_silence_threshold (int): Tail silence threshold of the fixed policy, upper bound of the adaptive one.
+        **policy_kwargs: Additional keyword arguments for the policy.
+
+    Returns:
+        EndpointingPolicy: The endpointing policy
+    """
+    if policy == "fixed":
+        return FixedEndpointingPolicy(max_tail_silence_threshold=max_tail_silence_threshold, **policy_kwargs)
+    elif policy == "adaptive":
+        return AdaptiveEndpointingPolicy(max_tail_silence_threshold=max_tail_silence_threshold, **policy_kwargs)
+    else:
+        raise Exception(f"Unknown endpointing policy {policy}, available policies: fixed, adaptive")
@@ -1,10 +1,12 @@
 import collections
-from typing import Union, List
+from typing import Union, List, Dict, Optional
 from abc import ABCMeta, abstractmethod
 from functools import reduce
 from storage_manager import write_output
 from core import AudioBuffer, AudioPacket
 from core.utils import logger
+from ..endpointing import EndpointingPolicy, create_endpointing_policy
+from ..energy_gate import EnergyGate
 
 class VoiceActivityDetector(metaclass=ABCMeta):
 
@@ -18,6 +20,13 @@ class VoiceActivityDetector(metaclass=ABCMeta):
         tail_silence_threshold: int = 750, # to cut off the utterance and send it off
         threshold_to_determine_speaking: int = 1000, # 1 second
         frame_size: int = 320 * 3,
+        early_streaming: bool = False,
+        provisional_pause_threshold: int = 300, # to send off a provisional chunk at a natural pause
+        max_provisional_chunk_duration: int = 5000, # to send off a provisional chunk while speech continues
+        endpointing: Union[str, EndpointingPolicy] = "fixed",
+        endpointing_kwargs: Dict = {},
+        energy_gate: bool = False,
+        energy_gate_kwargs: Dict = {},
         verbose: bool = False
     ):
         """
@@ -26,10 +35,20 @@ class VoiceActivityDetector(metaclass=ABCMeta):
         Args:
             head_silence_buffer_size (int): Amount of buffered silence in milliseconds to place at the head of the utterance.
             tail_silence_threshold (int): Amount of silence in milliseconds after which the utterance is observed before it is sent off.
+                With an adaptive endpointing policy, it is the upper bound of the adapted threshold.
             threshold_to_determine_speaking (int): Minimum duration in milliseconds of the utterance to be considered as speaking.
             frame_size (int): Size of the audio frame in samples.
+            early_streaming (bool): If True, send off provisional chunks of the utterance while the user is still speaking.
+            provisional_pause_threshold (int): Amount of silence in milliseconds within an utterance after which a provisional chunk is sent off.
+            max_provisional_chunk_duration (int): Maximum duration in milliseconds of a chunk before it is sent off even if speech continues.
+            endpointing (Union[str, EndpointingPolicy]): Policy deciding the tail silence that ends the turn, either "fixed", "adaptive" or a policy instance.
+            endpointing_kwargs (Dict): Additional keyword arguments for the endpointing policy if given by name.
+            energy_gate (bool): If True, frames of obvious silence between turns are marked without invoking `is_speech`.
+            energy_gate_kwargs (Dict): Additional keyword arguments for the `EnergyGate`.
             verbose (bool): If True, enables verbose logging.
         """
+        if early_streaming and not 0 < provisional_pause_threshold < tail_silence_threshold:
+            raise ValueError("provisional_pause_threshold must be positive and less than tail_silence_threshold")
 
         self._verbose = verbose
 
@@ -37,22 +56,89 @@ class VoiceActivityDetector(metaclass=ABCMeta):
         self._frame_size: int = frame_size
         self._head_silence_buffer_size: int = head_silence_buffer_size
         self._threshold_to_determine_speaking: int = threshold_to_determine_speaking
+        self._early_streaming: bool = early_streaming
+        self._provisional_pause_threshold: int = provisional_pause_threshold
+        self._max_provisional_chunk_duration: int = max_provisional_chunk_duration
+        if isinstance(endpointing, EndpointingPolicy):
+            self._endpointing_policy: EndpointingPolicy = endpointing
+        else:
+            self._endpointing_policy: EndpointingPolicy = create_endpointing_policy(
+                endpointing, max_tail_silence_threshold=tail_silence_threshold, **endpointing_kwargs
+            )
+        self._energy_gate: Optional[EnergyGate] = EnergyGate(**energy_gate_kwargs) if energy_gate else None
 
         self._tail_silence_start_timestamp: int = None
         self._reset_head_silences_buffer()
 
-        self._command_audio_packet: AudioPacket = None
-        self._output_queue: AudioBuffer = AudioBuffer()
+        self._num_utterances: int = 0
+        self._utterance_id: str = None
+        self._utterance_start_timestamp: int = None
+        self._is_pause_chunk_sent: bool = False
+        self._command_audio_packet: AudioPacket = None # current (not yet sent off) chunk of the utterance
+        self._speech_spans: List[List[float]] = [] # speech spans of the current chunk
+        self._output_queue: collections.deque[AudioPacket] = collections.deque()
+        self._endpoint_latencies: List[int] = []  # tail silences in milliseconds after which the utterances were sent off
 
     @property
     def frame_size(self):
         return self._frame_size
 
+    @property
+    def endpointing_policy(self) -> EndpointingPolicy:
+        return self._endpointing_policy
+
+    @property
+    def metrics(self) -> Dict[str, Dict[str, Union[int, float]]]:
+        """Endpoint latency (delay between the end of speech and the utterance being sent off, in audio time),
+        endpointing and energy gate metrics of the session so far"""
+        metrics = {
+            "endpoint_latency": {
+                "utterances": len(self._endpoint_latencies),
+                "mean_ms": sum(self._endpoint_latencies) / len(self._endpoint_latencies) if self._endpoint_latencies else 0.0,
+                "max_ms": max(self._endpoint_latencies, default=0),
+            },
+            "endpointing": self._endpointing_policy.metrics,
+        }
+        if self._energy_gate is not None:
+            metrics["energy_gate"] = self._energy_gate.metrics
+        return metrics
+
     def reset(self) -> None:
         self._command_audio_packet: AudioPacket = None
+        self._speech_spans = []
         self._tail_silence_start_timestamp: int = None
+        self._utterance_id = None
+        self._utterance_start_timestamp = None
+        self._is_pause_chunk_sent = False
         self._reset_head_silences_buffer()
 
+    def reset_session(self) -> None:
+        """Reset the utterance context along with the per-session calibration"""
+        self.reset()
+        self._endpoint_latencies = []
+        if self._energy_gate is not None:
+            self._energy_gate.reset()
+
+    def on_gated_silence(self) -> None:
+        """Called instead of `is_speech` when the energy gate marks a frame as silence;
+        detectors carrying state across frames can override it to drop that state"""
+        pass
+
+    def _is_speech_gated(self, audio_packet: AudioPacket) -> bool:
+        """Check if audio is speech, skipping the detector for obvious silence between turns"""
+        if self._energy_gate is None or self._utterance_id is not None:
+            # within an utterance, pauses are left to the detector not to disturb endpointing
+            return self.is_speech(audio_packet)
+
+        if self._energy_gate.is_silence(audio_packet):
+            self.on_gated_silence()
+            return False
+
+        is_speech = self.is_speech(audio_packet)
+        if not is_speech:
+            self._energy_gate.observe_silence()
+        return is_speech
+
     def _reset_head_silences_buffer(self) -> None:
         """Reset silence buffer which is concatenated to the head of the utterance"""
         amount_to_keep_packets = (self._frame_size // 320) * (self._head_silence_buffer_size // 20)
@@ -86,24 +172,74 @@ class VoiceActivityDetector(metaclass=ABCMeta):
             audio_packet (AudioPacket): The audio packet to be processed.
         """
         assert isinstance(audio_packet, AudioPacket), f"audio_packet must be AudioPacket, found {type(audio_packet)}"
-        if self.is_speech(audio_packet):
-            if self._command_audio_packet is None:
-                # start a new command audio packet if not already started
-                self._command_audio_packet = self._concat_head_buffered_silences(audio_packet) # conatenate a bit of the buffered audio right before it.
+        self._feed_decision(audio_packet, self._is_speech_gated(audio_packet))
+
+    def feed_frames(self, audio_packets: List[AudioPacket]) -> None:
+        """Feed consecutive frames at once, e.g. to catch up on a backlog.
+        The frames are scored by a single `is_speech` call, in order, then processed one by one as with `feed`.
+        Args:
+            audio_packets (List[AudioPacket]): Consecutive frames to be processed.
+        """
+        i = 0
+        if self._energy_gate is not None and self._utterance_id is None:
+            # gate the obvious silence at the head only; once the detector is needed, it decides the rest of the backlog
+            while i < len(audio_packets) and self._energy_gate.is_silence(audio_packets[i]):
+                self.on_gated_silence()
+                self._feed_decision(audio_packets[i], False)
+                i += 1
+
+        audio_packets = audio_packets[i:]
+        if not audio_packets:
+            return
+        is_speeches: List[bool] = self.is_speech(audio_packets)
+        assert len(is_speeches) == len(audio_packets), f"Expected {len(audio_packets)} decisions, got {len(is_speeches)}"
+        for audio_packet, is_speech in zip(audio_packets, is_speeches):
+            self._feed_decision(audio_packet, is_speech)
+
+    def _feed_decision(self, audio_packet: AudioPacket, is_speech: bool) -> None:
+        """Process audio packet given whether it is speech or not
+        Args:
+            audio_packet (AudioPacket): The audio packet to be processed.
+            is_speech (bool): Whether the audio packet is speech.
+        """
+        if is_speech:
+            self._record_speech(audio_packet)
+            if self._utterance_id is None:
+                # start a new utterance, conatenating a bit of the buffered audio right before it.
+                self._command_audio_packet = self._concat_head_buffered_silences(audio_packet)
+                self._num_utterances += 1
+                self._utterance_start_timestamp = self._command_audio_packet.timestamp
+                self._utterance_id = f"utterance-{self._num_utterances}-{self._utterance_start_timestamp}"
+                self._endpointing_policy.on_utterance_start(self._utterance_id, audio_packet.timestamp)
                 logger.success(f"Starting an utterance AudioPacket at {self._command_audio_packet.timestamp}")
             else:
-                DEBUG__difference_between_start_to_end = audio_packet.timestamp - self._command_audio_packet.timestamp
-                # TODO should I add silence/padding according to the difference between the start and end of the audio packet?
-                # append to the existing on-going command audio packet
-                self._command_audio_packet += audio_packet
-            
+                if self._tail_silence_start_timestamp is not None:
+                    # speech resumed after a pause within the utterance
+                    self._endpointing_policy.observe_pause(audio_packet.timestamp - self._tail_silence_start_timestamp)
+                    self._tail_silence_start_timestamp = None
+
+                if self._command_audio_packet is None:
+                    # speech resumed right after a provisional chunk of the on-going utterance was sent off
+                    self._command_audio_packet = audio_packet
+                else:
+                    # TODO should I add silence/padding according to the difference between the start and end of the audio packet?
+                    # append to the existing on-going command audio packet
+                    self._command_audio_packet += audio_packet
+            self._is_pause_chunk_sent = False
+
+            if self._early_streaming and self._command_audio_packet.duration >= self._max_provisional_chunk_duration:
+                # long monologue without natural pauses, send off what we have so far
+                self._send_off_chunk(partial=True)
+
         else:
             # silence detected    
-            if self._command_audio_packet is not None:
+            if self._utterance_id is not None:
                 # if detected silence after voice, append silence to voice
-                DEBUG__difference_between_start_to_end = audio_packet.timestamp - self._command_audio_packet.ending_timestamp
                 # TODO should I add silence/padding according to the difference between the start and end of the audio packet?
-                self._command_audio_packet += audio_packet
+                if self._command_audio_packet is None:
+                    self._command_audio_packet = audio_packet
+                else:
+                    self._command_audio_packet += audio_packet
 
                 # Check if silence threshold is reached ?? TODO
                 if self._tail_silence_start_timestamp is None:
@@ -112,46 +248,70 @@ class VoiceActivityDetector(metaclass=ABCMeta):
 
                 else:
                     # if this is not the first silence after voice, check if the silence duration is greater than the threshold so that we can send off the utterance                    
-                    assert (audio_packet.ending_timestamp - self._command_audio_packet.ending_timestamp) == DEBUG__difference_between_start_to_end, \
-                        f"Ending timestamp of new packet {audio_packet.ending_timestamp} - starting timestamp of command audio packet {self._command_audio_packet.ending_timestamp} should be equal to the difference between the start and end of the audio packet {DEBUG__difference_between_start_to_end} != {audio_packet.ending_timestamp - self._command_audio_packet.ending_timestamp}"
-                    
-                    now_timestamp: int = self._command_audio_packet.ending_timestamp  # TODO should now timestamp correspond to real time or to the end of the audio packet?
+                    now_timestamp: int = audio_packet.ending_timestamp  # TODO should now timestamp correspond to real time or to the end of the audio packet?
 
                     # TODO check latency of the audio packet receival
                     # the silence duration is the difference between the current timestamp and the tail silence starting timestamp
                     silence_duration: int = now_timestamp - self._tail_silence_start_timestamp
 
                     # logger.debug(f'Got Silence after voice duration: {silence_duration}')
-                    if silence_duration >= self._tail_silence_threshold:
+                    tail_silence_threshold: int = self._endpointing_policy.tail_silence_threshold()
+                    if silence_duration >= tail_silence_threshold:
                         # if the silence duration is greater than the tail silence threshold, we can send off the utterance
-                        self._output_queue.put(self._command_audio_packet)
-                        logger.success(f"Utterance completed at {now_timestamp}, duration: {self._command_audio_packet.duration} ms")
+                        logger.success(f"Utterance completed at {now_timestamp}, duration: {now_timestamp - self._utterance_start_timestamp} ms, tail silence threshold: {tail_silence_threshold} ms")
+                        self._send_off_chunk(partial=False)
+                        self._endpoint_latencies.append(silence_duration)
+                        self._endpointing_policy.on_utterance_end(self._tail_silence_start_timestamp, tail_silence_threshold)
+                        logger.debug(f"Endpointing metrics: {self.metrics}")
                         self.log("\n[end]", force=True)
                         self.reset()
 
+                    elif self._early_streaming and not self._is_pause_chunk_sent and silence_duration >= self._provisional_pause_threshold:
+                        # natural pause, send off the speech so far while the user may still continue
+                        self._send_off_chunk(partial=True)
+                        self._is_pause_chunk_sent = True
+
             else:
                 # if no command audio packet is started, we can just buffer the silence
                 self._head_silences_buffer.append(audio_packet)
-    
+
+    def _record_speech(self, audio_packet: AudioPacket) -> None:
+        """Record the speech frame into the speech spans of the current chunk"""
+        if self._speech_spans and audio_packet.timestamp - self._speech_spans[-1][1] <= audio_packet.duration:
+            # consecutive speech frames (tolerating a jitter of a frame)
+            self._speech_spans[-1][1] = audio_packet.ending_timestamp
+        else:
+            self._speech_spans.append([audio_packet.timestamp, audio_packet.ending_timestamp])
+
+    def _send_off_chunk(self, partial: bool) -> None:
+        """Send off the current chunk of the on-going utterance to the output queue
+
+        Args:
+            partial (bool): True if it is a provisional chunk, False if it is the last chunk of the utterance
+        """
+        chunk: AudioPacket = self._command_audio_packet
+        self._command_audio_packet = None
+        chunk.mark_utterance(self._utterance_id, partial=partial)
+        # let STT trim the head and tail silences instead of running its own VAD again
+        chunk.speech_spans = [tuple(span) for span in self._speech_spans]
+        self._speech_spans = []
+        logger.debug(f"Sending off {'provisional' if partial else 'final'} chunk of {self._utterance_id}: {chunk}")
+        self._output_queue.append(chunk)
 
     def get_utterance_if_any(self) -> Union[AudioPacket, None]:
-        """Get the utterance if any is available in the output queue
+        """Get the next utterance chunk if any is available in the output queue
 
         Returns:
-            AudioPacket: The utterance audio packet if available, otherwise None
+            AudioPacket: The utterance (chunk) audio packet if available, otherwise None
         """
-
-        if self._output_queue.qsize() == 0:
+        if not self._output_queue:
             return None
-        audio_packets = []
-        while self._output_queue.qsize() > 0:
-            audio_packet = self._output_queue.get_nowait()
-            audio_packets.append(audio_packet)
-        audio_packet: AudioPacket = reduce(lambda x, y: x + y, audio_packets)
-        return audio_packet
+        return self._output_queue.popleft()
     
     def is_speaking(self) -> bool:
-        return self._command_audio_packet is not None and self._command_audio_packet.duration >= self._threshold_to_determine_speaking
+        if self._utterance_id is None or self._command_audio_packet is None:
+            return False
+        return self._command_audio_packet.ending_timestamp - self._utterance_start_timestamp >= self._threshold_to_determine_speaking
 
     def log(self, msg, end="", force=False) -> None: # TODO: refactor out into progress logger
         """Log message to console if verbose is True or force is True with flush
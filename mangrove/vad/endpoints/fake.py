@@ -0,0 +1,81 @@
+from typing import Union, List
+from core import AudioPacket
+from core.utils import logger, LatencyDistribution
+from .base import VoiceActivityDetector
+
+class FakeVAD(VoiceActivityDetector):
+    """Deterministic Voice Activity Detector for offline benchmarking
+    It ignores the audio content and alternates between `speech_frames` speech frames and
+    `silence_frames` silence frames, so that utterances are produced at a predictable rate
+    regardless of what the client is streaming.
+    """
+
+    def __init__(
+        self,
+        speech_frames: int = 60,
+        silence_frames: int = 40,
+        time_per_chunk_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        latency_distribution: str = "normal",
+        seed: int = 0,
+        frame_size: int = 512 * 4,
+        device: str = None,
+        **kwargs
+    ):
+        """
+        Initialize the FakeVAD.
+
+        Args:
+            speech_frames (int): Number of consecutive frames reported as speech.
+            silence_frames (int): Number of consecutive frames reported as silence.
+            time_per_chunk_ms (float): Simulated inference latency per frame in milliseconds.
+            jitter_ms (float): Spread of the simulated latency in milliseconds.
+            latency_distribution (str): Kind of the latency distribution, see `LatencyDistribution`.
+            seed (int): Seed of the latency distribution.
+            frame_size (int): Size of the audio frame in bytes.
+            device (str): Unused, kept for interface compatibility with the other detectors.
+            **kwargs: Additional keyword arguments for the base class.
+        """
+        if speech_frames <= 0 or silence_frames < 0:
+            raise ValueError("speech_frames must be positive and silence_frames non-negative")
+        self._speech_frames = speech_frames
+        self._silence_frames = silence_frames
+        self._latency_kwargs = dict(mean_ms=time_per_chunk_ms, jitter_ms=jitter_ms, kind=latency_distribution, seed=seed)
+        self._latency = LatencyDistribution(**self._latency_kwargs)
+        self._frame_index = 0
+        super().__init__(frame_size=frame_size, **kwargs)
+
+    def on_start(self) -> None:
+        logger.info(f"FakeVAD initialized with {self._speech_frames} speech / {self._silence_frames} silence frames and {self._latency}")
+
+    def reset_session(self) -> None:
+        """Restart the speech/silence pattern and the latency sequence, so that every session is the same"""
+        super().reset_session()
+        self._frame_index = 0
+        self._latency = LatencyDistribution(**self._latency_kwargs)
+
+    def is_speech(self, audio_packets: Union[List[AudioPacket], AudioPacket]) -> Union[bool, List[bool]]:
+        """Check if audio is speech, following the configured speech/silence pattern
+
+        Args:
+            audio_packet (AudioPacket): Audio packet to check
+
+        Returns:
+            bool: True if speech, False otherwise
+        """
+        one_item = False
+        if not isinstance(audio_packets, list):
+            audio_packets = [audio_packets]
+            one_item = True
+
+        is_speeches = []
+        for packet in audio_packets:
+            num_frames = max(1, len(packet) // self.frame_size)
+            self._latency.wait(scale=num_frames)
+            cycle = self._speech_frames + self._silence_frames
+            is_speeches.append((self._frame_index % cycle) < self._speech_frames)
+            self._frame_index += num_frames
+
+        if one_item:
+            return is_speeches[0]
+        return is_speeches
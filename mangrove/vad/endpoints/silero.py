@@ -1,39 +1,59 @@
-import torch
+import numpy as np
 from typing import Union, List, Optional
-from core import AudioPacket, AudioBuffer
+from core import AudioPacket
 from .base import VoiceActivityDetector
 
 class SileroVAD(VoiceActivityDetector):
     """Voice Activity Detector using Silero VAD
     This class implements a voice activity detector using the Silero VAD model.
     It checks if the audio packets contain speech based on a threshold.
+
+    In streaming mode, every native Silero window (512 samples at 16 kHz) is scored in order,
+    so the recurrent state of the model is carried from one window to the next, and the
+    window probabilities are turned into speech decisions with hysteresis
+    (speech starts above `onset_threshold` and only stops below `offset_threshold`).
     """
 
+    BYTES_PER_SAMPLE = AudioPacket.FLOAT_BYTES_PER_SAMPLE
+
     def __init__(
         self,
         is_speech_threshold: float = 0.9,
         device: Optional[str] = None,
         frame_size: int = 512 * 4,
+        streaming: bool = False,
+        onset_threshold: float = 0.5,
+        offset_threshold: float = 0.35,
         **kwargs
     ):
         """
         Initialize the SileroVAD.
 
         Args:
-            is_speech_threshold (float): Threshold to determine if the audio is speech.
+            is_speech_threshold (float): Threshold to determine if the audio is speech (non-streaming mode).
             device (Optional[str]): Device to run the model on, e.g., 'cpu' or 'cuda:0'.
-            frame_size (int): Size of the audio frame in samples. Must be at least 512*4 for Silero VAD.
+            frame_size (int): Size of the audio frame in bytes. Must be at least 512*4 for Silero VAD, unless streaming.
+            streaming (bool): If True, score every native Silero window with carried state and hysteresis.
+            onset_threshold (float): Window probability above which speech starts (streaming mode).
+            offset_threshold (float): Window probability below which speech stops (streaming mode).
             **kwargs: Additional keyword arguments for the base class.
             
         Raises:
-            ValueError: If frame_size is less than 512*4. (Silero VAD requires a minimum frame size of 2048 samples)
+            ValueError: If frame_size is less than 512*4 outside streaming mode. (Silero VAD requires a minimum frame of 512 samples)
+            ValueError: If offset_threshold is greater than onset_threshold.
         """
 
-        if frame_size < 512 * 4:
+        if streaming:
+            if frame_size % self.BYTES_PER_SAMPLE != 0:
+                raise ValueError(f"Frame size must be a multiple of {self.BYTES_PER_SAMPLE} bytes with streaming Silero VAD")
+            if not 0 <= offset_threshold <= onset_threshold <= 1:
+                raise ValueError("Silero VAD thresholds must satisfy 0 <= offset_threshold <= onset_threshold <= 1")
+        elif frame_size < 512 * 4:
             raise ValueError("Frame size must be at least 512*4 with Silero VAD")
 
         self.device = device
         if self.device is None:
+            import torch
             self.device = "cuda:0" if torch.cuda.is_available() else "cpu"
         elif device.startswith('cuda'):
             self.device = "cuda:0"
@@ -42,17 +62,36 @@ class SileroVAD(VoiceActivityDetector):
             self.device = "cpu"
 
         self.is_speech_threshold = is_speech_threshold
+        self.streaming = streaming
+        self.onset_threshold = onset_threshold
+        self.offset_threshold = offset_threshold
+        self._reset_streaming_state()
         super().__init__(frame_size=frame_size, **kwargs)
 
+    @staticmethod
+    def window_size_samples(sample_rate: int) -> int:
+        """Native Silero window size for the given sample rate"""
+        if sample_rate == 16000:
+            return 512
+        if sample_rate == 8000:
+            return 256
+        raise ValueError(f"Silero VAD supports 8000 or 16000 Hz sample rates, got {sample_rate}")
+
+    def _reset_streaming_state(self) -> None:
+        """Reset carried samples and hysteresis state of the streaming mode"""
+        self._window_leftover: np.ndarray = np.zeros(0, dtype=np.float32)
+        self._is_triggered: bool = False
+
     def on_start(self) -> None:
         """Initialize the VAD model"""
+        import torch
         self.model, utils = torch.hub.load(
             repo_or_dir="snakers4/silero-vad",
             model="silero_vad",
             force_reload=False,
             onnx=False,
         )
-        self.model: torch.nn.Module = self.model.eval()
+        self.model: "torch.nn.Module" = self.model.eval()
         self.model.to(self.device)
 
         # (get_speech_timestamps,
@@ -63,9 +102,59 @@ class SileroVAD(VoiceActivityDetector):
         # vad_iterator = VADIterator(model)
 
 
+    def _score_windows(self, samples: np.ndarray, window_size: int, sample_rate: int) -> np.ndarray:
+        """Speech probabilities of consecutive windows of the samples
+
+        The samples are converted and moved to the device at once, while the windows are scored
+        one after the other so that the recurrent state of the model is carried in order.
+        """
+        import torch
+        num_windows = len(samples) // window_size
+        if num_windows == 0:
+            return np.zeros(0, dtype=np.float32)
+        _audio_tensor = torch.from_numpy(np.ascontiguousarray(samples[:num_windows * window_size])).to(self.device)
+        with torch.inference_mode():
+            probs = [
+                self.model(_audio_tensor[i * window_size:(i + 1) * window_size], sample_rate)
+                for i in range(num_windows)
+            ]
+            return torch.cat(probs).flatten().cpu().numpy()
+
+    def _is_speech_streaming(self, audio_packets: List[AudioPacket]) -> List[bool]:
+        """Score every native window of the consecutive packets in order and apply hysteresis
+
+        Samples that do not fill a whole window are carried over to the next packet.
+        A packet is considered speech if the hysteresis state was on at any point within it.
+        """
+        sample_rate = audio_packets[0].sample_rate
+        window_size = self.window_size_samples(sample_rate)
+        packets_samples = [audio_packet.float for audio_packet in audio_packets]
+        samples = np.concatenate([self._window_leftover] + packets_samples)
+        probs = self._score_windows(samples, window_size, sample_rate)
+
+        # a window belongs to the packet within which it is completed
+        packets_ends = len(self._window_leftover) + np.cumsum([len(packet_samples) for packet_samples in packets_samples])
+        is_speeches = []
+        k = 0
+        for packet_end in packets_ends:
+            is_speech = self._is_triggered
+            while k < len(probs) and (k + 1) * window_size <= packet_end:
+                if self._is_triggered:
+                    self._is_triggered = probs[k] >= self.offset_threshold
+                else:
+                    self._is_triggered = probs[k] >= self.onset_threshold
+                is_speech = is_speech or self._is_triggered
+                k += 1
+            is_speeches.append(is_speech)
+
+        self._window_leftover = samples[len(probs) * window_size:]
+        return is_speeches
+
     def is_speech(self, audio_packets: Union[List[AudioPacket], AudioPacket]) -> Union[bool, List[bool]]:
         """Check if audio is speech
 
+        Consecutive packets given as a list are scored in a single pass, in order.
+
         Args:
             audio_packet (AudioPacket): Audio packet to check
 
@@ -77,19 +166,16 @@ class SileroVAD(VoiceActivityDetector):
             audio_packets = [audio_packets]
             one_item = True
 
-        audio_buffer = AudioBuffer(self.frame_size)
-        for audio_packet in audio_packets:
-            audio_buffer.put(audio_packet)
-
-        is_speeches = []
-        for packet in audio_buffer:
-            if len(packet) < self.frame_size:
-                # partial TODO maybe add to buffer
-                break
-            _audio_tensor = torch.from_numpy(packet.float).to(self.device)
-            is_speeches.append(
-                self.model(_audio_tensor, packet.sample_rate) > self.is_speech_threshold
-            )
+        if self.streaming:
+            is_speeches = self._is_speech_streaming(audio_packets)
+        else:
+            for audio_packet in audio_packets:
+                if len(audio_packet) != self.frame_size:
+                    raise ValueError(f"Expected frames of {self.frame_size} bytes, got {len(audio_packet)}")
+            # frames are consecutive windows of frame size
+            samples = np.concatenate([audio_packet.float for audio_packet in audio_packets])
+            probs = self._score_windows(samples, self.frame_size // self.BYTES_PER_SAMPLE, audio_packets[0].sample_rate)
+            is_speeches = [bool(prob > self.is_speech_threshold) for prob in probs]
 
         # if any([not is_speech for is_speech in is_speeches]):
         #     self.model.reset_states()
@@ -98,6 +184,17 @@ class SileroVAD(VoiceActivityDetector):
             return is_speeches[0]
         return is_speeches
 
+    def on_gated_silence(self) -> None:
+        # the windows in between are skipped, so the carried state would not be contiguous anymore
+        if self.streaming:
+            self._reset_streaming_state()
+            self._reset_model_state()
+
+    def _reset_model_state(self) -> None:
+        """Reset the recurrent state of the model"""
+        self.model.reset_states()
+
     def reset(self) -> None:
         super().reset()
-        self.model.reset_states()
+        self._reset_streaming_state()
+        self._reset_model_state()
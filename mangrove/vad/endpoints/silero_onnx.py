@@ -0,0 +1,91 @@
+import os
+import numpy as np
+from typing import Optional
+from core.utils import logger
+from storage_manager import MODELS_DIR
+from .silero import SileroVAD
+
+class SileroOnnxVAD(SileroVAD):
+    """Voice Activity Detector using Silero VAD on ONNX Runtime
+    Same decisions as `SileroVAD` (including the streaming mode), but the model runs on ONNX Runtime on CPU,
+    without importing torch or reaching the network: the weights are loaded from `model_path`, else from
+    `silero_vad.onnx` under the models directory of the project, else from the data of the installed `silero-vad` package.
+    """
+
+    MODEL_FILENAME = "silero_vad.onnx"
+
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        intra_op_num_threads: int = 1,
+        device: Optional[str] = None,
+        **kwargs
+    ):
+        """
+        Initialize the SileroOnnxVAD.
+
+        Args:
+            model_path (Optional[str]): Path to the ONNX weights of Silero VAD.
+            intra_op_num_threads (int): Number of threads ONNX Runtime uses within an operator.
+            device (Optional[str]): Unused, the model runs on CPU.
+            **kwargs: Additional keyword arguments for `SileroVAD`.
+        """
+        self.model_path = model_path
+        self.intra_op_num_threads = intra_op_num_threads
+        self._state: np.ndarray = None
+        self._context: np.ndarray = None
+        super().__init__(device="cpu", **kwargs)
+
+    @classmethod
+    def resolve_model_path(cls, model_path: Optional[str] = None) -> str:
+        """Find the local ONNX weights of Silero VAD
+
+        Raises:
+            FileNotFoundError: If no weights are found locally
+        """
+        candidates = [model_path] if model_path is not None else [os.path.join(MODELS_DIR, cls.MODEL_FILENAME)]
+        if model_path is None:
+            try:
+                from importlib.resources import files
+                candidates.append(str(files("silero_vad").joinpath("data", cls.MODEL_FILENAME)))
+            except ModuleNotFoundError:
+                pass
+        for candidate in candidates:
+            if os.path.isfile(candidate):
+                return candidate
+        raise FileNotFoundError(
+            f"Silero VAD ONNX weights not found in {candidates}; install silero-vad or place {cls.MODEL_FILENAME} in {MODELS_DIR}"
+        )
+
+    def on_start(self) -> None:
+        """Initialize the ONNX Runtime session"""
+        import onnxruntime
+
+        model_path = self.resolve_model_path(self.model_path)
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = self.intra_op_num_threads
+        options.inter_op_num_threads = 1
+        self.model = onnxruntime.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self._reset_model_state()
+        logger.info(f"SileroOnnxVAD loaded {model_path} with {self.intra_op_num_threads} intra-op threads")
+
+    def _reset_model_state(self) -> None:
+        self._state = np.zeros((2, 1, 128), dtype=np.float32)
+        self._context = None
+
+    def _score_windows(self, samples: np.ndarray, window_size: int, sample_rate: int) -> np.ndarray:
+        """Speech probabilities of consecutive windows of the samples, carrying the recurrent state in order"""
+        num_windows = len(samples) // window_size
+        context_size = 64 if sample_rate == 16000 else 32
+        if self._context is None:
+            self._context = np.zeros((1, context_size), dtype=np.float32)
+        sr = np.array(sample_rate, dtype=np.int64)
+        probs = np.zeros(num_windows, dtype=np.float32)
+        for i in range(num_windows):
+            window = samples[i * window_size:(i + 1) * window_size].astype(np.float32, copy=False).reshape(1, -1)
+            # the model expects each window prefixed with the tail of the previous one
+            x = np.concatenate([self._context, window], axis=1)
+            out, self._state = self.model.run(None, {"input": x, "state": self._state, "sr": sr})
+            self._context = x[:, -context_size:]
+            probs[i] = out[0, 0]
+        return probs
@@ -1,3 +1,4 @@
+import numpy as np
 import webrtcvad
 from typing import Union, List
 from core import AudioPacket
@@ -5,21 +6,42 @@ from core.utils import logger
 from .base import VoiceActivityDetector
 
 class WebRTCVAD(VoiceActivityDetector):
+    """Voice Activity Detector using the WebRTC VAD
+    It costs microseconds per frame, but is less accurate than Silero VAD.
+    WebRTC VAD only accepts 10, 20 or 30 ms frames of 16-bit PCM, so the float32 frames are converted on the fly.
+    """
+
+    BYTES_PER_SAMPLE = AudioPacket.FLOAT_BYTES_PER_SAMPLE
 
     def __init__(
         self,
         aggressiveness: int = 3,
-        silence_threshold: int = 200,
-        frame_size: int = 320 * 3,
+        tail_silence_threshold: int = 750,
+        frame_size: int = 480 * 4,
+        device: str = None,
         verbose=False,
+        **kwargs
     ):
-        if frame_size not in [320, 640, 960]:
-            raise ValueError("Frame size must be 320, 640 or 960 with WebRTC VAD")
+        """
+        Initialize the WebRTCVAD.
+
+        Args:
+            aggressiveness (int): Aggressiveness of filtering out non-speech, from 0 to 3.
+            tail_silence_threshold (int): Amount of tail silence in milliseconds that ends the utterance, as for the other detectors.
+            frame_size (int): Size of the audio frame in bytes, i.e. 10, 20 or 30 ms of float32 samples at 16 kHz.
+            device (str): Unused, kept for interface compatibility with the other detectors.
+            verbose (bool): If True, enables verbose logging.
+            **kwargs: Additional keyword arguments for the base class.
+        """
+        if frame_size not in [160 * 4, 320 * 4, 480 * 4]:
+            raise ValueError("Frame size must be 640, 1280 or 1920 bytes (10, 20 or 30 ms at 16 kHz) with WebRTC VAD")
         self.aggressiveness = aggressiveness
+        self.verbose = verbose
         super().__init__(
-            tail_silence_threshold=silence_threshold,
+            tail_silence_threshold=tail_silence_threshold,
             frame_size=frame_size,
-            verbose=verbose
+            verbose=verbose,
+            **kwargs
         )
 
     def on_start(self) -> None:
@@ -28,6 +50,11 @@ class WebRTCVAD(VoiceActivityDetector):
         if self.verbose:
             logger.info(f"WebRTCVAD initialized with aggressiveness {self.aggressiveness} and frame size {self.frame_size}")
 
+    @staticmethod
+    def _to_pcm16(audio_packet: AudioPacket) -> bytes:
+        """Convert the float32 samples of the packet to 16-bit PCM bytes"""
+        return (np.clip(audio_packet.float, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+
     def is_speech(self, audio_packets: Union[List[AudioPacket], AudioPacket]) -> Union[bool, List[bool]]:
         """Check if audio is speech
 
@@ -47,8 +74,7 @@ class WebRTCVAD(VoiceActivityDetector):
             if len(packet) < self.frame_size:
                 # partial TODO maybe add to buffer
                 break
-            audio_bytes, sample_rate = packet.bytes, packet.sample_rate
-            is_speeches.append(self.model.is_speech(audio_bytes, sample_rate))
+            is_speeches.append(self.model.is_speech(self._to_pcm16(packet), packet.sample_rate))
 
         # if any([not is_speech for is_speech in is_speeches]):
         #     self.model = webrtcvad.Vad(self.aggressiveness)
@@ -59,4 +85,4 @@ class WebRTCVAD(VoiceActivityDetector):
 
     def reset(self) -> None:
         super().reset()
-        self.model = webrtcvad.Vad(self.aggressiveness)
\ No newline at end of file
+        self.model = webrtcvad.Vad(self.aggressiveness)
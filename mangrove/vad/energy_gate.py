@@ -0,0 +1,138 @@
+import numpy as np
+from typing import Dict, Optional, Union
+
+from core import AudioPacket
+from core.utils import logger
+
+class EnergyGate:
+    """Cheap pre-gate marking obvious silence before invoking a neural voice activity detector
+
+    Each frame is split into short windows whose RMS energy and zero-crossing rate are computed at once.
+    The frame is obvious silence if every window is below the RMS threshold, or only slightly above it
+    with a noise-like (high) zero-crossing rate. The RMS threshold is `noise_floor_factor` times the noise
+    floor of the session, estimated from the quietest windows of the first `calibration_duration`
+    milliseconds and then tracked: on the frames the detector confirms as silence, all above the threshold,
+    and downward only on the frames gated out, so that it can fall back after a noisy stretch.
+    """
+
+    def __init__(
+        self,
+        calibration_duration: int = 1000,
+        noise_floor_factor: float = 3.0,
+        noise_floor_percentile: float = 20.0,
+        min_rms_threshold: float = 1e-4,
+        max_rms_threshold: float = 0.05,
+        noisy_zcr_threshold: float = 0.35,
+        window_duration: int = 10,
+        adaptation_rate: float = 0.05,
+    ):
+        """
+        Args:
+            calibration_duration (int): Duration in milliseconds of audio observed before gating starts.
+            noise_floor_factor (float): Multiple of the noise floor below which a window is silence.
+            noise_floor_percentile (float): Percentile of the window RMS of the calibration audio taken as the noise floor.
+            min_rms_threshold (float): Lower bound of the RMS threshold.
+            max_rms_threshold (float): Upper bound of the RMS threshold, so that loud sessions never gate speech out.
+            noisy_zcr_threshold (float): Zero-crossing rate above which a window slightly above the threshold is noise.
+            window_duration (int): Duration in milliseconds of the windows the frame is split into.
+            adaptation_rate (float): Rate at which the noise floor follows the frames confirmed as silence, or gated out.
+        """
+        if not 0 < min_rms_threshold <= max_rms_threshold:
+            raise ValueError("min_rms_threshold must be positive and at most max_rms_threshold")
+        self._calibration_duration = calibration_duration
+        self._noise_floor_factor = noise_floor_factor
+        self._noise_floor_percentile = noise_floor_percentile
+        self._min_rms_threshold = min_rms_threshold
+        self._max_rms_threshold = max_rms_threshold
+        self._noisy_zcr_threshold = noisy_zcr_threshold
+        self._window_duration = window_duration
+        self._adaptation_rate = adaptation_rate
+        self.reset()
+
+    def reset(self) -> None:
+        """Reset the calibration and the counters of the session"""
+        self._calibration_rms = []
+        self._calibrated_duration: int = 0
+        self._noise_floor: Optional[float] = None
+        self._num_frames: int = 0
+        self._num_skipped: int = 0
+        self._last_rms: Optional[np.ndarray] = None
+
+    @property
+    def is_calibrated(self) -> bool:
+        return self._noise_floor is not None
+
+    @property
+    def rms_threshold(self) -> Optional[float]:
+        if self._noise_floor is None:
+            return None
+        return float(np.clip(self._noise_floor * self._noise_floor_factor, self._min_rms_threshold, self._max_rms_threshold))
+
+    def _window_features(self, audio_packet: AudioPacket):
+        """RMS and zero-crossing rate of every window of the packet"""
+        samples = audio_packet.float
+        window_size = max(1, audio_packet.sample_rate * self._window_duration // 1000)
+        num_windows = max(1, len(samples) // window_size)
+        windows = samples[:num_windows * window_size]
+        if len(windows) < window_size:
+            windows = np.pad(windows, (0, window_size - len(windows)))
+        windows = windows.reshape(num_windows, -1)
+        rms = np.sqrt(np.mean(np.square(windows, dtype=np.float64), axis=1))
+        zcr = np.mean(np.signbit(windows[:, 1:]) != np.signbit(windows[:, :-1]), axis=1)
+        return rms, zcr
+
+    def is_silence(self, audio_packet: AudioPacket) -> bool:
+        """Whether the frame is obvious silence, so that the detector does not need to be invoked
+
+        Args:
+            audio_packet (AudioPacket): Frame to check
+
+        Returns:
+            bool: True if obvious silence, False if the detector should decide
+        """
+        self._num_frames += 1
+        rms, zcr = self._window_features(audio_packet)
+        self._last_rms = rms
+
+        if self._noise_floor is None:
+            self._calibration_rms.append(rms)
+            self._calibrated_duration += audio_packet.duration
+            if self._calibrated_duration >= self._calibration_duration:
+                self._noise_floor = float(np.percentile(np.concatenate(self._calibration_rms), self._noise_floor_percentile))
+                self._calibration_rms = []
+                logger.info(f"EnergyGate calibrated: noise floor {self._noise_floor:.6f}, RMS threshold {self.rms_threshold:.6f}")
+            return False
+
+        threshold = self.rms_threshold
+        is_quiet = rms < threshold
+        is_noise = (rms < 2 * threshold) & (zcr > self._noisy_zcr_threshold)
+        if np.all(is_quiet | is_noise):
+            self._num_skipped += 1
+            # gated frames are below the threshold, following them upward would only raise it further
+            self._adapt(float(np.median(rms)), downward_only=True)
+            return True
+        return False
+
+    def _adapt(self, floor: float, downward_only: bool = False) -> None:
+        if downward_only and floor >= self._noise_floor:
+            return
+        self._noise_floor += self._adaptation_rate * (floor - self._noise_floor)
+
+    def observe_silence(self) -> None:
+        """Follow the noise floor with the last frame, which the detector confirmed as silence"""
+        if self._noise_floor is None or self._last_rms is None:
+            return
+        self._adapt(float(np.median(self._last_rms)))
+
+    @property
+    def metrics(self) -> Dict[str, Union[int, float]]:
+        """Skipped detector invocations of the session so far"""
+        return {
+            "frames": self._num_frames,
+            "skipped_invocations": self._num_skipped,
+            "skipped_ratio": self._num_skipped / self._num_frames if self._num_frames else 0.0,
+            "noise_floor": self._noise_floor,
+        }
+
+    def __str__(self) -> str:
+        return f"EnergyGate(calibration_duration={self._calibration_duration}, noise_floor_factor={self._noise_floor_factor})"
@@ -1,53 +1,106 @@
-import torch
 from typing import Optional
 
 from core.stage import AudioToAudioStage
 from core import AudioBuffer, AudioPacket
 from core.utils import logger
-from .endpoints.silero import SileroVAD
-
+from .endpoints.base import VoiceActivityDetector
+from .endpointing import EndpointingPolicy
 
 
 class VADStage(AudioToAudioStage):
     def __init__(
         self,
         name: str,
+        endpoint: str = "silero",
         device: str = None,
         verbose: bool = False,
         **endpoint_kwargs
     ):
-        if device is None:
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-
-        self._endpoint = SileroVAD(
-            **endpoint_kwargs,
-            device=device,
-            verbose=verbose
-        )
+        self._endpoint: VoiceActivityDetector
+        if endpoint == "silero":
+            from .endpoints.silero import SileroVAD
+            self._endpoint = SileroVAD(
+                **endpoint_kwargs,
+                device=device,
+                verbose=verbose
+            )
+        elif endpoint == "silero-onnx":
+            from .endpoints.silero_onnx import SileroOnnxVAD
+            logger.info("Using Silero ONNX Runtime VAD Endpoint")
+            self._endpoint = SileroOnnxVAD(
+                **endpoint_kwargs,
+                verbose=verbose
+            )
+        elif endpoint == "webrtc":
+            from .endpoints.webrtc import WebRTCVAD
+            logger.info("Using WebRTC VAD Endpoint")
+            self._endpoint = WebRTCVAD(
+                **endpoint_kwargs,
+                verbose=verbose
+            )
+        elif endpoint == "fake":
+            from .endpoints.fake import FakeVAD
+            logger.info("Using Fake VAD Endpoint")
+            self._endpoint = FakeVAD(
+                **endpoint_kwargs,
+                device=device,
+                verbose=verbose
+            )
+        else:
+            raise Exception(f"Unknown Endpoint {endpoint}, available endpoints: silero, silero-onnx, webrtc, fake")
         # self._endpoint._output_queue = self._output_buffer # TODO the output queue is set to the stage's output buffer
+        # the frame size is backend-specific, the pipeline sequence sizes the input buffer accordingly
+        logger.info(f"VADStage: {endpoint} frames of {self._endpoint.frame_size} bytes")
         super().__init__(name=name, frame_size=self._endpoint.frame_size, verbose=verbose)
+        self._pending_audio_packet: Optional[AudioPacket] = None  # partial frame left over from a backlog
+
+    @property
+    def endpointing_policy(self) -> EndpointingPolicy:
+        """Policy deciding the end of the turn of the user"""
+        return self._endpoint.endpointing_policy
 
     def on_start(self) -> None:
         """Initialize the VAD endpoint"""
         self._endpoint.on_start()
+        logger.info(f"Using {self._endpoint.endpointing_policy} for endpointing")
         
     def process(self, audio_packet: AudioPacket) -> None:
         assert isinstance(audio_packet, AudioPacket), f"Expected AudioPacket, got {type(audio_packet)}"
-        if len(audio_packet) < self.frame_size:
-            raise NotImplementedError("Partial audio packet found; this should not happen")
-        self._endpoint.feed(audio_packet)
+        if self._pending_audio_packet is not None:
+            audio_packet = self._pending_audio_packet + audio_packet
+            self._pending_audio_packet = None
+
+        # all frames queued in the input buffer are unpacked at once, more than one when falling behind real time
+        num_frames = len(audio_packet) // self.frame_size
+        if len(audio_packet) > num_frames * self.frame_size:
+            # partial frame at the tail of the backlog, keep it for the next round
+            self._pending_audio_packet = audio_packet[num_frames * self.frame_size:]
+        if num_frames == 0:
+            return
+
+        if num_frames == 1:
+            self._endpoint.feed(audio_packet[:self.frame_size])
+        else:
+            logger.debug(f"VADStage: Catching up on a backlog of {num_frames} frames")
+            self._endpoint.feed_frames(
+                [audio_packet[i * self.frame_size:(i + 1) * self.frame_size] for i in range(num_frames)]
+            )
 
         # if self._endpoint.is_speaking():
         #     self.schedule_forward_interrupt()
 
-        audio_packet_utterance = self._endpoint.get_utterance_if_any() 
-        if audio_packet_utterance:
+        # with early streaming, there can be more than one (provisional) chunk of the utterance ready
+        while True:
+            audio_packet_utterance = self._endpoint.get_utterance_if_any()
+            if audio_packet_utterance is None:
+                break
             # self.refresh()
             logger.debug(f"VADStage: Detected utterance of duration {audio_packet_utterance.duration}")
             self.pack(audio_packet_utterance)
 
     def reset_audio_stream(self) -> None:
         """Reset audio stream context"""
+        self._pending_audio_packet = None
         self._endpoint.reset()
 
     # TODO use after some detection
@@ -56,4 +109,6 @@ class VADStage(AudioToAudioStage):
         self.reset_audio_stream()
 
     def on_disconnect(self) -> None:
-        self.reset_audio_stream()
+        logger.info(f"VADStage: Metrics of the session: {self._endpoint.metrics}")
+        self._pending_audio_packet = None
+        self._endpoint.reset_session()
@@ -0,0 +1,51 @@
+import torch
+import numpy as np
+from transformers import AutoFeatureExtractor, AutoModelForAudioClassification
+
+from core.utils import logger
+from .base import WakeWordDetector
+
+
+class HFAudioClassificationEndpoint(WakeWordDetector):
+    """Wake word detector based on a Hugging Face audio classification model trained on speech commands"""
+
+    def __init__(
+        self,
+        model_name: str = "MIT/ast-finetuned-speech-commands-v2",
+        wake_word: str = "marvin",
+        device: str = None,
+    ):
+        """
+        Args:
+            model_name (str): Name of the audio classification model.
+            wake_word (str): Class label of the wake word.
+            device (str): Device to run the model on.
+        """
+        self._device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self._feature_extractor = AutoFeatureExtractor.from_pretrained(model_name)
+        self._model = AutoModelForAudioClassification.from_pretrained(model_name).to(self._device).eval()
+
+        label2id = self._model.config.label2id
+        if wake_word not in label2id.keys():
+            raise ValueError(
+                f"Wake word {wake_word} not in set of valid class labels,"
+                f"pick a wake word in the set {label2id.keys()}."
+            )
+
+        self.wake_word = wake_word
+        self._wake_word_id = label2id[wake_word]
+
+        logger.info(
+            f"Wakeword set is {self.wake_word} out of {label2id.keys()}"
+        )
+
+    @property
+    def sample_rate(self) -> int:
+        return self._feature_extractor.sampling_rate
+
+    def score(self, samples: np.ndarray) -> float:
+        # the features are extracted straight from the samples, without the pipeline's chunking and re-wrapping
+        inputs = self._feature_extractor(samples, sampling_rate=self.sample_rate, return_tensors="pt").to(self._device)
+        with torch.inference_mode():
+            logits = self._model(**inputs).logits[0]
+        return float(torch.softmax(logits, dim=-1)[self._wake_word_id])
@@ -0,0 +1,38 @@
+import numpy as np
+from abc import ABCMeta, abstractmethod
+from typing import Dict
+
+
+class WakeWordDetector(metaclass=ABCMeta):
+    """Scores fixed-length windows of audio for the wake word"""
+
+    def on_start(self) -> None:
+        """Load what is needed to score windows"""
+        pass
+
+    @property
+    @abstractmethod
+    def sample_rate(self) -> int:
+        """Sample rate of the audio the detector scores"""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def score(self, samples: np.ndarray) -> float:
+        """Score a window of audio
+
+        Args:
+            samples (np.ndarray): float32 mono samples at `sample_rate`
+
+        Returns:
+            float: Probability that the wake word is said within the window
+        """
+        raise NotImplementedError()
+
+    def on_detection(self, samples: np.ndarray) -> None:
+        """Called with the window in which the wake word was detected, e.g. to learn from it"""
+        pass
+
+    @property
+    def metrics(self) -> Dict:
+        """Metrics of the detector, if any"""
+        return {}
@@ -0,0 +1,76 @@
+import time
+import numpy as np
+from typing import Dict, Union
+
+from core.utils import logger
+from .base import WakeWordDetector
+
+
+class CascadeWakeWordDetector(WakeWordDetector):
+    """Two-tier detector: a cheap first stage scores every window, and the expensive second stage
+    only scores the windows the first stage scores at least `first_stage_threshold`
+    """
+
+    def __init__(
+        self,
+        first_stage: WakeWordDetector,
+        second_stage: WakeWordDetector,
+        first_stage_threshold: float = 0.2,
+    ):
+        """
+        Args:
+            first_stage (WakeWordDetector): Cheap detector run on every window.
+            second_stage (WakeWordDetector): Expensive detector confirming the candidates of the first stage.
+            first_stage_threshold (float): First stage score from which the second stage runs; keep it low,
+                a window missed by the first stage is a missed detection.
+        """
+        if first_stage.sample_rate != second_stage.sample_rate:
+            raise ValueError(f"Sample rates of the stages differ: {first_stage.sample_rate} != {second_stage.sample_rate}")
+        self._first_stage = first_stage
+        self._second_stage = second_stage
+        self._first_stage_threshold = first_stage_threshold
+        self._num_windows: int = 0
+        self._num_second_stage_runs: int = 0
+        self._first_stage_time: float = 0.0
+        self._second_stage_time: float = 0.0
+
+    def on_start(self) -> None:
+        self._first_stage.on_start()
+        self._second_stage.on_start()
+        logger.info(
+            f"Wake word cascade of {self._first_stage.__class__.__name__} (threshold {self._first_stage_threshold}) "
+            f"and {self._second_stage.__class__.__name__}"
+        )
+
+    @property
+    def sample_rate(self) -> int:
+        return self._first_stage.sample_rate
+
+    def score(self, samples: np.ndarray) -> float:
+        self._num_windows += 1
+        start = time.perf_counter()
+        first_stage_score = self._first_stage.score(samples)
+        self._first_stage_time += time.perf_counter() - start
+        if first_stage_score < self._first_stage_threshold:
+            return 0.0
+
+        self._num_second_stage_runs += 1
+        start = time.perf_counter()
+        second_stage_score = self._second_stage.score(samples)
+        self._second_stage_time += time.perf_counter() - start
+        return second_stage_score
+
+    def on_detection(self, samples: np.ndarray) -> None:
+        # the first stage may learn from the windows the second stage confirmed
+        self._first_stage.on_detection(samples)
+        self._second_stage.on_detection(samples)
+
+    @property
+    def metrics(self) -> Dict[str, Union[int, float]]:
+        return {
+            "windows": self._num_windows,
+            "second_stage_runs": self._num_second_stage_runs,
+            "second_stage_run_rate": self._num_second_stage_runs / self._num_windows if self._num_windows else 0.0,
+            "mean_first_stage_ms": self._first_stage_time * 1000 / self._num_windows if self._num_windows else 0.0,
+            "mean_second_stage_ms": self._second_stage_time * 1000 / self._num_second_stage_runs if self._num_second_stage_runs else 0.0,
+        }
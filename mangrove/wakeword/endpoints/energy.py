@@ -0,0 +1,65 @@
+import numpy as np
+from typing import Optional
+
+from core.utils import logger
+from .base import WakeWordDetector
+
+
+class EnergyWakeWordDetector(WakeWordDetector):
+    """Cheap detector scoring how much of the window stands out from the background noise
+
+    The window is split into short sub-windows; the score is the fraction of them whose RMS exceeds
+    `noise_floor_factor` times the noise floor, tracked from the quietest sub-windows of every window.
+    It is not specific to the wake word, but rules out silence and steady noise for a few microseconds,
+    as the first stage of a cascade.
+    """
+
+    def __init__(
+        self,
+        noise_floor_factor: float = 3.0,
+        noise_floor_percentile: float = 10.0,
+        min_rms: float = 1e-3,
+        subwindow_duration: int = 10,
+        adaptation_rate: float = 0.05,
+        sample_rate: int = 16000,
+    ):
+        """
+        Args:
+            noise_floor_factor (float): Multiple of the noise floor above which a sub-window is not background.
+            noise_floor_percentile (float): Percentile of the sub-window RMS of a window taken as its noise level.
+            min_rms (float): Lower bound of the RMS threshold.
+            subwindow_duration (int): Duration in milliseconds of the sub-windows.
+            adaptation_rate (float): Rate at which the noise floor rises towards a louder noise level.
+            sample_rate (int): Sample rate of the audio.
+        """
+        self._noise_floor_factor = noise_floor_factor
+        self._noise_floor_percentile = noise_floor_percentile
+        self._min_rms = min_rms
+        self._subwindow_size = int(sample_rate * subwindow_duration / 1000)
+        self._adaptation_rate = adaptation_rate
+        self._sample_rate = sample_rate
+        self._noise_floor: Optional[float] = None
+
+    def on_start(self) -> None:
+        logger.info(f"{self.__class__.__name__} initialized with a noise floor factor of {self._noise_floor_factor}")
+
+    @property
+    def sample_rate(self) -> int:
+        return self._sample_rate
+
+    def score(self, samples: np.ndarray) -> float:
+        num_subwindows = len(samples) // self._subwindow_size
+        if num_subwindows == 0:
+            return 0.0
+        subwindows = samples[:num_subwindows * self._subwindow_size].reshape(num_subwindows, self._subwindow_size)
+        rms = np.sqrt(np.mean(subwindows ** 2, axis=1))
+
+        # the floor drops to quieter windows at once, and rises slowly in louder ones
+        noise_level = float(np.percentile(rms, self._noise_floor_percentile))
+        if self._noise_floor is None or noise_level < self._noise_floor:
+            self._noise_floor = noise_level
+        else:
+            self._noise_floor += self._adaptation_rate * (noise_level - self._noise_floor)
+
+        threshold = max(self._min_rms, self._noise_floor_factor * self._noise_floor)
+        return float(np.mean(rms > threshold))
@@ -0,0 +1,47 @@
+import numpy as np
+
+from core.utils import logger, LatencyDistribution
+from .base import WakeWordDetector
+
+
+class FakeWakeWordDetector(WakeWordDetector):
+    """Deterministic wake word detector for offline benchmarking
+    It ignores the audio content and scores one window out of every `detect_every` as the wake word.
+    """
+
+    def __init__(
+        self,
+        detect_every: int = 40,
+        time_per_window_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        latency_distribution: str = "normal",
+        seed: int = 0,
+        sample_rate: int = 16000,
+    ):
+        """
+        Args:
+            detect_every (int): Number of windows scored per detection.
+            time_per_window_ms (float): Simulated inference latency per window in milliseconds.
+            jitter_ms (float): Spread of the simulated latency in milliseconds.
+            latency_distribution (str): Kind of the latency distribution, see `LatencyDistribution`.
+            seed (int): Seed of the latency distribution.
+            sample_rate (int): Sample rate of the audio.
+        """
+        if detect_every <= 0:
+            raise ValueError("detect_every must be positive")
+        self._detect_every = detect_every
+        self._latency = LatencyDistribution(time_per_window_ms, jitter_ms, kind=latency_distribution, seed=seed)
+        self._sample_rate = sample_rate
+        self._window_index = 0
+
+    def on_start(self) -> None:
+        logger.info(f"FakeWakeWordDetector initialized detecting every {self._detect_every} windows with {self._latency}")
+
+    @property
+    def sample_rate(self) -> int:
+        return self._sample_rate
+
+    def score(self, samples: np.ndarray) -> float:
+        self._latency.wait()
+        self._window_index += 1
+        return 1.0 if self._window_index % self._detect_every == 0 else 0.0
@@ -0,0 +1,68 @@
+import os
+import glob
+import wave
+import numpy as np
+from typing import List, Optional
+
+from core.utils import logger
+from core.utils.fingerprint import LogMelFingerprinter
+from .energy import EnergyWakeWordDetector
+
+
+class TemplateWakeWordDetector(EnergyWakeWordDetector):
+    """Cheap detector matching the window against templates of the wake word
+
+    The score is the highest cosine similarity between the log-mel fingerprint of the window and those of the
+    templates, read from WAV files and enrolled from the windows in which the wake word was detected.
+    Windows that are mostly background noise score 0 without being fingerprinted; until a template is known,
+    the energy score is returned instead.
+    """
+
+    def __init__(
+        self,
+        template_dir: Optional[str] = None,
+        max_templates: int = 20,
+        min_energy_score: float = 0.1,
+        num_bands: int = 24,
+        num_frames: int = 32,
+        **kwargs
+    ):
+        """
+        Args:
+            template_dir (str, optional): Directory of 16 kHz mono 16-bit WAV recordings of the wake word.
+            max_templates (int): Number of most recent templates kept.
+            min_energy_score (float): Energy score below which the window is not fingerprinted.
+            num_bands (int): Number of mel bands of the fingerprint.
+            num_frames (int): Number of frames the fingerprint is stretched to.
+            **kwargs: Additional keyword arguments for `EnergyWakeWordDetector`.
+        """
+        super().__init__(**kwargs)
+        self._fingerprinter = LogMelFingerprinter(num_bands, num_frames)
+        self._max_templates = max_templates
+        self._min_energy_score = min_energy_score
+        self._templates: List[np.ndarray] = []
+        if template_dir is not None:
+            for path in sorted(glob.glob(os.path.join(template_dir, "*.wav"))):
+                with wave.open(path, "rb") as f:
+                    if f.getframerate() != self.sample_rate or f.getnchannels() != 1 or f.getsampwidth() != 2:
+                        logger.warning(f"Skipping template {path}, not a {self.sample_rate} Hz mono 16-bit WAV file")
+                        continue
+                    samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16).astype(np.float32) / (1 << 15)
+                self.enroll(samples)
+            logger.info(f"Loaded {len(self._templates)} wake word templates from {template_dir}")
+
+    def enroll(self, samples: np.ndarray) -> None:
+        """Add a recording of the wake word as a template"""
+        self._templates = (self._templates + [self._fingerprinter(samples, self.sample_rate)])[-self._max_templates:]
+
+    def score(self, samples: np.ndarray) -> float:
+        energy_score = super().score(samples)
+        if not self._templates:
+            return energy_score
+        if energy_score < self._min_energy_score:
+            return 0.0
+        similarities = np.stack(self._templates) @ self._fingerprinter(samples, self.sample_rate)
+        return max(0.0, float(similarities.max()))
+
+    def on_detection(self, samples: np.ndarray) -> None:
+        self.enroll(samples)
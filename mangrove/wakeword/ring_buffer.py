@@ -0,0 +1,37 @@
+import numpy as np
+
+
+class AudioRingBuffer:
+    """Fixed-size buffer of the most recent audio samples, written in place"""
+
+    def __init__(self, size: int):
+        """
+        Args:
+            size (int): Number of samples kept.
+        """
+        self._samples = np.zeros(size, dtype=np.float32)
+        self._size = size
+        self.reset()
+
+    def reset(self) -> None:
+        self._write_index = 0
+        self._num_written = 0
+
+    @property
+    def is_full(self) -> bool:
+        return self._num_written >= self._size
+
+    def write(self, samples: np.ndarray) -> None:
+        """Append samples, overwriting the oldest ones"""
+        samples = samples[-self._size:]
+        head = min(len(samples), self._size - self._write_index)
+        self._samples[self._write_index:self._write_index + head] = samples[:head]
+        self._samples[:len(samples) - head] = samples[head:]
+        self._write_index = (self._write_index + len(samples)) % self._size
+        self._num_written += len(samples)
+
+    def read(self) -> np.ndarray:
+        """Samples kept, oldest first"""
+        if not self.is_full:
+            return self._samples[:self._write_index].copy()
+        return np.concatenate((self._samples[self._write_index:], self._samples[:self._write_index]))
@@ -0,0 +1,220 @@
+import time
+import numpy as np
+from typing import Dict, List, Optional, Union
+
+from core.stage import AudioToAudioStage
+from core import AudioPacket
+from core.utils import logger
+from .endpoints.base import WakeWordDetector
+from .ring_buffer import AudioRingBuffer
+
+
+def create_wake_word_detector(endpoint: str, device: str = None, **endpoint_kwargs) -> WakeWordDetector:
+    """Create the wake word detector, the stages of a cascade being created from `first_stage`/`second_stage`
+    (names of detectors) and `first_stage_kwargs`/`second_stage_kwargs`
+
+    Args:
+        endpoint (str): Name of the detector
+        device (str): Device to run the detector on, if it uses one
+        **endpoint_kwargs: Keyword arguments for the detector
+
+    Returns:
+        WakeWordDetector: The detector
+    """
+    if endpoint == "audio_classification":
+        from .endpoints.audio_classification import HFAudioClassificationEndpoint
+        return HFAudioClassificationEndpoint(device=device, **endpoint_kwargs)
+    elif endpoint == "energy":
+        from .endpoints.energy import EnergyWakeWordDetector
+        return EnergyWakeWordDetector(**endpoint_kwargs)
+    elif endpoint == "template":
+        from .endpoints.template import TemplateWakeWordDetector
+        return TemplateWakeWordDetector(**endpoint_kwargs)
+    elif endpoint == "cascade":
+        from .endpoints.cascade import CascadeWakeWordDetector
+        logger.info("Using Cascade Wake Word Endpoint")
+        kwargs = dict(endpoint_kwargs)
+        first_stage = create_wake_word_detector(kwargs.pop("first_stage", "template"), device, **kwargs.pop("first_stage_kwargs", {}))
+        second_stage = create_wake_word_detector(kwargs.pop("second_stage", "audio_classification"), device, **kwargs.pop("second_stage_kwargs", {}))
+        return CascadeWakeWordDetector(first_stage, second_stage, **kwargs)
+    elif endpoint == "fake":
+        from .endpoints.fake import FakeWakeWordDetector
+        logger.info("Using Fake Wake Word Endpoint")
+        return FakeWakeWordDetector(**endpoint_kwargs)
+    else:
+        raise Exception(f"Unknown Endpoint {endpoint}, available endpoints: audio_classification, energy, template, cascade, fake")
+
+
+class WakeWordStage(AudioToAudioStage):
+    """Gate forwarding audio downstream only once the wake word is detected
+
+    The most recent `window_duration` ms of audio are kept in a ring buffer and scored every `hop_duration` ms.
+    Windows ending more than `max_lag` ms before the newest audio received are skipped, so that the gate
+    catches up after falling behind; lateness is measured with the packet timestamps.
+    On detection, the window is forwarded (so that the start of the utterance is not lost) and so is all audio
+    received after it, until `listening_duration` ms have passed and the last `closing_silence_duration` ms are
+    quiet; the latter must be at least the tail silence threshold of the VAD downstream, so that it ends the
+    utterance in progress before the gate closes rather than merging it with the audio of the next detection.
+    """
+
+    is_gate = True
+
+    def __init__(
+        self,
+        name: str,
+        endpoint: str = "cascade",
+        device: str = None,
+        frame_size: int = 512 * 4,
+        window_duration: int = 1000,
+        hop_duration: int = 250,
+        threshold: float = 0.9,
+        max_lag: int = 1000,
+        listening_duration: int = 8000,
+        silence_rms: float = 0.01,
+        closing_silence_duration: int = 1000,
+        endpoint_kwargs: Dict = {},
+        verbose: bool = False,
+    ):
+        """
+        Args:
+            name (str): Name of the stage
+            endpoint (str): Wake word detector to use, see `create_wake_word_detector`. Defaults to "cascade".
+            device (str): Device to run the detector on.
+            frame_size (int): Size in bytes of the audio frames unpacked from the input buffer.
+            window_duration (int): Duration in milliseconds of the scored windows.
+            hop_duration (int): Milliseconds of audio between two scored windows.
+            threshold (float): Score above which the wake word is detected (score of the second stage of a cascade).
+            max_lag (int): Maximum delay in milliseconds of a window behind the newest audio for it to be scored.
+            listening_duration (int): Minimum duration in milliseconds of audio forwarded after a detection.
+            silence_rms (float): RMS below which audio is quiet enough to stop forwarding.
+            closing_silence_duration (int): Duration in milliseconds of quiet audio forwarded before the gate closes,
+                at least the tail silence threshold of the VAD downstream.
+            endpoint_kwargs (Dict): Additional keyword arguments for the detector.
+            verbose (bool): Whether to print debug messages.
+        """
+        super().__init__(name=name, frame_size=frame_size, verbose=verbose)
+
+        self._endpoint: WakeWordDetector = create_wake_word_detector(endpoint, device=device, **endpoint_kwargs)
+
+        sample_rate = self._endpoint.sample_rate
+        self._window_duration = window_duration
+        self._hop_size = int(sample_rate * hop_duration / 1000)
+        self._threshold = threshold
+        self._max_lag = max_lag
+        self._listening_duration = listening_duration
+        self._silence_rms = silence_rms
+        self._closing_silence_duration = closing_silence_duration
+        self._ring_buffer = AudioRingBuffer(int(sample_rate * window_duration / 1000))
+        self.reset()
+
+    def reset(self) -> None:
+        """Close the gate and reset the counters of the session"""
+        self._ring_buffer.reset()
+        self._num_samples_since_hop: int = 0
+        self._detection_timestamp: Optional[float] = None  # gate is open since then
+        self._quiet_duration: float = 0.0  # of the audio forwarded last
+        self._num_hops: int = 0
+        self._num_scored: int = 0
+        self._num_late: int = 0
+        self._num_detections: int = 0
+        self._detection_latencies: List[float] = []
+
+    @property
+    def is_listening(self) -> bool:
+        """Whether audio is forwarded downstream"""
+        return self._detection_timestamp is not None
+
+    @property
+    def metrics(self) -> Dict[str, Union[int, float, Dict]]:
+        """Counters of the session, and the detection latency: delay between the end of the window in which the
+        wake word was detected and the detection, i.e. the lag behind the newest audio plus the processing time"""
+        return {
+            "hops": self._num_hops,
+            "scored": self._num_scored,
+            "late_skipped": self._num_late,
+            "detections": self._num_detections,
+            "mean_detection_latency_ms": float(np.mean(self._detection_latencies)) if self._detection_latencies else 0.0,
+            "max_detection_latency_ms": float(np.max(self._detection_latencies)) if self._detection_latencies else 0.0,
+            "endpoint": self._endpoint.metrics,
+        }
+
+    def on_start(self) -> None:
+        self._endpoint.on_start()
+        logger.info(f"WakeWordStage: scoring {self._window_duration} ms windows every {self._hop_size} samples")
+
+    def process(self, audio_packet: AudioPacket) -> None:
+        assert isinstance(audio_packet, AudioPacket), f"Expected AudioPacket, got {type(audio_packet)}"
+        if audio_packet.sample_rate != self._endpoint.sample_rate:
+            raise ValueError(f"Expected audio at {self._endpoint.sample_rate} Hz, got {audio_packet.sample_rate} Hz")
+        processing_start = time.perf_counter()
+        samples = audio_packet.float
+
+        if self.is_listening:
+            self.pack(audio_packet)
+            is_quiet = np.sqrt(np.mean(samples ** 2)) < self._silence_rms if len(samples) else True
+            self._quiet_duration = self._quiet_duration + audio_packet.duration if is_quiet else 0.0
+            if audio_packet.ending_timestamp - self._detection_timestamp >= self._listening_duration and \
+                self._quiet_duration >= self._closing_silence_duration:
+                logger.info(f"WakeWordStage: Stopped listening at {audio_packet.ending_timestamp}")
+                self._detection_timestamp = None
+                self._quiet_duration = 0.0
+                self._ring_buffer.reset()
+                self._num_samples_since_hop = 0
+            return
+
+        # backlogs are unpacked at once, lateness is relative to the newest audio received
+        newest_timestamp = audio_packet.ending_timestamp
+        ms_per_sample = audio_packet.duration / len(samples) if len(samples) else 0.0
+        position = 0
+        while position < len(samples):
+            take = min(self._hop_size - self._num_samples_since_hop, len(samples) - position)
+            self._ring_buffer.write(samples[position:position + take])
+            self._num_samples_since_hop += take
+            position += take
+            if self._num_samples_since_hop < self._hop_size:
+                break
+            self._num_samples_since_hop = 0
+            self._num_hops += 1
+            if not self._ring_buffer.is_full:
+                continue
+            window_end_timestamp = audio_packet.timestamp + position * ms_per_sample
+            if newest_timestamp - window_end_timestamp > self._max_lag:
+                self._num_late += 1
+                continue
+
+            window = self._ring_buffer.read()
+            self._num_scored += 1
+            score = self._endpoint.score(window)
+            if score >= self._threshold:
+                latency = newest_timestamp - window_end_timestamp + (time.perf_counter() - processing_start) * 1000
+                self._detection_latencies.append(latency)
+                logger.success(f"WakeWordStage: Detected the wake word at {window_end_timestamp} (score {score:.2f}, latency {latency:.1f} ms)")
+                self._endpoint.on_detection(window)
+                self._on_detection(window, samples[position:], window_end_timestamp, ms_per_sample, audio_packet)
+                return
+
+    def _on_detection(
+        self,
+        window: np.ndarray,
+        rest: np.ndarray,
+        window_end_timestamp: float,
+        ms_per_sample: float,
+        audio_packet: AudioPacket,
+    ) -> None:
+        """Open the gate, forwarding the window and the audio received after it"""
+        self._num_detections += 1
+        self._detection_timestamp = window_end_timestamp
+        self._quiet_duration = 0.0
+        samples = np.concatenate((window, rest)).astype(np.float32)
+        self.pack(AudioPacket({
+                "bytes": samples.tobytes(),
+                "sampleRate": audio_packet.sample_rate,
+                "sampleWidth": audio_packet.sample_width,  # same format as the rest of the stream
+                "numChannels": audio_packet.num_channels,
+                "timestamp": window_end_timestamp - len(window) * ms_per_sample,
+            }, resample=False, is_processed=True
+        ))
+
+    def on_disconnect(self) -> None:
+        logger.info(f"WakeWordStage: Metrics of the session: {self.metrics}")
+        self.reset()
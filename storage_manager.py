@@ -11,6 +11,8 @@ COMMANDS_CACHE_DIR = os.path.join(BLACK_BOX_DIR, "commands-audio-cache")
 LOG_DIR = os.path.join(BLACK_BOX_DIR, "logs")
 WORLD_STATE_DIR = os.path.join(BLACK_BOX_DIR, "world-state")
 GENERATED_AUDIO_DIR = os.path.join(BLACK_BOX_DIR, "generated-audio")
+MODELS_DIR = os.path.join(BLACK_BOX_DIR, "models")
+KNOWLEDGE_INDEX_DIR = os.path.join(BLACK_BOX_DIR, "knowledge-index")
 
 for dir in [
     IMAGES_DIR,
@@ -18,6 +20,8 @@ for dir in [
     LOG_DIR,
     WORLD_STATE_DIR,
     GENERATED_AUDIO_DIR,
+    MODELS_DIR,
+    KNOWLEDGE_INDEX_DIR,
 ]:
     if not os.path.exists(dir):
         os.makedirs(dir)